@@ -0,0 +1,235 @@
+"""Motor analítico embebido opcional (DuckDB) sobre una copia Parquet local de empleados y log_cambios.
+
+La copia guarda la generación de cache_compartido con la que se tomó: cada escritura de la aplicación
+(registrar_escritura) la incrementa, y una copia de otra generación no se usa hasta regenerarse.
+"""
+import os
+import tempfile
+import threading
+import time
+import cache_compartido
+
+try:
+    import duckdb
+except ImportError:  # dependencia opcional
+    duckdb = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+ANALITICA_DIR = os.environ.get('ANALITICA_DIR', '.analitica')
+ANALITICA_TTL = float(os.environ.get('ANALITICA_TTL_SEGUNDOS', '300'))
+
+# Solo se copian columnas sin datos sensibles (nunca hash_password)
+TABLAS = {
+    'empleados': "SELECT id, dni, nombre, apellido, fecha_ingreso, estado, skill, es_lider, activo, "
+                 "area, proyecto, fecha_creacion, fecha_actualizacion FROM pg.public.empleados",
+    'log_cambios': "SELECT id, timestamp, usuario_id, empleado_dni, accion FROM pg.public.log_cambios",
+    'usuarios': "SELECT id, usuario, rol FROM pg.public.usuarios",
+}
+
+PERIODOS = ('day', 'week', 'month', 'quarter', 'year')
+
+_sync_lock = threading.Lock()
+
+def disponible():
+    """Indica si el motor analítico puede usarse (duckdb instalado y base configurada)"""
+    return duckdb is not None and bool(os.environ.get('READ_DATABASE_URL') or os.environ.get('DATABASE_URL'))
+
+def _ruta(tabla):
+    return os.path.join(ANALITICA_DIR, f"{tabla}.parquet")
+
+def _ruta_generacion():
+    return os.path.join(ANALITICA_DIR, 'generacion')
+
+def _generacion_actual():
+    """Generación de datos vigente; None si la caché compartida no responde"""
+    try:
+        return cache_compartido.backend().generacion()
+    except Exception:
+        return None
+
+def _copia_al_dia():
+    """Indica si la copia se tomó en la generación vigente (sin generación conocida solo cuenta el TTL)"""
+    actual = _generacion_actual()
+    if actual is None:
+        return True
+    try:
+        with open(_ruta_generacion()) as f:
+            return int(f.read()) == actual
+    except (FileNotFoundError, ValueError):
+        return False
+
+def _antiguedad_copia():
+    """Segundos desde la última sincronización (infinito si no hay copia)"""
+    rutas = [_ruta(t) for t in TABLAS]
+    if not all(os.path.exists(r) for r in rutas):
+        return float('inf')
+    return time.time() - min(os.path.getmtime(r) for r in rutas)
+
+def _literal(valor):
+    """Literal de texto SQL para DuckDB (ATTACH y COPY no aceptan parámetros)"""
+    return "'" + str(valor).replace("'", "''") + "'"
+
+def _copiar(con, tabla, consulta):
+    """Escribe la tabla a un temporal único y lo publica con un rename atómico.
+
+    El nombre único evita que dos procesos sincronizando a la vez escriban el mismo temporal."""
+    descriptor, temporal = tempfile.mkstemp(dir=ANALITICA_DIR, prefix=f".{tabla}.", suffix='.parquet.tmp')
+    os.close(descriptor)
+    os.remove(temporal)
+    try:
+        con.execute(f"COPY ({consulta}) TO {_literal(temporal)} (FORMAT parquet, COMPRESSION zstd)")
+        os.replace(temporal, _ruta(tabla))
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+def sincronizar(forzar=False):
+    """Regenera la copia Parquet local desde Postgres (preferentemente desde la réplica de lectura).
+
+    Si otro hilo o proceso ya está sincronizando no espera: devuelve False y se sigue con la copia actual."""
+    if not disponible():
+        raise RuntimeError("El motor analítico requiere el paquete duckdb")
+    if not _sync_lock.acquire(blocking=False):
+        return False
+    try:
+        if not forzar and _antiguedad_copia() < ANALITICA_TTL and _copia_al_dia():
+            return False
+        os.makedirs(ANALITICA_DIR, exist_ok=True)
+        with open(os.path.join(ANALITICA_DIR, '.sincronizacion.lock'), 'w') as bloqueo:
+            if fcntl:
+                try:
+                    fcntl.flock(bloqueo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return False
+            url = os.environ.get('READ_DATABASE_URL') or os.environ['DATABASE_URL']
+            # Se lee antes de copiar: una escritura durante la copia deja la copia de una generación vieja
+            generacion = _generacion_actual()
+            con = duckdb.connect()
+            try:
+                con.execute("INSTALL postgres; LOAD postgres;")
+                con.execute(f"ATTACH {_literal(url)} AS pg (TYPE postgres, READ_ONLY)")
+                for tabla, consulta in TABLAS.items():
+                    _copiar(con, tabla, consulta)
+            finally:
+                con.close()
+            temporal = f"{_ruta_generacion()}.{os.getpid()}.tmp"
+            with open(temporal, 'w') as f:
+                f.write(str(generacion if generacion is not None else ''))
+            os.replace(temporal, _ruta_generacion())
+        return True
+    finally:
+        _sync_lock.release()
+
+def _sincronizar_en_segundo_plano():
+    """Refresca la copia en un hilo aparte para no hacer esperar la consulta del usuario"""
+    def tarea():
+        try:
+            sincronizar()
+        except Exception as e:
+            print(f"No se pudo sincronizar la copia analítica: {e}")
+    threading.Thread(target=tarea, name='sincronizacion-analitica', daemon=True).start()
+
+def _conectar():
+    """Conexión DuckDB en memoria con vistas sobre la copia local.
+
+    Una copia vencida por TTL se sigue usando mientras se refresca en segundo plano (cubre cambios
+    hechos fuera de la aplicación). Sin copia, o con una copia anterior a la última escritura, se lanza
+    la sincronización y se informa el error para que el llamador use el camino sin DuckDB."""
+    antiguedad = _antiguedad_copia()
+    al_dia = _copia_al_dia()
+    if antiguedad >= ANALITICA_TTL or not al_dia:
+        _sincronizar_en_segundo_plano()
+    if antiguedad == float('inf'):
+        raise RuntimeError("La copia analítica todavía se está generando")
+    if not al_dia:
+        raise RuntimeError("La copia analítica es anterior a la última escritura")
+    con = duckdb.connect()
+    for tabla in TABLAS:
+        con.execute(f"CREATE VIEW {tabla} AS SELECT * FROM read_parquet({_literal(_ruta(tabla))})")
+    return con
+
+def consultar(sql, params=None):
+    """Ejecuta una consulta SQL sobre empleados, log_cambios y usuarios y devuelve un DataFrame"""
+    con = _conectar()
+    try:
+        return con.execute(sql, params or []).df()
+    finally:
+        con.close()
+
+def _where_log(filtros):
+    """Construye el WHERE para log_cambios con los mismos filtros que crud.obtener_log_cambios"""
+    condiciones, params = [], []
+    if filtros:
+        for clave, condicion in [
+            ('usuario_id', 'l.usuario_id = ?'),
+            ('empleado_dni', 'l.empleado_dni = ?'),
+            ('accion', 'l.accion = ?'),
+            ('fecha_desde', 'l.timestamp >= ?'),
+            ('fecha_hasta', 'l.timestamp <= ?'),
+        ]:
+            if clave in filtros:
+                condiciones.append(condicion)
+                params.append(filtros[clave])
+    where = ("WHERE " + " AND ".join(condiciones)) if condiciones else ""
+    return where, params
+
+def metricas_empleados():
+    """Métricas principales del dashboard en una sola pasada (mismos criterios que resumen.obtener_metricas)"""
+    df = consultar("""
+        SELECT count(*) AS total,
+               count(*) FILTER (WHERE estado = 'activo') AS activos,
+               count(*) FILTER (WHERE es_lider) AS lideres,
+               count(DISTINCT skill) FILTER (WHERE skill <> '') AS skills_unicos
+        FROM empleados WHERE activo IS NOT FALSE
+    """)
+    return df.iloc[0].to_dict()
+
+def conteo_empleados_por(columna, limite=None):
+    """Cantidad de empleados activos agrupados por una columna"""
+    if columna not in ('estado', 'skill', 'area', 'proyecto', 'es_lider'):
+        raise ValueError(f"Columna no permitida: {columna}")
+    sql = f"SELECT {columna}, count(*) AS cantidad FROM empleados WHERE activo IS NOT FALSE GROUP BY 1 ORDER BY 2 DESC"
+    if limite:
+        sql += f" LIMIT {int(limite)}"
+    return consultar(sql)
+
+def ingresos_por_periodo(periodo='month'):
+    """Cantidad de ingresos agrupados por período de fecha_ingreso"""
+    if periodo not in PERIODOS:
+        raise ValueError(f"Período inválido: {periodo}")
+    return consultar(f"""
+        SELECT date_trunc('{periodo}', fecha_ingreso) AS periodo, count(*) AS cantidad
+        FROM empleados WHERE activo IS NOT FALSE AND fecha_ingreso IS NOT NULL
+        GROUP BY 1 ORDER BY 1
+    """)
+
+def estadisticas_log(filtros=None):
+    """Cambios por acción, por usuario y por día sobre una misma copia (mismo formato que
+    crud.estadisticas_log_cambios)"""
+    where, params = _where_log(filtros)
+    con = _conectar()
+    try:
+        por_accion = con.execute(f"""
+            SELECT l.accion, count(*) AS cantidad FROM log_cambios l {where} GROUP BY 1 ORDER BY 2 DESC
+        """, params).df()
+        por_usuario = con.execute(f"""
+            SELECT u.usuario, count(*) AS cantidad
+            FROM log_cambios l LEFT JOIN usuarios u ON u.id = l.usuario_id
+            {where}
+            GROUP BY 1 ORDER BY 2 DESC
+        """, params).df()
+        por_dia = con.execute(f"""
+            SELECT date_trunc('day', l.timestamp) AS periodo, l.accion, count(*) AS cantidad
+            FROM log_cambios l {where} GROUP BY 1, 2 ORDER BY 1, 2
+        """, params).df()
+    finally:
+        con.close()
+    return {
+        'por_accion': por_accion.set_index('accion')['cantidad'],
+        'por_usuario': por_usuario.set_index('usuario')['cantidad'],
+        'por_dia': por_dia.pivot(index='periodo', columns='accion', values='cantidad').fillna(0)
+    }
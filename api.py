@@ -0,0 +1,230 @@
+"""API HTTP de solo lectura sobre crud para otros sistemas internos.
+
+    GET /empleados?campos=dni,nombre&limite=100&despues=<dni>&estado=activo
+    GET /empleados/<dni>?campos=dni,estado
+    GET /log?limite=100&antes=<id>&dni=<dni>&accion=alta&desde=2024-01-01&hasta=2024-12-31
+
+Las respuestas llevan un ETag derivado de la versión de datos: con If-None-Match se responde
+304 sin consultar ni serializar el padrón. Se comprimen con gzip si el cliente lo acepta.
+Si API_TOKEN está definido se exige el encabezado Authorization: Bearer <token>.
+"""
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, unquote
+from datetime import datetime
+import argparse
+import gzip
+import hashlib
+import hmac
+import json
+import logging
+import os
+from sqlalchemy import Boolean
+from crud import listar_empleados_df, obtener_empleado, obtener_log_cambios, obtener_version_datos
+from db import Empleado
+
+logger = logging.getLogger(__name__)
+
+API_TOKEN = os.environ.get('API_TOKEN', '')
+LIMITE_POR_DEFECTO = 100
+LIMITE_MAXIMO = 1000
+# Por debajo de este tamaño no conviene comprimir
+MIN_BYTES_GZIP = 1024
+
+COLUMNAS_EMPLEADO = [c.name for c in Empleado.__table__.columns if c.name not in ('id', 'version', 'hash_importacion')]
+COLUMNAS_LOG = ['id', 'timestamp', 'usuario', 'empleado_dni', 'accion', 'detalle']
+
+class ErrorApi(Exception):
+    """Error con código HTTP para devolver al cliente"""
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+        self.mensaje = mensaje
+
+def _parametro(params, nombre, defecto=None):
+    valores = params.get(nombre)
+    return valores[0] if valores else defecto
+
+def _limite(params):
+    try:
+        limite = int(_parametro(params, 'limite', LIMITE_POR_DEFECTO))
+    except ValueError:
+        raise ErrorApi(400, "limite debe ser un número entero")
+    return max(1, min(limite, LIMITE_MAXIMO))
+
+def _campos(params, disponibles):
+    """Proyección pedida en ?campos=a,b; por defecto todos"""
+    pedido = _parametro(params, 'campos')
+    if not pedido:
+        return disponibles
+    campos = [c.strip() for c in pedido.split(',') if c.strip()]
+    invalidos = [c for c in campos if c not in disponibles]
+    if invalidos:
+        raise ErrorApi(400, f"Campos desconocidos: {', '.join(invalidos)}")
+    return campos
+
+def _fecha(valor, nombre):
+    try:
+        return datetime.fromisoformat(valor)
+    except ValueError:
+        raise ErrorApi(400, f"{nombre} debe ser una fecha ISO (AAAA-MM-DD)")
+
+def _filtros_empleados(params):
+    filtros = {}
+    for nombre, valores in params.items():
+        if nombre in ('campos', 'limite', 'despues'):
+            continue
+        if nombre not in COLUMNAS_EMPLEADO or nombre == 'campos_personalizados':
+            raise ErrorApi(400, f"Filtro desconocido: {nombre}")
+        valor = valores[0]
+        if isinstance(getattr(Empleado, nombre).type, Boolean):
+            valor = valor.lower() in ('1', 'true', 'si', 'sí')
+        filtros[nombre] = valor
+    return filtros
+
+def _serializar(objeto, campos):
+    return {campo: getattr(objeto, campo) for campo in campos}
+
+def _serializar_log(log, campos):
+    fila = {
+        'id': log.id,
+        'timestamp': log.timestamp,
+        'usuario': log.usuario.usuario if log.usuario else None,
+        'empleado_dni': log.empleado_dni,
+        'accion': log.accion,
+        'detalle': log.detalle
+    }
+    return {campo: fila[campo] for campo in campos}
+
+def _json_default(valor):
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return str(valor)
+
+def consultar_empleados(params):
+    """Página de empleados activos ordenada por DNI"""
+    campos = _campos(params, COLUMNAS_EMPLEADO)
+    limite = _limite(params)
+    # Solo se consultan las columnas pedidas (más el DNI, que hace de cursor)
+    columnas = campos if 'dni' in campos else ['dni'] + campos
+    # Filtros por igualdad: ?estado=activo no debe traer también a los inactivos
+    empleados = listar_empleados_df(columnas, filtros=_filtros_empleados(params),
+                                    despues_dni=_parametro(params, 'despues'), limite=limite, exactos=True)
+    siguiente = empleados['dni'].iloc[-1] if len(empleados) == limite else None
+    empleados = empleados[campos].astype(object).where(empleados[campos].notna(), None)
+    return {'datos': empleados.to_dict('records'), 'siguiente': siguiente}
+
+def consultar_empleado(dni, params):
+    """Un empleado por DNI"""
+    campos = _campos(params, COLUMNAS_EMPLEADO)
+    empleado = obtener_empleado(dni)
+    if not empleado:
+        raise ErrorApi(404, f"No existe un empleado con DNI {dni}")
+    return _serializar(empleado, campos)
+
+def consultar_log(params):
+    """Página del historial de cambios, del más reciente al más antiguo"""
+    campos = _campos(params, COLUMNAS_LOG)
+    limite = _limite(params)
+    filtros = {}
+    if _parametro(params, 'dni'):
+        filtros['empleado_dni'] = _parametro(params, 'dni')
+    if _parametro(params, 'accion'):
+        filtros['accion'] = _parametro(params, 'accion')
+    if _parametro(params, 'usuario_id'):
+        filtros['usuario_id'] = _parametro(params, 'usuario_id')
+    if _parametro(params, 'desde'):
+        filtros['fecha_desde'] = _fecha(_parametro(params, 'desde'), 'desde')
+    if _parametro(params, 'hasta'):
+        filtros['fecha_hasta'] = _fecha(_parametro(params, 'hasta'), 'hasta')
+    antes = _parametro(params, 'antes')
+    try:
+        antes = int(antes) if antes else None
+    except ValueError:
+        raise ErrorApi(400, "antes debe ser un id numérico")
+    logs = obtener_log_cambios(filtros, antes_id=antes, limite=limite)
+    siguiente = logs[-1].id if len(logs) == limite else None
+    return {'datos': [_serializar_log(l, campos) for l in logs], 'siguiente': siguiente}
+
+def resolver(ruta, params):
+    """Devuelve la función que arma la respuesta para la ruta pedida"""
+    partes = [unquote(p) for p in ruta.strip('/').split('/') if p]
+    if partes == ['empleados']:
+        return lambda: consultar_empleados(params)
+    if len(partes) == 2 and partes[0] == 'empleados':
+        return lambda: consultar_empleado(partes[1], params)
+    if partes == ['log']:
+        return lambda: consultar_log(params)
+    raise ErrorApi(404, "Ruta inexistente")
+
+class ManejadorApi(BaseHTTPRequestHandler):
+    server_version = 'PadronAPI/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        try:
+            self._autorizar()
+            url = urlsplit(self.path)
+            consulta = resolver(url.path, parse_qs(url.query))
+            # El ETag depende de la versión de datos y de la consulta exacta (ruta, filtros, proyección, cursor)
+            version = obtener_version_datos()
+            etag = '"' + hashlib.sha1(f"{version}|{self.path}".encode('utf-8')).hexdigest() + '"'
+            if self._coincide_etag(etag):
+                self._responder(304, None, etag)
+                return
+            cuerpo = json.dumps(consulta(), default=_json_default, ensure_ascii=False).encode('utf-8')
+            self._responder(200, cuerpo, etag)
+        except ErrorApi as e:
+            self._responder(e.estado, json.dumps({'error': e.mensaje}, ensure_ascii=False).encode('utf-8'))
+        except Exception:
+            # El detalle (sentencias SQL, datos de conexión) queda en el log del servidor, no en la respuesta
+            logger.exception("Error atendiendo %s", self.path)
+            self._responder(500, json.dumps({'error': "Error interno"}, ensure_ascii=False).encode('utf-8'))
+
+    def _autorizar(self):
+        if not API_TOKEN:
+            return
+        recibido = self.headers.get('Authorization', '')
+        if not hmac.compare_digest(recibido, f"Bearer {API_TOKEN}"):
+            raise ErrorApi(401, "Token inválido")
+
+    def _coincide_etag(self, etag):
+        pedido = self.headers.get('If-None-Match')
+        if not pedido:
+            return False
+        etiquetas = [e.strip().removeprefix('W/') for e in pedido.split(',')]
+        return '*' in etiquetas or etag in etiquetas
+
+    def _responder(self, estado, cuerpo, etag=None):
+        self.send_response(estado)
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        if cuerpo is not None:
+            if len(cuerpo) >= MIN_BYTES_GZIP and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                cuerpo = gzip.compress(cuerpo, compresslevel=5)
+                self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Vary', 'Accept-Encoding')
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo) if cuerpo else 0))
+        self.end_headers()
+        if cuerpo:
+            self.wfile.write(cuerpo)
+
+def servir(host, puerto):
+    """Levanta el servidor de la API (un hilo por conexión)"""
+    servidor = ThreadingHTTPServer((host, puerto), ManejadorApi)
+    print(f"API de solo lectura escuchando en http://{host}:{puerto}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="API HTTP de solo lectura del padrón")
+    parser.add_argument('--host', default=os.environ.get('API_HOST', '127.0.0.1'))
+    parser.add_argument('--puerto', type=int, default=int(os.environ.get('API_PUERTO', '8000')))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    servir(args.host, args.puerto)
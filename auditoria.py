@@ -0,0 +1,47 @@
+from datetime import datetime
+from sqlalchemy import insert
+from db import LogCambio
+
+class RegistroAuditoria:
+    """Acumula las entradas de log_cambios de una transacción y las inserta juntas al confirmar.
+
+    Las entradas se escriben con un único INSERT multi-fila (insertmanyvalues de SQLAlchemy)
+    dentro de la misma transacción que los cambios de empleados, así que se confirman o
+    revierten juntas.
+    """
+
+    def __init__(self, session, usuario_id=None):
+        self.session = session
+        self.usuario_id = usuario_id
+        self.entradas = []
+
+    def registrar(self, empleado_dni, accion, detalle, usuario_id=None):
+        """Agrega una entrada al buffer (no toca la base de datos)"""
+        self.entradas.append({
+            'timestamp': datetime.now(),
+            'usuario_id': usuario_id if usuario_id is not None else self.usuario_id,
+            'empleado_dni': empleado_dni,
+            'accion': accion,
+            'detalle': detalle
+        })
+
+    def volcar(self):
+        """Inserta las entradas pendientes en la transacción actual"""
+        if not self.entradas:
+            return 0
+        # Los empleados nuevos deben existir antes que sus logs (FK sobre empleados.dni)
+        self.session.flush()
+        self.session.execute(insert(LogCambio), self.entradas)
+        cantidad = len(self.entradas)
+        self.entradas = []
+        return cantidad
+
+    def confirmar(self):
+        """Vuelca el buffer y confirma la transacción completa"""
+        self.volcar()
+        self.session.commit()
+
+    def descartar(self):
+        """Descarta el buffer y revierte la transacción"""
+        self.entradas = []
+        self.session.rollback()
@@ -0,0 +1,157 @@
+"""Caché compartida entre procesos de Streamlit para resultados de consultas y DataFrames precalculados.
+
+Por defecto usa un directorio local (CACHE_DIR) que comparten todos los procesos del mismo host.
+Con CACHE_URL=redis://... usa Redis, para varias réplicas detrás de un balanceador.
+Las claves incluyen una generación global: invalidar() la incrementa y todos los procesos
+dejan de ver los valores anteriores.
+"""
+import functools
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+CACHE_URL = os.environ.get('CACHE_URL', '')
+CACHE_DIR = os.environ.get('CACHE_DIR', '.cache_compartido')
+CACHE_TTL = float(os.environ.get('CACHE_TTL_SEGUNDOS', '300'))
+
+class CacheDisco:
+    """Backend local: un archivo pickle por clave y un archivo con la generación actual"""
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        os.makedirs(directorio, exist_ok=True)
+        self._ruta_generacion = os.path.join(directorio, 'generacion')
+        self._escrituras = 0
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, hashlib.sha1(clave.encode('utf-8')).hexdigest() + '.pkl')
+
+    def obtener(self, clave):
+        try:
+            with open(self._ruta(clave), 'rb') as f:
+                expira, valor = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return False, None
+        if expira < time.time():
+            return False, None
+        return True, valor
+
+    def guardar(self, clave, valor, ttl):
+        ruta = self._ruta(clave)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, 'wb') as f:
+            pickle.dump((time.time() + ttl, valor), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporal, ruta)
+        self._escrituras += 1
+        if self._escrituras % 100 == 0:
+            self.purgar()
+
+    def purgar(self):
+        """Borra las entradas vencidas"""
+        ahora = time.time()
+        for nombre in os.listdir(self.directorio):
+            if not nombre.endswith('.pkl'):
+                continue
+            ruta = os.path.join(self.directorio, nombre)
+            try:
+                with open(ruta, 'rb') as f:
+                    expira, _ = pickle.load(f)
+                if expira < ahora:
+                    os.remove(ruta)
+            except Exception:
+                pass
+
+    def generacion(self):
+        try:
+            with open(self._ruta_generacion) as f:
+                return int(f.read() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def incrementar_generacion(self):
+        with open(self._ruta_generacion + '.lock', 'w') as bloqueo:
+            if fcntl:
+                fcntl.flock(bloqueo, fcntl.LOCK_EX)
+            nueva = self.generacion() + 1
+            temporal = f"{self._ruta_generacion}.{os.getpid()}.tmp"
+            with open(temporal, 'w') as f:
+                f.write(str(nueva))
+            os.replace(temporal, self._ruta_generacion)
+            if fcntl:
+                fcntl.flock(bloqueo, fcntl.LOCK_UN)
+        return nueva
+
+class CacheRedis:
+    """Backend de red: mismas operaciones sobre Redis (o cualquier servidor compatible)"""
+
+    def __init__(self, url):
+        import redis
+        self.cliente = redis.Redis.from_url(url)
+        self.prefijo = 'padron:'
+
+    def obtener(self, clave):
+        valor = self.cliente.get(self.prefijo + clave)
+        if valor is None:
+            return False, None
+        return True, pickle.loads(valor)
+
+    def guardar(self, clave, valor, ttl):
+        self.cliente.set(self.prefijo + clave, pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL), ex=max(int(ttl), 1))
+
+    def generacion(self):
+        return int(self.cliente.get(self.prefijo + 'generacion') or 0)
+
+    def incrementar_generacion(self):
+        return self.cliente.incr(self.prefijo + 'generacion')
+
+_backend = {'instancia': None}
+_backend_lock = threading.Lock()
+
+def backend():
+    """Backend configurado (se crea una vez por proceso)"""
+    with _backend_lock:
+        if _backend['instancia'] is None:
+            if CACHE_URL.startswith(('redis://', 'rediss://', 'unix://')):
+                _backend['instancia'] = CacheRedis(CACHE_URL)
+            else:
+                _backend['instancia'] = CacheDisco(CACHE_DIR)
+        return _backend['instancia']
+
+def invalidar():
+    """Señal de invalidación para todos los procesos: incrementa la generación global"""
+    try:
+        return backend().incrementar_generacion()
+    except Exception as e:
+        print(f"No se pudo invalidar la caché compartida: {e}")
+
+def cacheado(ttl=None):
+    """Decorador: cachea el resultado en el backend compartido según nombre de la función y argumentos"""
+    def decorador(funcion):
+        nombre = f"{funcion.__module__}.{funcion.__qualname__}"
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            try:
+                cache = backend()
+                clave = f"{nombre}:{cache.generacion()}:{args!r}:{sorted(kwargs.items())!r}"
+                encontrado, valor = cache.obtener(clave)
+            except Exception as e:
+                print(f"Caché compartida no disponible: {e}")
+                return funcion(*args, **kwargs)
+            if encontrado:
+                return valor
+            valor = funcion(*args, **kwargs)
+            try:
+                cache.guardar(clave, valor, CACHE_TTL if ttl is None else ttl)
+            except Exception as e:
+                print(f"No se pudo guardar en la caché compartida: {e}")
+            return valor
+        return envoltura
+    return decorador
@@ -0,0 +1,151 @@
+"""Control de calidad del padrón completo: reglas de DNI, email, teléfono, obligatorios y fechas.
+
+Recorre la tabla empleados por lotes (paginación por id, sin OFFSET) y aplica cada regla
+vectorizada con pandas sobre el lote, así la memoria no depende del tamaño del padrón.
+Pensado para correr de noche:
+
+    python calidad_datos.py --lote 50000 --ejemplos 10 -o calidad.csv
+"""
+from datetime import datetime
+import argparse
+import os
+import time
+import pandas as pd
+from sqlalchemy import exists
+from db import get_read_session, Empleado, LogCambio
+from utils import dnis_validos, emails_validos, telefonos_validos
+
+TAMANO_LOTE = int(os.environ.get('CALIDAD_TAMANO_LOTE', '50000'))
+MAX_EJEMPLOS = 5
+FECHA_INGRESO_MINIMA = pd.Timestamp('1950-01-01')
+ESTADOS_VALIDOS = ['activo', 'inactivo']
+
+COLUMNAS = [
+    'id', 'dni', 'nombre', 'apellido', 'skill', 'email', 'telefono', 'estado',
+    'fecha_ingreso', 'fecha_creacion', 'fecha_actualizacion'
+]
+
+def _vacio(serie):
+    return serie.isna() | (serie.astype(str).str.strip() == '')
+
+# Mismas reglas que el formulario de ui_abm (predicados de utils), expresadas sobre columnas enteras
+REGLAS = {
+    'dni_invalido': (
+        "DNI sin 7 u 8 dígitos numéricos",
+        lambda df, ahora: ~dnis_validos(df['dni'])
+    ),
+    'nombre_vacio': ("Nombre vacío", lambda df, ahora: _vacio(df['nombre'])),
+    'apellido_vacio': ("Apellido vacío", lambda df, ahora: _vacio(df['apellido'])),
+    'skill_vacio': ("Skill vacío", lambda df, ahora: _vacio(df['skill'])),
+    'email_invalido': ("Email informado sin @", lambda df, ahora: ~emails_validos(df['email'])),
+    'telefono_invalido': (
+        "Teléfono con caracteres distintos de números, +, - o espacios",
+        lambda df, ahora: ~telefonos_validos(df['telefono'])
+    ),
+    'estado_invalido': (
+        f"Estado distinto de {' / '.join(ESTADOS_VALIDOS)}",
+        lambda df, ahora: ~df['estado'].isin(ESTADOS_VALIDOS)
+    ),
+    'fecha_ingreso_faltante': ("Sin fecha de ingreso", lambda df, ahora: df['fecha_ingreso'].isna()),
+    'fecha_ingreso_futura': ("Fecha de ingreso posterior a hoy", lambda df, ahora: df['fecha_ingreso'] > ahora),
+    'fecha_ingreso_antigua': (
+        f"Fecha de ingreso anterior a {FECHA_INGRESO_MINIMA.year}",
+        lambda df, ahora: df['fecha_ingreso'] < FECHA_INGRESO_MINIMA
+    ),
+    'fecha_actualizacion_anterior': (
+        "Fecha de actualización anterior a la de creación",
+        lambda df, ahora: df['fecha_actualizacion'] < df['fecha_creacion']
+    ),
+}
+
+def _lotes(session, tamano_lote):
+    """Genera DataFrames de empleados de a `tamano_lote` filas, ordenados por id"""
+    columnas = [getattr(Empleado, c) for c in COLUMNAS]
+    ultimo_id = 0
+    while True:
+        filas = (
+            session.query(*columnas)
+            .filter(Empleado.id > ultimo_id)
+            .order_by(Empleado.id)
+            .limit(tamano_lote)
+            .all()
+        )
+        if not filas:
+            return
+        df = pd.DataFrame(filas, columns=COLUMNAS)
+        for columna in ('fecha_ingreso', 'fecha_creacion', 'fecha_actualizacion'):
+            df[columna] = pd.to_datetime(df[columna], errors='coerce')
+        yield df
+        ultimo_id = int(df['id'].iloc[-1])
+
+def _logs_huerfanos(session, max_ejemplos):
+    """Entradas de log_cambios cuyo empleado_dni ya no existe en empleados"""
+    huerfano = (
+        LogCambio.empleado_dni.isnot(None),
+        ~exists().where(Empleado.dni == LogCambio.empleado_dni)
+    )
+    cantidad = session.query(LogCambio.id).filter(*huerfano).count()
+    ejemplos = [
+        dni for dni, in session.query(LogCambio.empleado_dni).filter(*huerfano).distinct().limit(max_ejemplos)
+    ] if cantidad else []
+    return cantidad, ejemplos
+
+def escanear_calidad(tamano_lote=TAMANO_LOTE, max_ejemplos=MAX_EJEMPLOS):
+    """Aplica todas las reglas al padrón completo.
+
+    Devuelve un DataFrame con una fila por regla (incluidas las que no tienen violaciones),
+    la cantidad de filas que la violan y hasta `max_ejemplos` DNIs de ejemplo.
+    """
+    ahora = pd.Timestamp(datetime.now())
+    cantidades = {regla: 0 for regla in REGLAS}
+    ejemplos = {regla: [] for regla in REGLAS}
+    revisados = 0
+    session = get_read_session()
+    try:
+        for df in _lotes(session, tamano_lote):
+            revisados += len(df)
+            for regla, (_, violada) in REGLAS.items():
+                mascara = violada(df, ahora).fillna(False).astype(bool)
+                cantidades[regla] += int(mascara.sum())
+                faltan = max_ejemplos - len(ejemplos[regla])
+                if faltan > 0 and mascara.any():
+                    ejemplos[regla].extend(df.loc[mascara, 'dni'].head(faltan).astype(str).tolist())
+        huerfanos, ejemplos_huerfanos = _logs_huerfanos(session, max_ejemplos)
+    finally:
+        session.close()
+
+    filas = [
+        {
+            'Regla': regla,
+            'Descripción': descripcion,
+            'Cantidad': cantidades[regla],
+            'Porcentaje': round(100 * cantidades[regla] / revisados, 2) if revisados else 0.0,
+            'Ejemplos': ", ".join(ejemplos[regla])
+        }
+        for regla, (descripcion, _) in REGLAS.items()
+    ]
+    filas.append({
+        'Regla': 'log_huerfano',
+        'Descripción': "Entradas del historial con un DNI que no existe en empleados",
+        'Cantidad': huerfanos,
+        'Porcentaje': None,
+        'Ejemplos': ", ".join(ejemplos_huerfanos)
+    })
+    reporte = pd.DataFrame(filas, columns=['Regla', 'Descripción', 'Cantidad', 'Porcentaje', 'Ejemplos'])
+    reporte.attrs['revisados'] = revisados
+    return reporte
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Control de calidad de datos del padrón")
+    parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help="Empleados leídos por consulta")
+    parser.add_argument('--ejemplos', type=int, default=MAX_EJEMPLOS, help="DNIs de ejemplo por regla")
+    parser.add_argument('-o', '--salida', help="Archivo CSV donde guardar el reporte")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    reporte = escanear_calidad(args.lote, args.ejemplos)
+    print(reporte.to_string(index=False))
+    print(f"{reporte.attrs['revisados']} empleados revisados en {time.perf_counter() - inicio:.1f} s")
+    if args.salida:
+        reporte.to_csv(args.salida, index=False)
+        print(f"Reporte guardado en {args.salida}")
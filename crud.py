@@ -1,8 +1,30 @@
-from db import get_session, Empleado, LogCambio
+from db import get_session, get_read_session, registrar_escritura, Empleado, LogCambio, Usuario, FilaCuarentena, EMPLEADO_ACTIVO
+from auditoria import RegistroAuditoria
+import indice_dni
+import resumen
 from datetime import datetime
+from collections import Counter
 import pandas as pd
-from sqlalchemy import String, Boolean, Integer
+from sqlalchemy import String, Boolean, Integer, Text, func, text, cast, literal, literal_column, type_coerce
+from sqlalchemy import Table, MetaData, Column, DateTime, select, exists, insert, update, case, and_, or_, true
+from sqlalchemy.dialects.postgresql import JSONB, JSONPATH
 from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.exc import StaleDataError
+import json
+import re
+import threading
+import time
+from utils import normalizar_texto, valores_iguales
+
+def _sincronizar_indice_dni(agregados=(), quitados=()):
+    """Mantiene al día el índice de DNIs después de confirmar; un fallo del índice no afecta la escritura"""
+    try:
+        if agregados:
+            indice_dni.agregar(*agregados)
+        if quitados:
+            indice_dni.quitar(*quitados)
+    except Exception as e:
+        print(f"No se pudo actualizar el índice de DNIs: {e}")
 
 def crear_empleado(
     dni, nombre, apellido, fecha_ingreso, estado, skill, es_lider, usuario_id,
@@ -12,6 +34,7 @@ def crear_empleado(
 ):
     """Crea un nuevo empleado y registra el cambio en el log"""
     session = get_session()
+    auditoria = RegistroAuditoria(session, usuario_id)
     try:
         empleado = Empleado(
             dni=dni,
@@ -33,51 +56,61 @@ def crear_empleado(
             campos_personalizados=campos_personalizados
         )
         session.add(empleado)
+        resumen.aplicar(session, resumen.contribucion(empleado))
         
         # Registrar en log
-        log = LogCambio(
-            usuario_id=usuario_id,
-            empleado_dni=dni,
-            accion='alta',
-            detalle=f"Alta de empleado: {nombre} {apellido}"
-        )
-        session.add(log)
+        auditoria.registrar(dni, 'alta', f"Alta de empleado: {nombre} {apellido}")
+        resumen.marcar_version(session)
         
-        session.commit()
+        auditoria.confirmar()
+        registrar_escritura()
+        _sincronizar_indice_dni(agregados=[dni])
         return True
     except Exception as e:
-        session.rollback()
+        auditoria.descartar()
         raise e
     finally:
         session.close()
 
-def actualizar_empleado(dni, datos, usuario_id):
-    """Actualiza los datos de un empleado y registra los cambios"""
+def actualizar_empleado(dni, datos, usuario_id, version=None):
+    """Actualiza los datos de un empleado y registra los cambios.
+
+    Si no hay cambios reales no escribe nada. Si se indica la versión leída por el editor y otro
+    usuario guardó antes, no sobreescribe y devuelve "conflicto".
+    """
     session = get_session()
+    auditoria = RegistroAuditoria(session, usuario_id)
     try:
         empleado = session.query(Empleado).filter_by(dni=dni).first()
         if not empleado:
             return False
+        if version is not None and empleado.version != version:
+            return "conflicto"
             
+        antes = resumen.contribucion(empleado)
         cambios = []
         for key, value in datos.items():
-            if hasattr(empleado, key) and getattr(empleado, key) != value:
+            if hasattr(empleado, key) and not valores_iguales(getattr(empleado, key), value):
                 cambios.append(f"{key}: {getattr(empleado, key)} -> {value}")
                 setattr(empleado, key, value)
         
-        if cambios:
-            log = LogCambio(
-                usuario_id=usuario_id,
-                empleado_dni=dni,
-                accion='modificacion',
-                detalle="Cambios: " + ", ".join(cambios)
-            )
-            session.add(log)
-            
-        session.commit()
+        if not cambios:
+            return True
+        
+        # Editado a mano: la próxima importación debe volver a comparar esta fila
+        empleado.hash_importacion = None
+        resumen.aplicar(session, resumen.diferencia(antes, resumen.contribucion(empleado)))
+        auditoria.registrar(dni, 'modificacion', "Cambios: " + ", ".join(cambios))
+        resumen.marcar_version(session)
+        # El UPDATE lleva "WHERE version = <leída>"; si otro lo modificó en el medio falla con StaleDataError
+        auditoria.confirmar()
+        registrar_escritura()
         return True
+    except StaleDataError:
+        auditoria.descartar()
+        return "conflicto"
     except Exception as e:
-        session.rollback()
+        auditoria.descartar()
         raise e
     finally:
         session.close()
@@ -89,16 +122,22 @@ def eliminar_empleado(dni, usuario_id):
         empleado = session.query(Empleado).filter_by(dni=dni).first()
         if not empleado:
             return False
+        resumen.aplicar(session, resumen.diferencia(resumen.contribucion(empleado), {}))
         # Verificar si tiene logs asociados
         logs = session.query(LogCambio).filter_by(empleado_dni=dni).count()
         if logs > 0:
             # No eliminar, solo marcar como inactivo
             empleado.activo = False
+            resumen.marcar_version(session)
             session.commit()
+            registrar_escritura()
             return "inactivo"
         else:
             session.delete(empleado)
+            resumen.marcar_version(session)
             session.commit()
+            registrar_escritura()
+            _sincronizar_indice_dni(quitados=[dni])
             return True
     except Exception as e:
         session.rollback()
@@ -106,122 +145,635 @@ def eliminar_empleado(dni, usuario_id):
     finally:
         session.close()
 
+def fusionar_empleados(dni_superviviente, dni_duplicado, usuario_id):
+    """Fusiona un empleado duplicado en el superviviente: completa sus campos vacíos,
+    traslada el historial del duplicado y elimina el registro duplicado"""
+    session = get_session()
+    auditoria = RegistroAuditoria(session, usuario_id)
+    try:
+        superviviente = session.query(Empleado).filter_by(dni=dni_superviviente).first()
+        duplicado = session.query(Empleado).filter_by(dni=dni_duplicado).first()
+        if not superviviente or not duplicado or superviviente.id == duplicado.id:
+            return False
+        antes = resumen.contribucion(superviviente) + resumen.contribucion(duplicado)
+        completados = []
+        for columna in Empleado.__table__.columns.keys():
+            if columna in ('id', 'dni', 'fecha_creacion', 'fecha_actualizacion', 'activo', 'hash_importacion'):
+                continue
+            if getattr(superviviente, columna) in (None, '') and getattr(duplicado, columna) not in (None, ''):
+                setattr(superviviente, columna, getattr(duplicado, columna))
+                completados.append(columna)
+        if completados:
+            superviviente.hash_importacion = None
+        # Trasladar el historial antes de borrar el duplicado (FK sobre empleados.dni)
+        movidos = session.query(LogCambio).filter_by(empleado_dni=dni_duplicado).update(
+            {LogCambio.empleado_dni: dni_superviviente}, synchronize_session=False
+        )
+        session.flush()
+        session.delete(duplicado)
+        resumen.aplicar(session, resumen.diferencia(antes, resumen.contribucion(superviviente)))
+        detalle = f"Fusión de duplicado DNI {dni_duplicado}: {movidos} cambios trasladados"
+        if completados:
+            detalle += f", campos completados: {', '.join(completados)}"
+        auditoria.registrar(dni_superviviente, 'modificacion', detalle)
+        resumen.marcar_version(session)
+        auditoria.confirmar()
+        registrar_escritura()
+        _sincronizar_indice_dni(quitados=[dni_duplicado])
+        return True
+    except Exception as e:
+        auditoria.descartar()
+        raise e
+    finally:
+        session.close()
+
 def obtener_empleado(dni):
     """Obtiene los datos de un empleado por DNI"""
-    session = get_session()
+    session = get_read_session()
     try:
         return session.query(Empleado).filter_by(dni=dni).first()
     finally:
         session.close()
 
-def listar_empleados(filtros=None):
-    """Lista todos los empleados con filtros opcionales"""
+def dnis_existentes(dnis):
+    """Subconjunto de los DNIs dados que existe en empleados, en una sola consulta"""
+    dnis = list(dict.fromkeys(dnis))
+    if not dnis:
+        return set()
+    session = get_read_session()
+    try:
+        return {dni for dni, in session.query(Empleado.dni).filter(Empleado.dni.in_(dnis))}
+    finally:
+        session.close()
+
+# Campos personalizados promovidos a columnas generadas indexadas: nombre del campo -> columna
+_CAMPOS_PROMOVIDOS_TTL = 60
+_campos_promovidos = {'valor': None, 'leido': 0.0}
+_campos_promovidos_lock = threading.Lock()
+
+def campos_promovidos():
+    """Devuelve {nombre de campo: columna} de los campos personalizados promovidos (cacheado unos segundos)"""
+    with _campos_promovidos_lock:
+        if _campos_promovidos['valor'] is not None and time.time() - _campos_promovidos['leido'] < _CAMPOS_PROMOVIDOS_TTL:
+            return _campos_promovidos['valor']
+        session = get_read_session()
+        try:
+            if session.get_bind().dialect.name != 'postgresql':
+                return {}
+            filas = session.execute(text("""
+                SELECT a.attname, col_description(a.attrelid, a.attnum)
+                FROM pg_attribute a
+                WHERE a.attrelid = 'empleados'::regclass AND a.attname LIKE 'cp\\_%' AND NOT a.attisdropped
+            """)).fetchall()
+        finally:
+            session.close()
+        _campos_promovidos['valor'] = {comentario: columna for columna, comentario in filas if comentario}
+        _campos_promovidos['leido'] = time.time()
+        return _campos_promovidos['valor']
+
+def _valor_campo_personalizado(nombre):
+    """Expresión SQL con el valor (texto) de un campo personalizado, usando la columna promovida si existe"""
+    promovidos = campos_promovidos()
+    if nombre in promovidos:
+        return literal_column(f'empleados."{promovidos[nombre]}"', Text)
+    return func.jsonb_path_query_first(
+        type_coerce(Empleado.campos_personalizados, JSONB),
+        cast(literal('$[*] ? (@.nombre == $k).valor'), JSONPATH),
+        func.jsonb_build_object('k', nombre)
+    ).op('#>>', return_type=Text)(literal('{}'))
+
+def _texto_campo(valor):
+    """Valor de un campo personalizado como lo devuelve #>> '{}' (texto del JSON): 5 -> '5', True -> 'true'"""
+    return valor if isinstance(valor, str) else json.dumps(valor)
+
+def _columna_para_campo(session, nombre, slug):
+    """Columna cp_<slug> libre o ya asignada a este campo; si otro campo normaliza al mismo slug
+    ("Centro Costo" y "centro-costo") se agrega un sufijo numérico en lugar de pisar su columna"""
+    existentes = dict(session.execute(text("""
+        SELECT a.attname, col_description(a.attrelid, a.attnum)
+        FROM pg_attribute a
+        WHERE a.attrelid = 'empleados'::regclass AND a.attname LIKE :patron AND NOT a.attisdropped
+    """), {'patron': f"cp\\_{slug}%"}).fetchall())
+    columna, sufijo = f"cp_{slug}", 2
+    while columna in existentes and existentes[columna] != nombre:
+        columna, sufijo = f"cp_{slug}_{sufijo}", sufijo + 1
+    return columna
+
+def promover_campo_personalizado(nombre):
+    """Promueve un campo personalizado a columna generada con índice propio para filtrarlo y ordenarlo rápido"""
+    slug = re.sub(r'[^a-z0-9]+', '_', normalizar_texto(nombre.strip())).strip('_')[:50]
+    if not slug:
+        raise ValueError("Nombre de campo inválido")
     session = get_session()
     try:
-        query = session.query(Empleado).filter_by(activo=True)
-        
-        if filtros:
-            for key, value in filtros.items():
-                if value is not None and value != "":
-                    column = getattr(Empleado, key)
-                    # Si el campo es DNI, usar búsqueda exacta
-                    if key == 'dni':
-                        query = query.filter(column == value)
-                    # Si el campo es string, usar ilike
-                    elif isinstance(column.type, String):
-                        query = query.filter(column.ilike(f"%{value}%"))
-                    # Si el campo es booleano, comparar directamente
-                    elif isinstance(column.type, Boolean):
-                        query = query.filter(column == value)
-                    # Si el campo es numérico, comparar directamente
-                    elif isinstance(column.type, Integer):
-                        query = query.filter(column == value)
-                    else:
-                        query = query.filter(column == value)
-        
+        columna = _columna_para_campo(session, nombre, slug)
+        # El servidor no acepta parámetros en DDL; psycopg2 los interpola del lado cliente con el escape correcto
+        conexion = session.connection()
+        conexion.exec_driver_sql(f"""
+            ALTER TABLE empleados ADD COLUMN IF NOT EXISTS "{columna}" TEXT
+            GENERATED ALWAYS AS (
+                jsonb_path_query_first(campos_personalizados, '$[*] ? (@.nombre == $k).valor', %(variables)s::jsonb) #>> '{{}}'
+            ) STORED
+        """, {'variables': json.dumps({'k': nombre})})
+        conexion.exec_driver_sql(f'COMMENT ON COLUMN empleados."{columna}" IS %(nombre)s', {'nombre': nombre})
+        conexion.exec_driver_sql(f'CREATE INDEX IF NOT EXISTS "ix_empleados_{columna}" ON empleados ("{columna}")')
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+    with _campos_promovidos_lock:
+        _campos_promovidos['valor'] = None
+    return columna
+
+def _filtrar_empleados(query, filtros=None, campos_personalizados=None, ordenar_por=None, descendente=False,
+                       despues_dni=None, limite=None, exactos=False):
+    """Aplica a una consulta sobre Empleado los filtros, el orden y la paginación de listar_empleados"""
+    query = query.filter(EMPLEADO_ACTIVO)
+
+    if campos_personalizados:
+        promovidos = campos_promovidos()
+        for nombre, valor in campos_personalizados.items():
+            if nombre in promovidos and valor is not None:
+                query = query.filter(_valor_campo_personalizado(nombre) == _texto_campo(valor))
+                continue
+            # La contención usa el índice GIN; el valor se compara como texto, igual que en la columna
+            # promovida, para que 5, "5" y true/"true" den el mismo resultado estén o no promovidos
+            query = query.filter(type_coerce(Empleado.campos_personalizados, JSONB).contains([{'nombre': nombre}]))
+            if valor is not None:
+                query = query.filter(_valor_campo_personalizado(nombre) == _texto_campo(valor))
+
+    if ordenar_por:
+        if ordenar_por.startswith('campo:'):
+            orden = _valor_campo_personalizado(ordenar_por[len('campo:'):])
+        else:
+            orden = getattr(Empleado, ordenar_por)
+        query = query.order_by(orden.desc().nulls_last() if descendente else orden.asc().nulls_last())
+
+    if filtros:
+        for key, value in filtros.items():
+            if value is not None and value != "":
+                column = getattr(Empleado, key)
+                # Si el campo es DNI o se pidieron filtros exactos (API), usar búsqueda exacta
+                if key == 'dni' or exactos:
+                    query = query.filter(column == value)
+                # Si el campo es string, usar ilike
+                elif isinstance(column.type, String):
+                    query = query.filter(column.ilike(f"%{value}%"))
+                # Si el campo es booleano, comparar directamente
+                elif isinstance(column.type, Boolean):
+                    query = query.filter(column == value)
+                # Si el campo es numérico, comparar directamente
+                elif isinstance(column.type, Integer):
+                    query = query.filter(column == value)
+                else:
+                    query = query.filter(column == value)
+
+    if limite is not None:
+        if despues_dni is not None:
+            query = query.filter(Empleado.dni > despues_dni)
+        query = query.order_by(Empleado.dni).limit(limite)
+
+    return query
+
+def listar_empleados(filtros=None, campos_personalizados=None, ordenar_por=None, descendente=False,
+                     despues_dni=None, limite=None, exactos=False):
+    """Lista todos los empleados con filtros opcionales.
+
+    campos_personalizados filtra por {nombre: valor} (valor None = solo que el campo exista) usando
+    contención JSONB, que aprovecha el índice GIN. ordenar_por acepta una columna o 'campo:<nombre>'.
+    Con limite se pagina por DNI (keyset): la página siguiente se pide con despues_dni = último DNI recibido.
+    Los filtros de texto buscan por subcadena (buscador del ABM); con exactos=True comparan por igualdad.
+    """
+    session = get_read_session()
+    try:
+        query = _filtrar_empleados(session.query(Empleado), filtros, campos_personalizados, ordenar_por,
+                                   descendente, despues_dni, limite, exactos)
         return query.all()
     finally:
         session.close()
 
-def importar_empleados(df, usuario_id):
-    """Importa empleados desde un DataFrame de forma inteligente: actualiza solo campos no vacíos y diferentes, no sobreescribe con blancos, crea nuevos si no existen."""
+def listar_empleados_df(columnas, filtros=None, campos_personalizados=None, ordenar_por=None, descendente=False,
+                        despues_dni=None, limite=None, exactos=False):
+    """Proyección liviana: trae solo las columnas pedidas y las devuelve como DataFrame.
+
+    No arma entidades ORM ni pasa por el identity map, y las columnas pesadas (campos_personalizados,
+    usuario_*) solo viajan si se piden. Acepta los mismos filtros que listar_empleados.
+    """
+    desconocidas = [c for c in columnas if c not in Empleado.__table__.columns]
+    if desconocidas:
+        raise ValueError(f"Columnas desconocidas: {', '.join(desconocidas)}")
+    session = get_read_session()
+    try:
+        query = _filtrar_empleados(session.query(Empleado), filtros, campos_personalizados, ordenar_por,
+                                   descendente, despues_dni, limite, exactos)
+        filas = query.with_entities(*[Empleado.__table__.c[c] for c in columnas]).all()
+        return pd.DataFrame.from_records(filas, columns=list(columnas))
+    finally:
+        session.close()
+
+CAMPOS_IMPORTACION = ['dni', 'nombre', 'apellido', 'fecha_ingreso', 'estado', 'skill', 'es_lider']
+
+def hash_filas(df):
+    """Hash del contenido normalizado de cada fila importable (estable entre procesos y ejecuciones)"""
+    normalizado = pd.DataFrame({
+        campo: (df[campo].astype('string').str.strip().fillna('') if campo in df else '')
+        for campo in CAMPOS_IMPORTACION
+    }, index=df.index)
+    return pd.util.hash_pandas_object(normalizado, index=False).map('{:016x}'.format)
+
+# Filas por savepoint: si un savepoint falla solo se reintentan (de a una) sus filas
+FILAS_POR_SAVEPOINT = 100
+
+def _motivo_error(error):
+    """Primera línea del error de la base (sin la sentencia SQL) para guardar en cuarentena"""
+    original = getattr(error, 'orig', None) or error
+    texto = str(original).strip().splitlines()
+    return f"{type(original).__name__}: {texto[0] if texto else ''}"[:300]
+
+def importar_empleados(df, usuario_id, trabajo_id=None):
+    """Importa empleados desde un DataFrame de forma inteligente: actualiza solo campos no vacíos y diferentes, no sobreescribe con blancos, crea nuevos si no existen.
+    Las filas idénticas a la última importación de ese empleado (mismo hash) se saltean sin compararlas.
+    Si un DNI se repite en el archivo gana la última fila: las anteriores se cuentan como omitidas.
+
+    Las filas se aplican por DNI ascendente en savepoints de FILAS_POR_SAVEPOINT. Si un savepoint falla
+    (DNI dado de alta por otra importación concurrente, empleado modificado por otro usuario, dato inválido)
+    se revierte solo ese savepoint y sus filas se reintentan de a una releyendo el empleado; las que vuelven
+    a fallar quedan en cuarentena_importacion con el motivo y el resto se confirma igual.
+    Devuelve un diccionario con la cantidad de empleados nuevos, actualizados, sin cambios, filas omitidas y en cuarentena."""
+    session = get_session()
+    # Los logs de todo el lote se insertan juntos al confirmar
+    auditoria = RegistroAuditoria(session, usuario_id)
+    estadisticas = {'nuevos': 0, 'actualizados': 0, 'sin_cambios': 0, 'omitidos': 0, 'cuarentena': 0}
+    dnis_nuevos = []
+    delta_resumen = Counter()
+    cuarentena = []
+    try:
+        dnis = df['dni'].astype('string').str.strip() if 'dni' in df else pd.Series(pd.NA, index=df.index, dtype='string')
+        # Se descartan antes de comparar hashes: si no, cada repetida anterior difiere del hash de la última
+        # guardado y se vuelve a aplicar en cada reimportación del mismo archivo
+        reemplazadas = (dnis.notna() & (dnis != '') & dnis.duplicated(keep='last')).to_numpy(bool)
+        estadisticas['omitidos'] += int(reemplazadas.sum())
+        df, dnis = df[~reemplazadas], dnis[~reemplazadas]
+        hashes = hash_filas(df)
+        # Un solo SELECT por lote: hashes guardados para descartar filas sin cambios
+        guardados = dict(
+            session.query(Empleado.dni, Empleado.hash_importacion)
+            .filter(Empleado.dni.in_(dnis.dropna().unique().tolist()))
+        )
+        repetidas = (dnis.map(guardados) == hashes).fillna(False).to_numpy(bool)
+        estadisticas['sin_cambios'] += int(repetidas.sum())
+        sin_dni = (dnis.isna() | (dnis == '')).to_numpy(bool)
+        estadisticas['omitidos'] += int((sin_dni & ~repetidas).sum())  # Saltar filas sin DNI
+        # Orden por DNI: las importaciones concurrentes bloquean filas en el mismo orden (sin deadlocks)
+        pendientes = df.loc[dnis[~repetidas & ~sin_dni].sort_values(kind='stable').index]
+        # None = se sabe que no existe; un DNI ausente del diccionario se relee de la base
+        empleados = dict.fromkeys(dnis[pendientes.index].unique().tolist())
+        empleados.update({
+            e.dni: e for e in session.query(Empleado).filter(Empleado.dni.in_(list(empleados)))
+        })
+
+        def aplicar(filas):
+            """Aplica filas dentro de un savepoint; solo si confirma se suman sus estadísticas y logs"""
+            parcial, delta, nuevos, logs = Counter(), Counter(), [], []
+            try:
+                with session.begin_nested():
+                    for indice, row in filas:
+                        dni = dnis[indice]
+                        if dni not in empleados:
+                            empleados[dni] = session.query(Empleado).filter_by(dni=dni).first()
+                        empleado = empleados[dni]
+                        datos = {}
+                        for campo in ['nombre', 'apellido', 'fecha_ingreso', 'estado', 'skill', 'es_lider']:
+                            if campo in row and pd.notna(row[campo]) and str(row[campo]).strip() != '':
+                                datos[campo] = row[campo]
+                        if empleado:
+                            antes = resumen.contribucion(empleado)
+                            cambios = []
+                            for key, value in datos.items():
+                                # Convertir fecha si es necesario
+                                if key == 'fecha_ingreso':
+                                    value = pd.to_datetime(value)
+                                # Solo actualizar si es diferente y no es blanco
+                                if hasattr(empleado, key) and not valores_iguales(getattr(empleado, key), value):
+                                    cambios.append(f"{key}: {getattr(empleado, key)} -> {value}")
+                                    setattr(empleado, key, value)
+                            if cambios:
+                                delta.update(resumen.diferencia(antes, resumen.contribucion(empleado)))
+                                logs.append((dni, 'modificacion', "Importación: " + ", ".join(cambios)))
+                                parcial['actualizados'] += 1
+                            else:
+                                parcial['sin_cambios'] += 1
+                            empleado.hash_importacion = hashes[indice]
+                        else:
+                            # Crear nuevo empleado solo con los campos presentes
+                            empleado_nuevo = Empleado(
+                                dni=dni,
+                                nombre=str(datos.get('nombre', '')).strip(),
+                                apellido=str(datos.get('apellido', '')).strip(),
+                                fecha_ingreso=pd.to_datetime(datos['fecha_ingreso']) if 'fecha_ingreso' in datos else None,
+                                estado=str(datos.get('estado', 'activo')).strip(),
+                                skill=str(datos.get('skill', '')).strip(),
+                                es_lider=datos.get('es_lider', False),
+                                hash_importacion=hashes[indice]
+                            )
+                            session.add(empleado_nuevo)
+                            empleados[dni] = empleado_nuevo
+                            delta.update(resumen.contribucion(empleado_nuevo))
+                            logs.append((dni, 'alta', f"Importación masiva: {datos.get('nombre', '')} {datos.get('apellido', '')}"))
+                            parcial['nuevos'] += 1
+                            nuevos.append(dni)
+            except Exception:
+                # Los objetos del savepoint revertido ya no reflejan la base: se releen al reintentar
+                for indice, _ in filas:
+                    empleados.pop(dnis[indice], None)
+                raise
+            for key, value in parcial.items():
+                estadisticas[key] += value
+            delta_resumen.update(delta)
+            dnis_nuevos.extend(nuevos)
+            for dni, accion, detalle in logs:
+                auditoria.registrar(dni, accion, detalle)
+
+        filas = list(pendientes.iterrows())
+        for desde in range(0, len(filas), FILAS_POR_SAVEPOINT):
+            bloque = filas[desde:desde + FILAS_POR_SAVEPOINT]
+            try:
+                aplicar(bloque)
+            except Exception:
+                for indice, row in bloque:
+                    try:
+                        aplicar([(indice, row)])
+                    except Exception as e:
+                        cuarentena.append({
+                            'trabajo_id': trabajo_id,
+                            'usuario_id': usuario_id,
+                            'dni': dnis[indice],
+                            'fila': json.loads(row.to_json(date_format='iso', default_handler=str)),
+                            'motivo': _motivo_error(e),
+                            'fecha': datetime.now()
+                        })
+        if cuarentena:
+            session.execute(insert(FilaCuarentena), cuarentena)
+            estadisticas['cuarentena'] = len(cuarentena)
+        # Un solo upsert por contador para todo el lote
+        resumen.aplicar(session, {clave: valor for clave, valor in delta_resumen.items() if valor})
+        if estadisticas['nuevos'] or estadisticas['actualizados']:
+            resumen.marcar_version(session)
+        auditoria.confirmar()
+        registrar_escritura()
+        _sincronizar_indice_dni(agregados=dnis_nuevos)
+        return estadisticas
+    except Exception as e:
+        auditoria.descartar()
+        raise e
+    finally:
+        session.close()
+
+def listar_cuarentena(trabajo_id=None, limite=None):
+    """Filas de importación que quedaron en cuarentena, de la más reciente a la más antigua"""
+    session = get_read_session()
+    try:
+        query = session.query(FilaCuarentena)
+        if trabajo_id is not None:
+            query = query.filter_by(trabajo_id=trabajo_id)
+        query = query.order_by(FilaCuarentena.id.desc())
+        if limite:
+            query = query.limit(limite)
+        return query.all()
+    finally:
+        session.close()
+
+CAMPOS_SINCRONIZACION = ['nombre', 'apellido', 'fecha_ingreso', 'estado', 'skill', 'es_lider']
+_VALORES_VERDADEROS = {'true', '1', 'si', 'sí', 's', 'verdadero', 'yes'}
+_VALORES_FALSOS = {'false', '0', 'no', 'n', 'falso'}
+
+def _tabla_staging():
+    """Tabla temporal (por conexión) donde se carga el padrón completo para compararlo en la base"""
+    return Table(
+        'staging_padron', MetaData(),
+        Column('dni', String, primary_key=True),
+        Column('nombre', String),
+        Column('apellido', String),
+        Column('fecha_ingreso', DateTime),
+        Column('estado', String),
+        Column('skill', String),
+        Column('es_lider', Boolean),
+        Column('es_nuevo', Boolean),
+        prefixes=['TEMPORARY']
+    )
+
+def _normalizar_padron(df):
+    """Limpia el padrón de forma vectorizada: DNI sin espacios y único, blancos como nulos, tipos de la tabla.
+
+    Devuelve el padrón y los DNIs cuya fecha de ingreso no se pudo interpretar (se tratan como blanco)."""
+    padron = pd.DataFrame({'dni': df['dni'].astype('string').str.strip()})
+    fechas_invalidas = []
+    for campo in CAMPOS_SINCRONIZACION:
+        valores = df[campo] if campo in df else pd.Series(None, index=df.index, dtype='object')
+        if campo == 'fecha_ingreso':
+            informada = valores.where(valores.astype('string').str.strip() != '')
+            padron[campo] = pd.to_datetime(informada, errors='coerce')
+            fallidas = informada.notna() & padron[campo].isna()
+            fechas_invalidas = padron.loc[fallidas & padron['dni'].notna(), 'dni'].unique().tolist()
+        elif campo == 'es_lider':
+            texto = valores.astype('string').str.strip().str.lower()
+            es_lider = pd.Series(None, index=df.index, dtype='object')
+            es_lider[texto.isin(_VALORES_VERDADEROS).fillna(False)] = True
+            es_lider[texto.isin(_VALORES_FALSOS).fillna(False)] = False
+            padron[campo] = es_lider
+        else:
+            texto = valores.astype('string').str.strip()
+            padron[campo] = texto.where(texto != '')
+    padron = padron[padron['dni'].notna() & (padron['dni'] != '')]
+    padron = padron.drop_duplicates('dni', keep='last')
+    # Figurar en el padrón implica estar activo, salvo que el archivo indique otro estado
+    padron['estado'] = padron['estado'].fillna('activo')
+    return padron.astype(object).where(padron.notna(), None), fechas_invalidas
+
+def sincronizar_padron(df, usuario_id):
+    """Sincronización completa contra el padrón de RR.HH.: da de alta los nuevos, actualiza los cambiados
+    y marca como inactivos a los empleados activos que no figuran en el archivo.
+
+    El archivo se carga en una tabla temporal y altas, cambios y bajas se resuelven con joins y
+    anti-joins en la base, cada uno en una sola sentencia con su lote de logs. Todo en una transacción.
+    Un empleado dado de baja (activo=False) que figura en el archivo se reactiva.
+    Devuelve un diccionario con nuevos, actualizados, sin_cambios, omitidos, inactivados, reactivados y
+    fechas_invalidas (DNIs cuya fecha de ingreso no se pudo leer y quedó sin tocar)."""
+    padron, fechas_invalidas = _normalizar_padron(df)
+    staging = _tabla_staging()
+    empleados = Empleado.__table__
+    logs = LogCambio.__table__
+    ahora = datetime.now()
     session = get_session()
     try:
-        for _, row in df.iterrows():
-            dni = str(row['dni']).strip() if 'dni' in row and pd.notna(row['dni']) else None
-            if not dni:
-                continue  # Saltar filas sin DNI
-            empleado = session.query(Empleado).filter_by(dni=dni).first()
-            datos = {}
-            for campo in ['nombre', 'apellido', 'fecha_ingreso', 'estado', 'skill', 'es_lider']:
-                if campo in row and pd.notna(row[campo]) and str(row[campo]).strip() != '':
-                    if campo == 'dni':
-                        datos[campo] = str(row[campo]).strip()
-                    else:
-                        datos[campo] = row[campo]
-            if empleado:
-                cambios = []
-                for key, value in datos.items():
-                    # Convertir fecha si es necesario
-                    if key == 'fecha_ingreso':
-                        value = pd.to_datetime(value)
-                    # Solo actualizar si es diferente y no es blanco
-                    if hasattr(empleado, key) and getattr(empleado, key) != value:
-                        cambios.append(f"{key}: {getattr(empleado, key)} -> {value}")
-                        setattr(empleado, key, value)
-                if cambios:
-                    log = LogCambio(
-                        usuario_id=usuario_id,
-                        empleado_dni=dni,
-                        accion='modificacion',
-                        detalle="Importación: " + ", ".join(cambios)
-                    )
-                    session.add(log)
-            else:
-                # Crear nuevo empleado solo con los campos presentes
-                empleado_nuevo = Empleado(
-                    dni=dni,
-                    nombre=str(datos.get('nombre', '')).strip(),
-                    apellido=str(datos.get('apellido', '')).strip(),
-                    fecha_ingreso=pd.to_datetime(datos['fecha_ingreso']) if 'fecha_ingreso' in datos else None,
-                    estado=str(datos.get('estado', 'activo')).strip(),
-                    skill=str(datos.get('skill', '')).strip(),
-                    es_lider=datos.get('es_lider', False)
-                )
-                session.add(empleado_nuevo)
-                log = LogCambio(
-                    usuario_id=usuario_id,
-                    empleado_dni=dni,
-                    accion='alta',
-                    detalle=f"Importación masiva: {datos.get('nombre', '')} {datos.get('apellido', '')}"
-                )
-                session.add(log)
+        conexion = session.connection()
+        staging.create(conexion)
+        if not padron.empty:
+            session.execute(insert(staging), padron.to_dict('records'))
+        existe = exists().where(empleados.c.dni == staging.c.dni)
+        session.execute(update(staging).values(es_nuevo=~existe))
+
+        # Cambios: un campo cambia si el archivo trae valor y es distinto del actual (los blancos no pisan)
+        cambia = {
+            campo: and_(staging.c[campo].isnot(None), staging.c[campo].is_distinct_from(empleados.c[campo]))
+            for campo in CAMPOS_SINCRONIZACION
+        }
+        # Dado de baja en la aplicación pero presente en el padrón: se reactiva en el mismo UPDATE
+        reactivar = empleados.c.activo.is_(False)
+        detalle = case((reactivar, literal('activo: False -> True, ')), else_=literal(''))
+        for campo, condicion in cambia.items():
+            detalle = detalle + case((condicion, (
+                literal(f"{campo}: ") + func.coalesce(cast(empleados.c[campo], String), 'None')
+                + literal(' -> ') + cast(staging.c[campo], String) + literal(', ')
+            )), else_=literal(''))
+        hay_cambios = and_(empleados.c.dni == staging.c.dni, or_(*cambia.values(), reactivar))
+        reactivados = session.execute(
+            select(func.count()).select_from(empleados).where(empleados.c.dni == staging.c.dni, reactivar)
+        ).scalar()
+        actualizados = session.execute(insert(logs).from_select(
+            ['timestamp', 'usuario_id', 'empleado_dni', 'accion', 'detalle'],
+            select(literal(ahora), literal(usuario_id), empleados.c.dni, literal('modificacion'),
+                   literal('Sincronización: ') + func.rtrim(detalle, ', '))
+            .where(hay_cambios)
+        )).rowcount
+        session.execute(
+            update(empleados)
+            .where(hay_cambios)
+            .values({
+                **{campo: case((condicion, staging.c[campo]), else_=empleados.c[campo]) for campo, condicion in cambia.items()},
+                'activo': true(),
+                'version': empleados.c.version + 1,
+                'fecha_actualizacion': ahora,
+                'hash_importacion': None
+            })
+        )
+
+        # Altas: filas del archivo sin empleado
+        columnas_alta = ['dni', 'nombre', 'apellido', 'fecha_ingreso', 'estado', 'skill', 'es_lider',
+                         'activo', 'fecha_creacion', 'version']
+        session.execute(insert(empleados).from_select(columnas_alta, select(
+            staging.c.dni, func.coalesce(staging.c.nombre, ''), func.coalesce(staging.c.apellido, ''),
+            staging.c.fecha_ingreso, staging.c.estado, func.coalesce(staging.c.skill, ''),
+            func.coalesce(staging.c.es_lider, False), true(), literal(ahora), literal(1)
+        ).where(staging.c.es_nuevo)))
+        session.execute(insert(logs).from_select(
+            ['timestamp', 'usuario_id', 'empleado_dni', 'accion', 'detalle'],
+            select(literal(ahora), literal(usuario_id), staging.c.dni, literal('alta'),
+                   literal('Sincronización: ') + func.coalesce(staging.c.nombre, '') + literal(' ')
+                   + func.coalesce(staging.c.apellido, ''))
+            .where(staging.c.es_nuevo)
+        ))
+        dnis_nuevos = session.execute(select(staging.c.dni).where(staging.c.es_nuevo)).scalars().all()
+
+        # Bajas: empleados activos que no figuran en el archivo (anti-join)
+        desaparecido = and_(
+            EMPLEADO_ACTIVO,
+            func.coalesce(empleados.c.estado, '') != 'inactivo',
+            ~exists().where(staging.c.dni == empleados.c.dni)
+        )
+        inactivados = session.execute(insert(logs).from_select(
+            ['timestamp', 'usuario_id', 'empleado_dni', 'accion', 'detalle'],
+            select(literal(ahora), literal(usuario_id), empleados.c.dni, literal('baja'),
+                   literal('Sincronización: estado: ') + func.coalesce(empleados.c.estado, 'None')
+                   + literal(' -> inactivo (no figura en el padrón)'))
+            .where(desaparecido)
+        )).rowcount
+        session.execute(
+            update(empleados)
+            .where(desaparecido)
+            .values(estado='inactivo', version=empleados.c.version + 1, fecha_actualizacion=ahora, hash_importacion=None)
+        )
+
+        staging.drop(conexion)
+        resumen.marcar_version(session)
         session.commit()
-        return True
     except Exception as e:
         session.rollback()
+        try:
+            staging.drop(session.connection(), checkfirst=True)
+            session.commit()
+        except Exception:
+            session.rollback()
         raise e
     finally:
         session.close()
+    registrar_escritura()
+    _sincronizar_indice_dni(agregados=dnis_nuevos)
+    # Las sentencias masivas no pasan por resumen.aplicar: se recalculan los contadores de una vez
+    resumen.reconstruir()
+    return {
+        'nuevos': len(dnis_nuevos),
+        'actualizados': actualizados,
+        'sin_cambios': len(padron) - len(dnis_nuevos) - actualizados,
+        'omitidos': len(df) - len(padron),
+        'inactivados': inactivados,
+        'reactivados': reactivados,
+        'fechas_invalidas': fechas_invalidas
+    }
 
-def obtener_log_cambios(filtros=None):
-    """Obtiene el historial de cambios con filtros opcionales"""
-    session = get_session()
+def obtener_version_datos():
+    """Devuelve una versión de los datos que cambia con cada alta, baja, modificación o importación.
+    Es la fila que incrementa cada escritura (resumen.marcar_version): una lectura por clave primaria."""
+    session = get_read_session()
     try:
-        query = session.query(LogCambio).options(joinedload(LogCambio.usuario))
-        
-        if filtros:
-            if 'usuario_id' in filtros:
-                query = query.filter_by(usuario_id=filtros['usuario_id'])
-            if 'empleado_dni' in filtros:
-                query = query.filter_by(empleado_dni=filtros['empleado_dni'])
-            if 'accion' in filtros:
-                query = query.filter_by(accion=filtros['accion'])
-            if 'fecha_desde' in filtros:
-                query = query.filter(LogCambio.timestamp >= filtros['fecha_desde'])
-            if 'fecha_hasta' in filtros:
-                query = query.filter(LogCambio.timestamp <= filtros['fecha_hasta'])
+        return resumen.leer_version(session)
+    finally:
+        session.close()
+
+def _filtrar_log(query, filtros):
+    """Aplica los filtros del historial (usuario, DNI, acción y rango de fechas)"""
+    if filtros:
+        if 'usuario_id' in filtros:
+            query = query.filter(LogCambio.usuario_id == filtros['usuario_id'])
+        if 'empleado_dni' in filtros:
+            query = query.filter(LogCambio.empleado_dni == filtros['empleado_dni'])
+        if 'accion' in filtros:
+            query = query.filter(LogCambio.accion == filtros['accion'])
+        if 'fecha_desde' in filtros:
+            query = query.filter(LogCambio.timestamp >= filtros['fecha_desde'])
+        if 'fecha_hasta' in filtros:
+            query = query.filter(LogCambio.timestamp <= filtros['fecha_hasta'])
+    return query
+
+def obtener_log_cambios(filtros=None, antes_id=None, limite=None):
+    """Obtiene el historial de cambios con filtros opcionales.
+    Con limite se pagina por id descendente: la página siguiente se pide con antes_id = último id recibido."""
+    session = get_read_session()
+    try:
+        query = _filtrar_log(session.query(LogCambio).options(joinedload(LogCambio.usuario)), filtros)
         
+        if limite is not None:
+            if antes_id is not None:
+                query = query.filter(LogCambio.id < antes_id)
+            return query.order_by(LogCambio.id.desc()).limit(limite).all()
         return query.order_by(LogCambio.timestamp.desc()).all()
     finally:
-        session.close() 
\ No newline at end of file
+        session.close() 
+
+def estadisticas_log_cambios(filtros=None):
+    """Cambios por acción, por usuario y por día con GROUP BY en la base, sin traer las filas.
+    El total es la suma de por_accion."""
+    session = get_read_session()
+    try:
+        por_accion = _filtrar_log(session.query(LogCambio.accion, func.count(LogCambio.id)), filtros) \
+            .group_by(LogCambio.accion).all()
+        por_usuario = _filtrar_log(
+            session.query(Usuario.usuario, func.count(LogCambio.id))
+            .select_from(LogCambio)
+            .outerjoin(Usuario, Usuario.id == LogCambio.usuario_id),
+            filtros
+        ).group_by(Usuario.usuario).all()
+        dia = func.date(LogCambio.timestamp)
+        por_dia = _filtrar_log(session.query(dia, LogCambio.accion, func.count(LogCambio.id)), filtros) \
+            .group_by(dia, LogCambio.accion).all()
+    finally:
+        session.close()
+    por_dia = pd.DataFrame(por_dia, columns=['periodo', 'accion', 'cantidad'])
+    por_dia['periodo'] = pd.to_datetime(por_dia['periodo'])
+    return {
+        'por_accion': pd.Series(dict(por_accion), name='cantidad', dtype='int64').sort_values(ascending=False),
+        'por_usuario': pd.Series(dict(por_usuario), name='cantidad', dtype='int64').sort_values(ascending=False),
+        'por_dia': por_dia.pivot(index='periodo', columns='accion', values='cantidad').fillna(0)
+    }
@@ -1,11 +1,20 @@
 import os
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, ForeignKey, text, JSON
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, ForeignKey, text, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool, NullPool
 from datetime import datetime
 import streamlit as st
 from dotenv import load_dotenv
 from urllib.parse import quote_plus
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+import cache_compartido
 
 # Cargar variables de entorno
 load_dotenv()
@@ -45,7 +54,22 @@ class Empleado(Base):
     usuario_hada = Column(String)
     usuario_remedy = Column(String)
     usuario_t3 = Column(String)
-    campos_personalizados = Column(JSON)
+    campos_personalizados = Column(JSON().with_variant(JSONB(), 'postgresql'))  # lista de {'nombre', 'valor'}
+    # Control de concurrencia optimista: cada UPDATE exige la versión leída y la incrementa
+    version = Column(Integer, nullable=False, default=1, server_default='1')
+    # Hash de la última fila importada: si el archivo trae la misma fila, la importación la saltea
+    hash_importacion = Column(String)
+
+    __table_args__ = (
+        # Índice GIN para filtrar campos personalizados por contención (@>)
+        Index('ix_empleados_campos_personalizados', 'campos_personalizados',
+              postgresql_using='gin', postgresql_ops={'campos_personalizados': 'jsonb_path_ops'}),
+    )
+    __mapper_args__ = {'version_id_col': version}
+
+# Un empleado está activo salvo que se lo haya dado de baja: activo nulo cuenta como activo.
+# Es el criterio de listados, contadores de resumen (resumen.contribucion) y sincronización.
+EMPLEADO_ACTIVO = Empleado.activo.isnot(False)
 
 class LogCambio(Base):
     __tablename__ = 'log_cambios'
@@ -60,6 +84,52 @@ class LogCambio(Base):
     usuario = relationship("Usuario")
     empleado = relationship("Empleado")
 
+class ResumenEmpleados(Base):
+    __tablename__ = 'resumen_empleados'
+    
+    dimension = Column(String, primary_key=True)  # 'total', 'estado', 'es_lider', 'skill', 'area', 'mes_ingreso'
+    valor = Column(String, primary_key=True)
+    cantidad = Column(Integer, nullable=False, default=0)
+
+class VersionDatos(Base):
+    __tablename__ = 'version_datos'
+    
+    # Una sola fila (id=1) que cada escritura incrementa en su propia transacción (resumen.marcar_version)
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class TrabajoImportacion(Base):
+    __tablename__ = 'trabajos_importacion'
+    
+    id = Column(Integer, primary_key=True)
+    usuario_id = Column(Integer, ForeignKey('usuarios.id'))
+    archivo = Column(String)
+    estado = Column(String, default='pendiente')  # 'pendiente', 'en_curso', 'completado', 'fallido', 'cancelado'
+    total = Column(Integer, default=0)
+    procesados = Column(Integer, default=0)
+    fallidos = Column(Integer, default=0)
+    cancelar = Column(Boolean, default=False)
+    error = Column(String)
+    resumen = Column(JSON)  # estadísticas combinadas y por worker
+    hash_archivo = Column(String, index=True)  # para detectar archivos ya importados
+    latido = Column(DateTime)  # lo renueva el proceso que tiene el trabajo; vencido = proceso muerto
+    fecha_creacion = Column(DateTime, default=datetime.now)
+    fecha_inicio = Column(DateTime)
+    fecha_fin = Column(DateTime)
+
+    usuario = relationship("Usuario")
+
+class FilaCuarentena(Base):
+    __tablename__ = 'cuarentena_importacion'
+
+    id = Column(Integer, primary_key=True)
+    trabajo_id = Column(Integer, ForeignKey('trabajos_importacion.id'), index=True)
+    usuario_id = Column(Integer, ForeignKey('usuarios.id'))
+    dni = Column(String)
+    fila = Column(JSON)  # fila original del archivo, para corregirla y volver a importarla
+    motivo = Column(String)
+    fecha = Column(DateTime, default=datetime.now)
+
 def get_database_url():
     """Obtiene la URL de la base de datos desde las variables de entorno"""
     if 'DATABASE_URL' in os.environ:
@@ -74,6 +144,96 @@ def get_database_url():
         st.stop()
         return None
 
+# Perfiles de conexión según cómo se llega a Postgres:
+# - directo: conexión directa al servidor, pool propio.
+# - sesion: pooler en modo sesión (Supabase :5432), pool propio; cada conexión ocupa una del pooler.
+# - transaccion: pooler en modo transacción (Supabase :6543). El pooler ya agrupa conexiones,
+#   así que se usa NullPool, sin parámetros de arranque ni sentencias preparadas del lado servidor.
+PERFILES_DB = {
+    'directo': {'pool_size': 10, 'max_overflow': 10},
+    'sesion': {'pool_size': 5, 'max_overflow': 10},
+    'transaccion': {'pool_size': 0, 'max_overflow': 0},
+}
+DB_PERFIL = os.environ.get('DB_PERFIL', 'sesion')
+if DB_PERFIL not in PERFILES_DB:
+    raise ValueError(f"DB_PERFIL inválido: {DB_PERFIL}. Opciones: {', '.join(PERFILES_DB)}")
+
+class _TelemetriaPool:
+    """Mide esperas, checkouts y timeouts al pedir una conexión al pool"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.telemetria = {'checkouts': 0, 'espera_total': 0.0, 'espera_max': 0.0, 'timeouts': 0}
+        self._telemetria_lock = threading.Lock()
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._telemetria_lock:
+                self.telemetria['timeouts'] += 1
+            raise
+        finally:
+            espera = time.perf_counter() - inicio
+            with self._telemetria_lock:
+                self.telemetria['checkouts'] += 1
+                self.telemetria['espera_total'] += espera
+                self.telemetria['espera_max'] = max(self.telemetria['espera_max'], espera)
+
+class QueuePoolMedido(_TelemetriaPool, QueuePool):
+    pass
+
+class NullPoolMedido(_TelemetriaPool, NullPool):
+    pass
+
+def _connect_args(target_session_attrs="read-write", opciones="-c timezone=UTC"):
+    """Parámetros de conexión comunes a todos los engines"""
+    return {
+        "connect_timeout": 30,
+        "application_name": "padron_app",
+        "options": opciones,
+        "keepalives": 1,
+        "keepalives_idle": 30,
+        "keepalives_interval": 10,
+        "keepalives_count": 5,
+        "tcp_user_timeout": 30000,
+        "target_session_attrs": target_session_attrs
+    }
+
+def _crear_engine(url, solo_lectura=False):
+    """Crea un engine con el perfil DB_PERFIL y telemetría de pool"""
+    perfil = PERFILES_DB[DB_PERFIL]
+    if solo_lectura:
+        connect_args = _connect_args("any", "-c timezone=UTC -c default_transaction_read_only=on")
+    else:
+        connect_args = _connect_args()
+    opciones = {'pool_pre_ping': True}
+    if DB_PERFIL == 'transaccion':
+        # El pooler en modo transacción rechaza parámetros de arranque como 'options':
+        # zona horaria y solo lectura se fijan en cada transacción (listener de abajo)
+        connect_args.pop("options")
+        if make_url(url).get_driver_name() == 'psycopg':
+            connect_args["prepare_threshold"] = None  # sin caché de sentencias preparadas
+        opciones['poolclass'] = NullPoolMedido
+    else:
+        opciones.update(
+            poolclass=QueuePoolMedido,
+            pool_recycle=3600,
+            pool_size=int(os.environ.get('DB_POOL_SIZE', perfil['pool_size'])),
+            max_overflow=int(os.environ.get('DB_MAX_OVERFLOW', perfil['max_overflow'])),
+            pool_timeout=float(os.environ.get('DB_POOL_TIMEOUT', '30'))
+        )
+    engine = create_engine(url, connect_args=connect_args, **opciones)
+    if DB_PERFIL == 'transaccion':
+        # SET LOCAL vale solo para la transacción: no queda pegado a la conexión compartida del pooler
+        @event.listens_for(engine, "begin")
+        def _configurar_transaccion(conn):
+            if solo_lectura:
+                conn.exec_driver_sql("SET TRANSACTION READ ONLY")
+            conn.exec_driver_sql("SET LOCAL TIME ZONE 'UTC'")
+    return engine
+
 @st.cache_resource
 def get_engine():
     """Inicializa la base de datos y crea las tablas si no existen (solo una vez por sesión)."""
@@ -81,24 +241,7 @@ def get_engine():
         database_url = get_database_url()
         if not database_url:
             raise Exception("No se encontró la URL de la base de datos.")
-        engine = create_engine(
-            database_url,
-            pool_pre_ping=True,
-            pool_recycle=3600,
-            pool_size=5,
-            max_overflow=10,
-            connect_args={
-                "connect_timeout": 30,
-                "application_name": "padron_app",
-                "options": "-c timezone=UTC",
-                "keepalives": 1,
-                "keepalives_idle": 30,
-                "keepalives_interval": 10,
-                "keepalives_count": 5,
-                "tcp_user_timeout": 30000,
-                "target_session_attrs": "read-write"
-            }
-        )
+        engine = _crear_engine(database_url)
         # Probar la conexión
         with engine.connect() as conn:
             conn.execute(text("SELECT 1"))
@@ -111,6 +254,43 @@ def get_engine():
     except Exception as e:
         raise e
 
+@st.cache_resource
+def get_read_engine():
+    """Engine de solo lectura contra la réplica (READ_DATABASE_URL). Si no está configurada, usa el primario."""
+    read_url = os.environ.get('READ_DATABASE_URL')
+    if not read_url:
+        return get_engine()
+    # La réplica nunca debe recibir escrituras, aunque apunte a una instancia que las acepte
+    engine = _crear_engine(read_url, solo_lectura=True)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    return engine
+
+def metricas_pool():
+    """Estado actual y telemetría acumulada de los pools de conexiones de este proceso"""
+    engines = {'primario': get_engine()}
+    if os.environ.get('READ_DATABASE_URL'):
+        engines['replica'] = get_read_engine()
+    metricas = []
+    for nombre, engine in engines.items():
+        pool = engine.pool
+        telemetria = dict(getattr(pool, 'telemetria', {}))
+        checkouts = telemetria.get('checkouts', 0)
+        metricas.append({
+            'engine': nombre,
+            'perfil': DB_PERFIL,
+            'pool': type(pool).__name__,
+            'tamaño': pool.size() if hasattr(pool, 'size') else 0,
+            'en uso': pool.checkedout() if hasattr(pool, 'checkedout') else None,
+            'libres': pool.checkedin() if hasattr(pool, 'checkedin') else None,
+            'overflow': max(pool.overflow(), 0) if hasattr(pool, 'overflow') else None,
+            'checkouts': checkouts,
+            'espera promedio (ms)': round(1000 * telemetria.get('espera_total', 0) / checkouts, 2) if checkouts else 0,
+            'espera máxima (ms)': round(1000 * telemetria.get('espera_max', 0), 2),
+            'timeouts': telemetria.get('timeouts', 0),
+        })
+    return metricas
+
 def get_session():
     """Retorna una sesión de base de datos"""
     engine = get_engine()
@@ -119,6 +299,104 @@ def get_session():
     Session = sessionmaker(bind=engine)
     return Session()
 
+# Tolerancia de atraso de la réplica: durante este tiempo después de una escritura,
+# y mientras la réplica esté más atrasada que esto, las lecturas van al primario.
+REPLICA_LAG_TOLERANCIA = float(os.environ.get('REPLICA_LAG_TOLERANCIA_SEGUNDOS', '5'))
+_REPLICA_LAG_INTERVALO = 10
+# Hasta la primera medición se lee del primario; 'midiendo' evita que varios hilos midan a la vez
+_replica_lag = {'valor': float('inf'), 'medido': 0.0, 'midiendo': False}
+_replica_lag_lock = threading.Lock()
+# Réplica inaccesible: se deja de intentar hasta este instante para no esperar el connect_timeout en cada lectura
+REPLICA_REINTENTO = float(os.environ.get('REPLICA_REINTENTO_SEGUNDOS', '60'))
+_replica_caida = {'hasta': 0.0}
+
+def _marcar_replica_caida():
+    _replica_caida['hasta'] = time.time() + REPLICA_REINTENTO
+
+def registrar_escritura():
+    """Marca que la sesión del usuario acaba de escribir, para leer sus propios cambios del primario,
+    e invalida la caché compartida en todos los procesos"""
+    try:
+        st.session_state['ultima_escritura_db'] = time.time()
+    except Exception:
+        pass
+    cache_compartido.invalidar()
+
+def _replica_lag_segundos(engine):
+    """Atraso de replicación de la réplica en segundos (0 si no es un standby). Se mide cada pocos segundos.
+
+    Si ya aplicó todo el WAL recibido el atraso es 0: la antigüedad de la última transacción aplicada
+    crece sin escrituras en el primario y solo se usa mientras quede WAL por aplicar.
+    Un solo hilo mide; los demás usan la última medición en vez de esperar la conexión."""
+    with _replica_lag_lock:
+        if _replica_lag['midiendo'] or time.time() - _replica_lag['medido'] < _REPLICA_LAG_INTERVALO:
+            return _replica_lag['valor']
+        _replica_lag['midiendo'] = True
+    # Réplica inaccesible: tratarla como infinitamente atrasada
+    valor = float('inf')
+    try:
+        with engine.connect() as conn:
+            lag = conn.execute(text("""
+                SELECT CASE
+                    WHEN NOT pg_is_in_recovery() THEN 0
+                    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+                END
+            """)).scalar()
+        valor = float(lag or 0)
+    except Exception:
+        _marcar_replica_caida()
+    finally:
+        with _replica_lag_lock:
+            _replica_lag.update(valor=valor, medido=time.time(), midiendo=False)
+    return valor
+
+def get_read_session():
+    """Retorna una sesión para lecturas de reportes, enrutada a la réplica cuando es seguro"""
+    engine = get_engine()
+    if os.environ.get('READ_DATABASE_URL'):
+        try:
+            ultima_escritura = st.session_state.get('ultima_escritura_db', 0)
+        except Exception:
+            ultima_escritura = 0
+        if time.time() - ultima_escritura > REPLICA_LAG_TOLERANCIA and time.time() >= _replica_caida['hasta']:
+            try:
+                read_engine = get_read_engine()
+                if _replica_lag_segundos(read_engine) <= REPLICA_LAG_TOLERANCIA:
+                    engine = read_engine
+            except Exception:
+                # get_read_engine no cachea el error: sin esta marca cada lectura volvería a esperar la conexión
+                _marcar_replica_caida()
+    Session = sessionmaker(bind=engine)
+    return Session()
+
+def ejecutar_en_paralelo(consultas, max_workers=None):
+    """Ejecuta consultas independientes en paralelo, cada una con su propia conexión del pool.
+
+    Recibe un diccionario nombre -> función sin argumentos y devuelve un diccionario
+    nombre -> resultado cuando todas terminaron.
+    """
+    if not consultas:
+        return {}
+    engine = get_engine()
+    if max_workers is None:
+        tamanio_pool = engine.pool.size() if hasattr(engine.pool, 'size') else len(consultas)
+        max_workers = max(1, min(len(consultas), tamanio_pool))
+    # Propagar el contexto de Streamlit a los hilos para que session_state (ruteo a la réplica) funcione
+    try:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+        ctx = get_script_run_ctx()
+    except ImportError:
+        ctx = None
+
+    def _inicializar_hilo():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+
+    with ThreadPoolExecutor(max_workers=max_workers, initializer=_inicializar_hilo) as executor:
+        futuros = {nombre: executor.submit(funcion) for nombre, funcion in consultas.items()}
+        return {nombre: futuro.result() for nombre, futuro in futuros.items()}
+
 def crear_usuario_admin(engine=None):
     """Crea un usuario administrador por defecto si no existe"""
     import bcrypt
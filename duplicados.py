@@ -0,0 +1,107 @@
+from collections import defaultdict
+from difflib import SequenceMatcher
+import pandas as pd
+from db import get_read_session, Empleado, EMPLEADO_ACTIVO
+from utils import normalizar_texto
+
+# Bloques más grandes que esto (nombres muy comunes) se descartan para no volver a la comparación cuadrática
+MAX_BLOQUE = 50
+
+def _normalizar(texto):
+    """Normaliza y colapsa espacios para comparar nombres"""
+    return " ".join(normalizar_texto(texto or "").split())
+
+def _claves_bloqueo(dni, nombre, apellido, email):
+    """Claves de bloqueo: solo se comparan empleados que comparten al menos una clave"""
+    claves = set()
+    if apellido:
+        claves.add(f"n:{apellido}|{nombre[:3]}")
+        claves.add(f"n:{nombre}|{apellido[:3]}")  # nombre y apellido invertidos
+    if email:
+        claves.add(f"e:{email.split('@')[0]}")
+    # El DNI completo más sus variantes sin un dígito: dos DNIs con un dígito cambiado comparten una
+    # variante, y la variante del DNI largo sin el dígito de más es igual al DNI corto (dígito faltante)
+    claves.add(f"d:{dni}")
+    for i in range(len(dni)):
+        claves.add(f"d:{dni[:i]}{dni[i + 1:]}")
+    return claves
+
+def _similitud(a, b):
+    if not a or not b:
+        return 0.0
+    return SequenceMatcher(None, a, b).ratio()
+
+def _puntuar(a, b):
+    """Puntaje de 0 a 1 combinando nombre completo, DNI y email"""
+    nombre = max(
+        _similitud(f"{a['nombre']} {a['apellido']}", f"{b['nombre']} {b['apellido']}"),
+        _similitud(f"{a['apellido']} {a['nombre']}", f"{b['nombre']} {b['apellido']}")
+    )
+    dni = _similitud(a['dni'], b['dni'])
+    email = 1.0 if a['email'] and a['email'] == b['email'] else 0.0
+    motivos = []
+    if nombre >= 0.85:
+        motivos.append("nombre similar")
+    if dni >= 0.75:
+        motivos.append("DNI similar")
+    if email:
+        motivos.append("mismo email")
+    return 0.6 * nombre + 0.25 * dni + 0.15 * email, motivos
+
+def detectar_duplicados(umbral=0.75, max_bloque=MAX_BLOQUE):
+    """Detecta posibles personas duplicadas bajo DNIs distintos.
+
+    Usa claves de bloqueo para comparar solo candidatos plausibles (tiempo casi lineal)
+    y devuelve un DataFrame de pares ordenado por puntaje descendente.
+    """
+    session = get_read_session()
+    try:
+        filas = session.query(
+            Empleado.dni, Empleado.nombre, Empleado.apellido, Empleado.email
+        ).filter(EMPLEADO_ACTIVO).all()
+    finally:
+        session.close()
+
+    registros = []
+    bloques = defaultdict(list)
+    for dni, nombre, apellido, email in filas:
+        registro = {
+            'dni': str(dni).strip(),
+            'nombre': _normalizar(nombre),
+            'apellido': _normalizar(apellido),
+            'email': _normalizar(email),
+            'nombre_original': f"{nombre or ''} {apellido or ''}".strip(),
+        }
+        idx = len(registros)
+        registros.append(registro)
+        for clave in _claves_bloqueo(registro['dni'], registro['nombre'], registro['apellido'], registro['email']):
+            bloques[clave].append(idx)
+
+    vistos = set()
+    pares = []
+    for indices in bloques.values():
+        if len(indices) < 2 or len(indices) > max_bloque:
+            continue
+        for pos, i in enumerate(indices):
+            for j in indices[pos + 1:]:
+                par = (i, j) if i < j else (j, i)
+                if par in vistos:
+                    continue
+                vistos.add(par)
+                a, b = registros[par[0]], registros[par[1]]
+                puntaje, motivos = _puntuar(a, b)
+                if puntaje >= umbral:
+                    pares.append({
+                        'DNI A': a['dni'],
+                        'Nombre A': a['nombre_original'],
+                        'DNI B': b['dni'],
+                        'Nombre B': b['nombre_original'],
+                        'Puntaje': round(puntaje, 3),
+                        'Motivos': ", ".join(motivos)
+                    })
+
+    columnas = ['DNI A', 'Nombre A', 'DNI B', 'Nombre B', 'Puntaje', 'Motivos']
+    return pd.DataFrame(pares, columns=columnas).sort_values('Puntaje', ascending=False, ignore_index=True)
+
+if __name__ == '__main__':
+    print(detectar_duplicados().to_string())
@@ -0,0 +1,107 @@
+"""Evolución de la plantilla: dotación en el tiempo, altas vs bajas y antigüedad.
+
+Todo se calcula vectorizado sobre dos arreglos ordenados de fechas (ingresos y bajas):
+la dotación al cierre de cada período es #ingresos <= fin - #bajas <= fin, resuelto con
+np.searchsorted, sin recorrer empleados ni períodos en Python.
+"""
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from sqlalchemy import func, or_, and_
+from db import get_read_session, Empleado, LogCambio
+from cache_compartido import cacheado
+
+FRECUENCIAS = {'M': 'Mes', 'Q': 'Trimestre', 'Y': 'Año'}
+RANGOS_ANTIGUEDAD = [0, 1, 2, 5, 10, 20, np.inf]
+ETIQUETAS_ANTIGUEDAD = ['< 1 año', '1-2 años', '2-5 años', '5-10 años', '10-20 años', '20+ años']
+
+@cacheado()
+def cargar_eventos(version):
+    """Fecha de ingreso y de baja (si la hubo) de cada empleado. Se cachea por versión de datos.
+
+    La baja es el último evento 'baja' o la última modificación que pasó el estado a inactivo;
+    si un empleado inactivo no tiene ese evento se usa su fecha de actualización.
+    Se descartan los empleados sin fecha de ingreso y los inactivos sin ninguna fecha de baja:
+    no se pueden ubicar en el tiempo. Las cantidades quedan en attrs['sin_ingreso'] y attrs['sin_baja']."""
+    session = get_read_session()
+    try:
+        es_baja = or_(
+            LogCambio.accion == 'baja',
+            and_(LogCambio.accion == 'modificacion', LogCambio.detalle.like('%estado: % -> inactivo%'))
+        )
+        bajas = (
+            session.query(LogCambio.empleado_dni.label('dni'), func.max(LogCambio.timestamp).label('fecha_baja'))
+            .filter(es_baja)
+            .group_by(LogCambio.empleado_dni)
+            .subquery()
+        )
+        filas = (
+            session.query(
+                Empleado.fecha_ingreso, Empleado.estado, Empleado.activo,
+                Empleado.fecha_actualizacion, bajas.c.fecha_baja
+            )
+            .outerjoin(bajas, bajas.c.dni == Empleado.dni)
+            .all()
+        )
+    finally:
+        session.close()
+    df = pd.DataFrame(filas, columns=['fecha_ingreso', 'estado', 'activo', 'fecha_actualizacion', 'fecha_baja'])
+    inactivo = (df['activo'] == False) | (df['estado'] == 'inactivo')
+    fecha_baja = pd.to_datetime(df['fecha_baja']).fillna(pd.to_datetime(df['fecha_actualizacion']))
+    eventos = pd.DataFrame({
+        'ingreso': pd.to_datetime(df['fecha_ingreso']),
+        # Un empleado activo no tiene baja aunque haya tenido una y luego se lo reactivara
+        'baja': fecha_baja.where(inactivo)
+    })
+    # Sin ingreso su baja restaría dotación nunca sumada; inactivo sin baja contaría como activo para siempre
+    sin_ingreso = eventos['ingreso'].isna()
+    sin_baja = ~sin_ingreso & inactivo & eventos['baja'].isna()
+    eventos = eventos[~(sin_ingreso | sin_baja)].reset_index(drop=True)
+    eventos.attrs['sin_ingreso'] = int(sin_ingreso.sum())
+    eventos.attrs['sin_baja'] = int(sin_baja.sum())
+    return eventos
+
+def _ordenadas(fechas):
+    return np.sort(fechas.dropna().to_numpy(dtype='datetime64[ns]'))
+
+def plantilla_por_periodo(eventos, frecuencia='M', desde=None, hasta=None):
+    """Altas, bajas, neto y dotación al cierre de cada período"""
+    if frecuencia not in FRECUENCIAS:
+        raise ValueError(f"Frecuencia inválida: {frecuencia}")
+    ingresos = _ordenadas(eventos['ingreso'])
+    bajas = _ordenadas(eventos['baja'])
+    if len(ingresos) == 0:
+        return pd.DataFrame(columns=['Periodo', 'Altas', 'Bajas', 'Neto', 'Dotación'])
+    desde = pd.Timestamp(desde) if desde is not None else pd.Timestamp(ingresos[0])
+    hasta = pd.Timestamp(hasta) if hasta is not None else pd.Timestamp(datetime.now())
+    periodos = pd.period_range(desde, hasta, freq=frecuencia)
+    inicios = periodos.start_time.to_numpy(dtype='datetime64[ns]')
+    fines = (periodos + 1).start_time.to_numpy(dtype='datetime64[ns]')
+    # Cantidades acumuladas estrictamente antes de cada corte
+    ingresos_hasta = np.searchsorted(ingresos, fines, side='left')
+    bajas_hasta = np.searchsorted(bajas, fines, side='left')
+    altas = ingresos_hasta - np.searchsorted(ingresos, inicios, side='left')
+    salidas = bajas_hasta - np.searchsorted(bajas, inicios, side='left')
+    return pd.DataFrame({
+        'Periodo': periodos.to_timestamp(),
+        'Altas': altas,
+        'Bajas': salidas,
+        'Neto': altas - salidas,
+        'Dotación': ingresos_hasta - bajas_hasta
+    })
+
+def distribucion_antiguedad(eventos, referencia=None):
+    """Cantidad de empleados por rango de antigüedad: activos a la fecha de referencia
+    y, para los que se fueron, antigüedad al momento de la baja"""
+    referencia = pd.Timestamp(referencia) if referencia is not None else pd.Timestamp(datetime.now())
+    con_ingreso = eventos.dropna(subset=['ingreso'])
+    activos = con_ingreso['baja'].isna()
+    anios_activos = (referencia - con_ingreso.loc[activos, 'ingreso']).dt.days / 365.25
+    anios_bajas = (con_ingreso.loc[~activos, 'baja'] - con_ingreso.loc[~activos, 'ingreso']).dt.days / 365.25
+    cantidad_activos, _ = np.histogram(anios_activos.clip(lower=0), bins=RANGOS_ANTIGUEDAD)
+    cantidad_bajas, _ = np.histogram(anios_bajas.clip(lower=0), bins=RANGOS_ANTIGUEDAD)
+    return pd.DataFrame({
+        'Antigüedad': ETIQUETAS_ANTIGUEDAD,
+        'Activos': cantidad_activos,
+        'Bajas': cantidad_bajas
+    })
@@ -0,0 +1,150 @@
+"""Índice compacto de existencia de DNIs: un bit por DNI de 7 u 8 dígitos (13,75 MB).
+
+El bitset vive en un archivo mapeado en memoria que comparten todos los procesos de Streamlit.
+Cada texto tiene su propio bit: los de 8 dígitos ocupan las posiciones 0 a 99.999.999 y los de 7
+las siguientes, así '01234567' y '1234567' no se confunden.
+
+Es solo una pista positiva: un bit encendido indica que el DNI existe, pero uno apagado no prueba
+lo contrario (altas de otro host, de seed_data o hechas fuera de crud no lo actualizan hasta la
+próxima reconstrucción), así que los negativos se confirman contra la base.
+"""
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from db import get_read_session, Empleado
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+MAX_DNI = 100_000_000
+# Posiciones para los 10^8 DNIs de 8 dígitos seguidas de las de los 10^7 de 7 dígitos
+TOTAL_BITS = MAX_DNI + MAX_DNI // 10
+TAMANIO_BYTES = TOTAL_BITS // 8
+INDICE_DNI_PATH = os.environ.get('INDICE_DNI_PATH', os.path.join('.indice_dni', 'dnis.bin'))
+# Cada cuánto se reconstruye desde la base para absorber cambios hechos fuera de la aplicación
+INDICE_DNI_TTL = float(os.environ.get('INDICE_DNI_TTL_SEGUNDOS', '3600'))
+
+_BITS = np.array([1 << i for i in range(8)], dtype=np.uint8)
+_estado = {'mapa': None, 'inodo': None}
+_lock = threading.Lock()
+
+class _BloqueoArchivo:
+    """Bloqueo exclusivo entre procesos para escribir el índice"""
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(INDICE_DNI_PATH) or '.', exist_ok=True)
+        self.archivo = open(INDICE_DNI_PATH + '.lock', 'w')
+        if fcntl:
+            fcntl.flock(self.archivo, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *args):
+        if fcntl:
+            fcntl.flock(self.archivo, fcntl.LOCK_UN)
+        self.archivo.close()
+
+def _posicion(dni):
+    """Posición del bit de un DNI de 7 u 8 dígitos (según el texto exacto), si no devuelve None"""
+    dni = str(dni).strip()
+    if not dni.isascii() or not dni.isdigit() or not 7 <= len(dni) <= 8:
+        return None
+    return int(dni) if len(dni) == 8 else MAX_DNI + int(dni)
+
+def _posiciones(serie):
+    """Versión vectorizada de _posicion: máscara de DNIs indexables y sus posiciones"""
+    serie = pd.Series(serie, dtype=object).astype(str).str.strip()
+    validos = serie.str.fullmatch(r'[0-9]{7,8}').to_numpy(bool)
+    textos = serie[validos]
+    posiciones = textos.astype(np.int64).to_numpy() + np.where(textos.str.len() == 7, MAX_DNI, 0)
+    return validos, posiciones
+
+def _marca_reconstruccion():
+    return INDICE_DNI_PATH + '.reconstruido'
+
+def reconstruir():
+    """Reconstruye el índice completo desde la tabla empleados y lo publica de forma atómica"""
+    # El bloqueo cubre la consulta para que ninguna escritura concurrente se pierda al reemplazar el archivo
+    with _BloqueoArchivo():
+        session = get_read_session()
+        try:
+            dnis = pd.Series([fila[0] for fila in session.query(Empleado.dni).yield_per(50000)], dtype=object)
+        finally:
+            session.close()
+        bits = np.zeros(TAMANIO_BYTES, dtype=np.uint8)
+        _, numeros = _posiciones(dnis)
+        np.bitwise_or.at(bits, numeros >> 3, _BITS[numeros & 7])
+        temporal = INDICE_DNI_PATH + '.tmp'
+        bits.tofile(temporal)
+        os.replace(temporal, INDICE_DNI_PATH)
+        with open(_marca_reconstruccion(), 'w') as f:
+            f.write(str(time.time()))
+    return len(numeros)
+
+def _abrir():
+    """Devuelve el bitset mapeado en memoria, reabriéndolo si otro proceso lo reemplazó"""
+    with _lock:
+        inodo = os.stat(INDICE_DNI_PATH).st_ino
+        if _estado['mapa'] is None or _estado['inodo'] != inodo:
+            _estado['mapa'] = np.memmap(INDICE_DNI_PATH, dtype=np.uint8, mode='r+', shape=(TAMANIO_BYTES,))
+            _estado['inodo'] = inodo
+        return _estado['mapa']
+
+def _mapa():
+    """Devuelve el bitset, reconstruyéndolo si no existe, venció INDICE_DNI_TTL o tiene otro formato"""
+    try:
+        antiguedad = time.time() - os.path.getmtime(_marca_reconstruccion())
+        tamanio = os.path.getsize(INDICE_DNI_PATH)
+    except FileNotFoundError:
+        antiguedad, tamanio = float('inf'), None
+    if antiguedad > INDICE_DNI_TTL or tamanio != TAMANIO_BYTES:
+        reconstruir()
+    return _abrir()
+
+def contiene(dni):
+    """Devuelve True en O(1) si el índice registra el DNI.
+
+    Si no lo registra (o el DNI no tiene 7 u 8 dígitos) devuelve None: puede existir igual
+    y solo la base puede responder."""
+    numero = _posicion(dni)
+    if numero is None or not _mapa()[numero >> 3] & (1 << (numero & 7)):
+        return None
+    return True
+
+def contiene_varios(dnis):
+    """Pertenencia vectorizada para una columna completa de DNIs.
+
+    Devuelve un array booleano de pandas con True en los DNIs registrados y NA en el resto,
+    que hay que confirmar contra la base."""
+    validos, numeros = _posiciones(dnis)
+    resultado = pd.array([pd.NA] * len(validos), dtype='boolean')
+    if validos.any():
+        encontrados = (_mapa()[numeros >> 3] & _BITS[numeros & 7]) != 0
+        indices = np.flatnonzero(validos)[encontrados]
+        resultado[indices] = True
+    return resultado
+
+def _marcar(dnis, valor):
+    """Activa o apaga bits en el archivo compartido. Si el índice aún no existe o tiene otro formato no hace nada."""
+    numeros = [n for n in (_posicion(d) for d in dnis) if n is not None]
+    if not numeros or not os.path.exists(INDICE_DNI_PATH) or os.path.getsize(INDICE_DNI_PATH) != TAMANIO_BYTES:
+        return
+    with _BloqueoArchivo():
+        mapa = _abrir()
+        for numero in numeros:
+            if valor:
+                mapa[numero >> 3] |= _BITS[numero & 7]
+            else:
+                mapa[numero >> 3] &= ~_BITS[numero & 7]
+        mapa.flush()
+
+def agregar(*dnis):
+    """Marca DNIs como existentes (llamado por crud después de confirmar)"""
+    _marcar(dnis, True)
+
+def quitar(*dnis):
+    """Marca DNIs como inexistentes (llamado por crud después de borrar)"""
+    _marcar(dnis, False)
@@ -0,0 +1,130 @@
+import codecs
+import csv
+import importlib
+import io
+import time
+import pandas as pd
+
+# Columnas que siempre se leen como texto para no perder ceros a la izquierda
+COLUMNAS_TEXTO = ['dni', 'telefono']
+
+ENCODINGS_CSV = ['utf-8-sig', 'cp1252', 'latin-1']
+DELIMITADORES_CSV = ',;\t|'
+
+def _disponible(modulo):
+    """Indica si un motor opcional se puede importar (no alcanza con que esté instalado)"""
+    try:
+        importlib.import_module(modulo)
+        return True
+    except ImportError:
+        return False
+
+def motor_excel():
+    """Motor más rápido disponible para xlsx: calamine si está instalado, si no openpyxl en modo streaming"""
+    return 'calamine' if _disponible('python_calamine') else 'openpyxl'
+
+def motor_csv():
+    """Motor más rápido disponible para CSV"""
+    return 'pyarrow' if _disponible('pyarrow') else 'c'
+
+def detectar_encoding(contenido):
+    """Devuelve el primer encoding que decodifica una muestra del archivo"""
+    muestra = contenido[:65536]
+    for encoding in ENCODINGS_CSV:
+        try:
+            # Decodificador incremental: un carácter multibyte cortado al final de la muestra no cuenta como error
+            codecs.getincrementaldecoder(encoding)().decode(muestra, final=len(muestra) == len(contenido))
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return 'latin-1'
+
+def detectar_delimitador(contenido, encoding):
+    """Detecta el delimitador del CSV a partir de las primeras líneas"""
+    muestra = contenido[:65536].decode(encoding, errors='ignore')
+    try:
+        return csv.Sniffer().sniff(muestra, delimiters=DELIMITADORES_CSV).delimiter
+    except csv.Error:
+        return ','
+
+def _normalizar_columnas_texto(df, columnas_texto):
+    """Fuerza columnas de texto y quita el '.0' que agregan las celdas numéricas"""
+    for col in df.columns:
+        if str(col).strip().lower() in columnas_texto:
+            serie = df[col].astype('string').str.strip().str.replace(r'\.0$', '', regex=True)
+            df[col] = serie.astype(object).where(serie.notna(), None)
+    return df
+
+def _dtypes_texto(columnas, columnas_texto):
+    return {c: str for c in columnas if str(c).strip().lower() in columnas_texto}
+
+def _leer_csv(contenido, columnas_texto):
+    encoding = detectar_encoding(contenido)
+    delimitador = detectar_delimitador(contenido, encoding)
+    encabezado = pd.read_csv(io.BytesIO(contenido), sep=delimitador, encoding=encoding, nrows=0)
+    motor = motor_csv()
+    df = pd.read_csv(
+        io.BytesIO(contenido),
+        sep=delimitador,
+        encoding=encoding,
+        dtype=_dtypes_texto(encabezado.columns, columnas_texto),
+        engine=motor
+    )
+    return {'CSV': df}, f"{motor} ({encoding}, '{delimitador}')"
+
+def _leer_excel_openpyxl(contenido):
+    """Lectura en streaming con openpyxl read_only, sin cargar estilos ni fórmulas"""
+    from openpyxl import load_workbook
+    libro = load_workbook(io.BytesIO(contenido), read_only=True, data_only=True)
+    hojas = {}
+    try:
+        for hoja in libro.worksheets:
+            filas = hoja.iter_rows(values_only=True)
+            encabezado = next(filas, None)
+            if encabezado is None:
+                continue
+            columnas = [str(c) if c is not None else f"columna_{i + 1}" for i, c in enumerate(encabezado)]
+            datos = [fila for fila in filas if any(v is not None for v in fila)]
+            hojas[hoja.title] = pd.DataFrame(datos, columns=columnas)
+    finally:
+        libro.close()
+    return hojas
+
+def _leer_excel(contenido, columnas_texto):
+    motor = motor_excel()
+    if motor == 'calamine':
+        hojas = pd.read_excel(io.BytesIO(contenido), sheet_name=None, engine='calamine')
+    else:
+        hojas = _leer_excel_openpyxl(contenido)
+    return hojas, motor
+
+def leer_archivo(archivo, nombre=None, columnas_texto=None):
+    """Lee un archivo Excel o CSV con el motor más rápido disponible.
+
+    Devuelve un diccionario con las hojas leídas (nombre -> DataFrame), el motor usado,
+    la cantidad de filas, los segundos de parseo y el rendimiento en filas por segundo.
+    """
+    columnas_texto = [c.lower() for c in (columnas_texto or COLUMNAS_TEXTO)]
+    nombre = nombre or getattr(archivo, 'name', None) or str(archivo)
+    if hasattr(archivo, 'read'):
+        contenido = archivo.getvalue() if hasattr(archivo, 'getvalue') else archivo.read()
+    else:
+        with open(archivo, 'rb') as f:
+            contenido = f.read()
+
+    inicio = time.perf_counter()
+    if nombre.lower().endswith(('.csv', '.txt')):
+        hojas, motor = _leer_csv(contenido, columnas_texto)
+    else:
+        hojas, motor = _leer_excel(contenido, columnas_texto)
+    hojas = {hoja: _normalizar_columnas_texto(df, columnas_texto) for hoja, df in hojas.items()}
+    segundos = time.perf_counter() - inicio
+
+    filas = sum(len(df) for df in hojas.values())
+    return {
+        'hojas': hojas,
+        'motor': motor,
+        'filas': filas,
+        'segundos': segundos,
+        'filas_por_segundo': filas / segundos if segundos > 0 else float('inf')
+    }
@@ -0,0 +1,183 @@
+"""Prueba de carga de las páginas de main.py con sesiones concurrentes (Streamlit AppTest, sin navegador).
+
+Para cada página y cada nivel de concurrencia abre N sesiones ya logueadas, las hace correr
+varios reruns a la vez e informa latencia por rerun (p50/p90/p99), consultas SQL por rerun
+y memoria del proceso. Usa la base configurada en DATABASE_URL; conviene una base local de prueba.
+
+    python prueba_carga.py --sesiones 1,5,10,20 --reruns 5 --sembrar 20000 -o carga.csv
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import os
+import resource
+import threading
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from unittest.mock import MagicMock
+from streamlit.runtime import Runtime
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.testing.v1 import AppTest
+import streamlit.testing.v1.app_test as app_test
+from db import get_session, crear_usuario_admin, Usuario, Empleado
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+PAGINAS = {
+    'dashboard': 'Dashboard',
+    'abm': 'Gestión de Empleados',
+    'importacion': 'Importación',
+    'historial': 'Historial',
+}
+
+_consultas = {'cantidad': 0}
+_consultas_lock = threading.Lock()
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _contar_consulta(conn, cursor, statement, parameters, context, executemany):
+    with _consultas_lock:
+        _consultas['cantidad'] += 1
+
+class _RuntimeDeAppTest:
+    """Recibe las asignaciones que AppTest hace a Runtime._instance en cada corrida.
+
+    AppTest instala un runtime simulado al empezar cada corrida y lo borra al terminar, lo que rompe
+    las corridas que se solapan en otros hilos. Con esto todas las sesiones comparten un único runtime
+    simulado, igual que las sesiones de un mismo proceso de Streamlit comparten el runtime real."""
+    _instance = None
+
+def _preparar_runtime_compartido():
+    if app_test.Runtime is _RuntimeDeAppTest:
+        return
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage('/mock/media'))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+    app_test.Runtime = _RuntimeDeAppTest
+
+def memoria_mb():
+    """Memoria residente actual del proceso (pico si /proc no está disponible)"""
+    try:
+        with open('/proc/self/status') as f:
+            for linea in f:
+                if linea.startswith('VmRSS:'):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _usuario_admin():
+    session = get_session()
+    try:
+        return session.query(Usuario).filter_by(usuario='admin').first()
+    finally:
+        session.close()
+
+def _correr(at):
+    """Una corrida del script: (segundos, hubo_error). Un timeout cuenta como error con su duración."""
+    inicio = time.perf_counter()
+    try:
+        at.run()
+        error = bool(at.exception)
+    except Exception as e:
+        print(f"Corrida fallida: {e}")
+        error = True
+    return time.perf_counter() - inicio, error
+
+def _correr_sesion(pagina, usuario, reruns, timeout, largada):
+    """Una sesión logueada en la página: una primera corrida y luego `reruns` reruns medidos"""
+    at = AppTest.from_file(MAIN, default_timeout=timeout)
+    at.session_state['logged_in'] = True
+    at.session_state['user'] = usuario
+    at.session_state['rol'] = usuario.rol
+    at.session_state['menu'] = PAGINAS[pagina]
+    largada.wait()
+    primera, error = _correr(at)
+    tiempos, errores = [], int(error)
+    for _ in range(reruns):
+        duracion, error = _correr(at)
+        tiempos.append(duracion)
+        errores += error
+    return primera, tiempos, errores
+
+def medir(pagina, sesiones, reruns=5, timeout=60):
+    """Corre `sesiones` sesiones concurrentes sobre una página y devuelve las métricas del nivel"""
+    _preparar_runtime_compartido()
+    usuario = _usuario_admin()
+    largada = threading.Barrier(sesiones)
+    with _consultas_lock:
+        _consultas['cantidad'] = 0
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sesiones) as pool:
+        resultados = list(pool.map(
+            lambda _: _correr_sesion(pagina, usuario, reruns, timeout, largada), range(sesiones)
+        ))
+    duracion = time.perf_counter() - inicio
+    tiempos = np.array([t for _, ts, _ in resultados for t in ts]) * 1000
+    corridas = sesiones * (reruns + 1)
+    return {
+        'pagina': pagina,
+        'sesiones': sesiones,
+        'primera_ms': round(np.mean([p for p, _, _ in resultados]) * 1000, 1),
+        'p50_ms': round(np.percentile(tiempos, 50), 1) if len(tiempos) else None,
+        'p90_ms': round(np.percentile(tiempos, 90), 1) if len(tiempos) else None,
+        'p99_ms': round(np.percentile(tiempos, 99), 1) if len(tiempos) else None,
+        'max_ms': round(tiempos.max(), 1) if len(tiempos) else None,
+        'reruns_por_segundo': round(corridas / duracion, 2),
+        'consultas_por_rerun': round(_consultas['cantidad'] / corridas, 1),
+        'errores': sum(e for _, _, e in resultados),
+        'memoria_mb': round(memoria_mb(), 1),
+    }
+
+def ejecutar(paginas, niveles, reruns=5, timeout=60):
+    """Recorre páginas y niveles de concurrencia; devuelve un DataFrame con una fila por combinación"""
+    filas = []
+    for pagina in paginas:
+        for sesiones in niveles:
+            fila = medir(pagina, sesiones, reruns, timeout)
+            print(
+                f"{pagina:<12} {sesiones:>3} sesiones: p50 {fila['p50_ms']} ms, p99 {fila['p99_ms']} ms, "
+                f"{fila['consultas_por_rerun']} consultas/rerun, {fila['memoria_mb']} MB, {fila['errores']} errores"
+            )
+            filas.append(fila)
+    return pd.DataFrame(filas)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Prueba de carga de las páginas de Streamlit con sesiones concurrentes")
+    parser.add_argument('--paginas', default=','.join(PAGINAS),
+                        help=f"Páginas a probar separadas por coma ({', '.join(PAGINAS)})")
+    parser.add_argument('--sesiones', default='1,5,10',
+                        help="Niveles de concurrencia separados por coma")
+    parser.add_argument('--reruns', type=int, default=5, help="Reruns medidos por sesión")
+    parser.add_argument('--timeout', type=float, default=60, help="Segundos máximos por corrida")
+    parser.add_argument('--sembrar', type=int, default=0,
+                        help="Empleados sintéticos a insertar antes de medir si la base tiene menos")
+    parser.add_argument('-o', '--salida', help="Archivo CSV donde guardar los resultados")
+    args = parser.parse_args()
+
+    paginas = [p.strip() for p in args.paginas.split(',') if p.strip()]
+    desconocidas = [p for p in paginas if p not in PAGINAS]
+    if desconocidas:
+        parser.error(f"Páginas desconocidas: {', '.join(desconocidas)}")
+    niveles = [int(n) for n in args.sesiones.split(',') if n.strip()]
+
+    crear_usuario_admin()
+    if args.sembrar:
+        session = get_session()
+        try:
+            actuales = session.query(Empleado).count()
+        finally:
+            session.close()
+        if actuales < args.sembrar:
+            from seed_data import crear_empleados_masivos
+            print(f"Sembrando {args.sembrar - actuales} empleados...")
+            crear_empleados_masivos(args.sembrar - actuales)
+
+    resultados = ejecutar(paginas, niveles, args.reruns, args.timeout)
+    print(resultados.to_string(index=False))
+    if args.salida:
+        resultados.to_csv(args.salida, index=False)
+        print(f"Resultados guardados en {args.salida}")
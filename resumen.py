@@ -0,0 +1,186 @@
+from collections import Counter
+from datetime import datetime
+import pandas as pd
+from sqlalchemy import func, case, text
+from sqlalchemy.dialects import postgresql, sqlite
+from db import get_session, get_read_session, Empleado, ResumenEmpleados, VersionDatos, EMPLEADO_ACTIVO
+
+# Contadores de empleados activos (db.EMPLEADO_ACTIVO) mantenidos por crud en la misma transacción
+DIMENSIONES = ('estado', 'es_lider', 'skill', 'area', 'mes_ingreso')
+# Fila que indica que la tabla fue reconstruida al menos una vez
+MARCA_INICIALIZADO = ('_inicializado', '')
+# Clave del advisory lock que serializa las reconstrucciones entre procesos (PostgreSQL)
+CLAVE_BLOQUEO = 7_341_001
+
+def _mes(fecha):
+    if fecha is None or (not isinstance(fecha, datetime) and pd.isna(fecha)):
+        return ''
+    return pd.Timestamp(fecha).strftime('%Y-%m')
+
+def contribucion(empleado):
+    """Claves de contador que aporta un empleado (vacío si está dado de baja, mismo criterio que db.EMPLEADO_ACTIVO)"""
+    if empleado is None or empleado.activo is False:
+        return Counter()
+    return Counter([
+        ('total', ''),
+        ('estado', empleado.estado or ''),
+        ('es_lider', str(bool(empleado.es_lider))),
+        ('skill', empleado.skill or ''),
+        ('area', empleado.area or ''),
+        ('mes_ingreso', _mes(empleado.fecha_ingreso)),
+    ])
+
+def diferencia(antes, despues):
+    """Delta de contadores entre dos contribuciones (los valores pueden ser negativos)"""
+    delta = Counter(despues)
+    delta.subtract(antes)
+    return {clave: valor for clave, valor in delta.items() if valor}
+
+def aplicar(session, delta):
+    """Suma un delta a los contadores dentro de la transacción de la sesión (upsert por clave)"""
+    if not delta:
+        return
+    filas = [{'dimension': d, 'valor': v, 'cantidad': c} for (d, v), c in sorted(delta.items())]
+    dialecto = session.get_bind().dialect.name
+    insert = postgresql.insert if dialecto == 'postgresql' else sqlite.insert
+    for fila in filas:
+        sentencia = insert(ResumenEmpleados).values(**fila)
+        sentencia = sentencia.on_conflict_do_update(
+            index_elements=['dimension', 'valor'],
+            set_={'cantidad': ResumenEmpleados.cantidad + sentencia.excluded.cantidad}
+        )
+        session.execute(sentencia)
+
+def marcar_version(session):
+    """Incrementa la versión de datos dentro de la transacción de la escritura.
+
+    Va justo antes de confirmar: el upsert bloquea la fila hasta el commit, y así las escrituras
+    concurrentes la incrementan en orden de confirmación."""
+    dialecto = session.get_bind().dialect.name
+    insert = postgresql.insert if dialecto == 'postgresql' else sqlite.insert
+    sentencia = insert(VersionDatos).values(id=1, version=1)
+    session.execute(sentencia.on_conflict_do_update(
+        index_elements=['id'],
+        set_={'version': VersionDatos.version + 1}
+    ))
+
+def leer_version(session):
+    """Versión de datos actual (0 si todavía no hubo escrituras); una lectura por clave primaria"""
+    return session.query(VersionDatos.version).filter_by(id=1).scalar() or 0
+
+def _contar_desde_empleados(session):
+    """Cuenta desde cero con GROUP BY sobre empleados"""
+    conteo = Counter()
+    activos = session.query(Empleado).filter(EMPLEADO_ACTIVO)
+    conteo[('total', '')] = activos.count()
+    columnas = {
+        'estado': func.coalesce(Empleado.estado, ''),
+        'es_lider': Empleado.es_lider,
+        'skill': func.coalesce(Empleado.skill, ''),
+        'area': func.coalesce(Empleado.area, ''),
+    }
+    for dimension, columna in columnas.items():
+        for valor, cantidad in activos.with_entities(columna, func.count()).group_by(columna):
+            clave = str(bool(valor)) if dimension == 'es_lider' else valor
+            conteo[(dimension, clave)] += cantidad
+    for fecha, in activos.with_entities(Empleado.fecha_ingreso).yield_per(50000):
+        conteo[('mes_ingreso', _mes(fecha))] += 1
+    return conteo
+
+def _bloquear(session):
+    """Serializa las reconstrucciones concurrentes hasta el fin de la transacción"""
+    if session.get_bind().dialect.name == 'postgresql':
+        session.execute(text("SELECT pg_advisory_xact_lock(:clave)"), {'clave': CLAVE_BLOQUEO})
+
+def _reemplazar(session):
+    """Recalcula los contadores dentro de la transacción de la sesión y devuelve las diferencias encontradas"""
+    esperado = _contar_desde_empleados(session)
+    actual = Counter({
+        (r.dimension, r.valor): r.cantidad
+        for r in session.query(ResumenEmpleados).with_for_update()
+        if (r.dimension, r.valor) != MARCA_INICIALIZADO
+    })
+    drift = [
+        {'Dimensión': d, 'Valor': v, 'Contador': actual.get((d, v), 0), 'Real': esperado.get((d, v), 0)}
+        for (d, v) in sorted(set(esperado) | set(actual))
+        if actual.get((d, v), 0) != esperado.get((d, v), 0)
+    ]
+    session.query(ResumenEmpleados).delete()
+    session.add_all([
+        ResumenEmpleados(dimension=d, valor=v, cantidad=c) for (d, v), c in esperado.items() if c
+    ])
+    session.add(ResumenEmpleados(dimension=MARCA_INICIALIZADO[0], valor=MARCA_INICIALIZADO[1], cantidad=1))
+    session.flush()
+    return drift
+
+def reconstruir():
+    """Reconcilia los contadores: los recalcula desde empleados, informa las diferencias y los reemplaza.
+
+    Devuelve un DataFrame con las claves que tenían drift (vacío si todo coincidía).
+    """
+    session = get_session()
+    try:
+        _bloquear(session)
+        drift = _reemplazar(session)
+        session.commit()
+        return pd.DataFrame(drift, columns=['Dimensión', 'Valor', 'Contador', 'Real'])
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+def _leer_metricas(session):
+    """(inicializado, total, activos, líderes, skills únicos) en una sola consulta"""
+    d, v, c = ResumenEmpleados.dimension, ResumenEmpleados.valor, ResumenEmpleados.cantidad
+    return session.query(
+        func.sum(case((d == MARCA_INICIALIZADO[0], c), else_=0)),
+        func.sum(case((d == 'total', c), else_=0)),
+        func.sum(case(((d == 'estado') & (v == 'activo'), c), else_=0)),
+        func.sum(case(((d == 'es_lider') & (v == 'True'), c), else_=0)),
+        func.count(case(((d == 'skill') & (v != '') & (c > 0), 1))),
+    ).one()
+
+def obtener_metricas():
+    """Métricas principales leídas de los contadores en una sola consulta"""
+    session = get_read_session()
+    try:
+        fila = _leer_metricas(session)
+    finally:
+        session.close()
+    if not fila[0]:
+        # Primera vez: inicializar en el primario (la réplica puede no tener todavía la marca).
+        # Con el lock tomado se vuelve a mirar: otra sesión pudo haberlos inicializado mientras tanto.
+        session = get_session()
+        try:
+            _bloquear(session)
+            fila = _leer_metricas(session)
+            if not fila[0]:
+                _reemplazar(session)
+                fila = _leer_metricas(session)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+    return {'total': fila[1], 'activos': fila[2], 'lideres': fila[3], 'skills_unicos': fila[4]}
+
+def conteos(dimension):
+    """Contadores de una dimensión como Serie ordenada de mayor a menor"""
+    session = get_read_session()
+    try:
+        filas = session.query(ResumenEmpleados.valor, ResumenEmpleados.cantidad).filter(
+            ResumenEmpleados.dimension == dimension, ResumenEmpleados.cantidad > 0
+        ).all()
+    finally:
+        session.close()
+    return pd.Series(dict(filas), dtype='int64').sort_values(ascending=False)
+
+if __name__ == '__main__':
+    drift = reconstruir()
+    if drift.empty:
+        print("Contadores consistentes con la tabla empleados")
+    else:
+        print(f"Se corrigieron {len(drift)} contadores con diferencias:")
+        print(drift.to_string(index=False))
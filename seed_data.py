@@ -1,4 +1,8 @@
-from db import get_session, Empleado, Usuario, LogCambio
+from db import get_session, registrar_escritura, Empleado, Usuario, LogCambio
+from sqlalchemy import insert
+import indice_dni
+import resumen
+from auditoria import RegistroAuditoria
 from datetime import datetime, timedelta
 import random
 import bcrypt
@@ -50,6 +54,7 @@ def crear_empleados_ejemplo():
             session.commit()
         
         # Crear empleados de ejemplo
+        auditoria = RegistroAuditoria(session, admin.id)
         for _ in range(20):  # Crear 20 empleados
             empleado = Empleado(
                 dni=generar_dni(),
@@ -63,15 +68,10 @@ def crear_empleados_ejemplo():
             session.add(empleado)
             
             # Registrar en log
-            log = LogCambio(
-                usuario_id=admin.id,
-                empleado_dni=empleado.dni,
-                accion='alta',
-                detalle=f"Alta de empleado: {empleado.nombre} {empleado.apellido}"
-            )
-            session.add(log)
+            auditoria.registrar(empleado.dni, 'alta', f"Alta de empleado: {empleado.nombre} {empleado.apellido}")
         
-        session.commit()
+        resumen.marcar_version(session)
+        auditoria.confirmar()
         print("Datos de ejemplo creados exitosamente")
         
     except Exception as e:
@@ -80,5 +80,45 @@ def crear_empleados_ejemplo():
     finally:
         session.close()
 
+def crear_empleados_masivos(cantidad, usuario_id=None):
+    """Inserta muchos empleados sintéticos de una vez (para pruebas de carga) y reconstruye contadores e índice"""
+    session = get_session()
+    try:
+        if usuario_id is None:
+            usuario_id = session.query(Usuario.id).filter_by(usuario='admin').scalar()
+        existentes = {dni for dni, in session.query(Empleado.dni)}
+        dnis = set()
+        while len(dnis) < cantidad:
+            dni = generar_dni()
+            if dni not in existentes:
+                dnis.add(dni)
+        ahora = datetime.now()
+        empleados = [{
+            'dni': dni,
+            'nombre': random.choice(nombres),
+            'apellido': random.choice(apellidos),
+            'fecha_ingreso': generar_fecha_ingreso(),
+            'estado': random.choices(['activo', 'inactivo'], weights=[9, 1])[0],
+            'skill': random.choice(skills),
+            'es_lider': random.random() < 0.1,
+            'activo': True,
+            'fecha_creacion': ahora
+        } for dni in dnis]
+        session.execute(insert(Empleado), empleados)
+        session.execute(insert(LogCambio), [{
+            'timestamp': ahora, 'usuario_id': usuario_id, 'empleado_dni': e['dni'], 'accion': 'alta',
+            'detalle': f"Alta de empleado: {e['nombre']} {e['apellido']}"
+        } for e in empleados])
+        resumen.marcar_version(session)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+    resumen.reconstruir()
+    indice_dni.reconstruir()
+    registrar_escritura()
+
 if __name__ == '__main__':
     crear_empleados_ejemplo() 
\ No newline at end of file
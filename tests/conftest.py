@@ -0,0 +1,33 @@
+"""Base SQLite en memoria por test, con la caché compartida y el índice de DNIs en un directorio temporal."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+import cache_compartido
+import db
+import indice_dni
+
+@pytest.fixture(autouse=True)
+def engine(monkeypatch, tmp_path):
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    db.Base.metadata.create_all(engine)
+    monkeypatch.setattr(db, 'get_engine', lambda: engine)
+    monkeypatch.setattr(cache_compartido, 'CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setitem(cache_compartido._backend, 'instancia', None)
+    monkeypatch.setattr(indice_dni, 'INDICE_DNI_PATH', str(tmp_path / 'indice' / 'dnis.bin'))
+    db.crear_usuario_admin(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def usuario_id():
+    session = db.get_session()
+    try:
+        return session.query(db.Usuario.id).filter_by(usuario='admin').scalar()
+    finally:
+        session.close()
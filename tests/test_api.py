@@ -0,0 +1,101 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+import pandas as pd
+import pytest
+from sqlalchemy import event
+import api
+import crud
+
+@pytest.fixture
+def servidor():
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), api.ManejadorApi)
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    yield f"http://127.0.0.1:{servidor.server_port}"
+    servidor.shutdown()
+    servidor.server_close()
+
+def _pedir(url, **encabezados):
+    """(estado, encabezados, cuerpo JSON o None)"""
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=encabezados)) as respuesta:
+            cuerpo = respuesta.read()
+            return respuesta.status, respuesta.headers, json.loads(cuerpo) if cuerpo else None
+    except urllib.error.HTTPError as e:
+        cuerpo = e.read()
+        return e.code, e.headers, json.loads(cuerpo) if cuerpo else None
+
+def _importar(usuario_id, cantidad):
+    crud.importar_empleados(pd.DataFrame({
+        'dni': [str(40000000 + i) for i in range(cantidad)],
+        'nombre': 'Ana',
+        'apellido': 'Paz',
+        'fecha_ingreso': '2020-01-01',
+        'estado': 'activo',
+    }), usuario_id)
+
+def test_etag_responde_304_sin_consultar_empleados(servidor, usuario_id, engine):
+    _importar(usuario_id, 3)
+    estado, encabezados, _ = _pedir(f"{servidor}/empleados")
+    assert estado == 200
+    etag = encabezados['ETag']
+    sentencias = []
+    escuchar = lambda conn, cursor, sentencia, *args: sentencias.append(sentencia)
+    event.listen(engine, 'before_cursor_execute', escuchar)
+    try:
+        estado, _, cuerpo = _pedir(f"{servidor}/empleados", **{'If-None-Match': etag})
+    finally:
+        event.remove(engine, 'before_cursor_execute', escuchar)
+    assert estado == 304
+    assert cuerpo is None
+    assert not any('empleados' in s for s in sentencias)
+
+def test_etag_cambia_despues_de_una_escritura(servidor, usuario_id):
+    _importar(usuario_id, 3)
+    _, encabezados, _ = _pedir(f"{servidor}/empleados")
+    etag = encabezados['ETag']
+    crud.actualizar_empleado('40000001', {'nombre': 'Eva'}, usuario_id)
+    estado, encabezados, cuerpo = _pedir(f"{servidor}/empleados", **{'If-None-Match': etag})
+    assert estado == 200
+    assert encabezados['ETag'] != etag
+    assert 'Eva' in [e['nombre'] for e in cuerpo['datos']]
+
+def test_etag_distingue_consultas(servidor, usuario_id):
+    _importar(usuario_id, 3)
+    _, primera, _ = _pedir(f"{servidor}/empleados?limite=1")
+    _, segunda, _ = _pedir(f"{servidor}/empleados?limite=2")
+    assert primera['ETag'] != segunda['ETag']
+
+def test_paginacion_por_dni_recorre_todo_sin_repetir(servidor, usuario_id):
+    _importar(usuario_id, 25)
+    vistos, despues, paginas = [], None, 0
+    while True:
+        url = f"{servidor}/empleados?campos=dni&limite=10" + (f"&despues={despues}" if despues else "")
+        estado, _, cuerpo = _pedir(url)
+        assert estado == 200
+        vistos += [e['dni'] for e in cuerpo['datos']]
+        paginas += 1
+        despues = cuerpo['siguiente']
+        if despues is None:
+            break
+    assert paginas == 3
+    assert vistos == sorted(str(40000000 + i) for i in range(25))
+
+def test_paginacion_del_historial_por_id(servidor, usuario_id):
+    _importar(usuario_id, 5)
+    _, _, primera = _pedir(f"{servidor}/log?limite=3")
+    _, _, segunda = _pedir(f"{servidor}/log?limite=3&antes={primera['siguiente']}")
+    ids = [l['id'] for l in primera['datos'] + segunda['datos']]
+    assert ids == sorted(ids, reverse=True)
+    assert len(set(ids)) == 5
+    assert segunda['siguiente'] is None
+
+def test_parametros_invalidos_devuelven_400(servidor):
+    estado, _, cuerpo = _pedir(f"{servidor}/empleados?limite=muchos")
+    assert estado == 400
+    assert 'limite' in cuerpo['error']
+    estado, _, _ = _pedir(f"{servidor}/empleados?color=rojo")
+    assert estado == 400
@@ -0,0 +1,58 @@
+import pandas as pd
+import crud
+from db import get_session, Empleado, LogCambio, FilaCuarentena
+
+def _archivo(dnis, **columnas):
+    datos = {'dni': dnis, 'nombre': 'Ana', 'apellido': 'Paz', 'fecha_ingreso': '2020-01-01', 'estado': 'activo'}
+    datos.update(columnas)
+    return pd.DataFrame(datos)
+
+def _contar(modelo, **filtros):
+    session = get_session()
+    try:
+        return session.query(modelo).filter_by(**filtros).count()
+    finally:
+        session.close()
+
+def test_reimportar_el_mismo_archivo_no_cambia_nada(usuario_id):
+    df = _archivo(['30111222', '30111222', '30111223'], nombre=['B', 'B2', 'C'])
+    primera = crud.importar_empleados(df, usuario_id)
+    assert primera['nuevos'] == 2
+    assert primera['omitidos'] == 1
+    logs = _contar(LogCambio)
+    for _ in range(3):
+        otra = crud.importar_empleados(df, usuario_id)
+        assert otra['nuevos'] == 0
+        assert otra['actualizados'] == 0
+        assert otra['sin_cambios'] == 2
+    assert _contar(LogCambio) == logs
+    assert crud.obtener_empleado('30111222').nombre == 'B2'
+
+def test_cambios_en_el_archivo_se_aplican(usuario_id):
+    crud.importar_empleados(_archivo(['30111222']), usuario_id)
+    estadisticas = crud.importar_empleados(_archivo(['30111222'], skill='python'), usuario_id)
+    assert estadisticas['actualizados'] == 1
+    assert crud.obtener_empleado('30111222').skill == 'python'
+
+def test_fila_invalida_queda_en_cuarentena_y_el_bloque_se_confirma(usuario_id):
+    dnis = [str(10000000 + i) for i in range(250)]
+    df = _archivo(dnis)
+    df.loc[37, 'fecha_ingreso'] = 'fecha-rota'
+    estadisticas = crud.importar_empleados(df, usuario_id, trabajo_id=None)
+    assert estadisticas['nuevos'] == 249
+    assert estadisticas['cuarentena'] == 1
+    assert _contar(Empleado) == 249
+    assert crud.obtener_empleado(dnis[37]) is None
+    # Los demás DNIs del savepoint que falló se reintentaron de a uno
+    assert crud.obtener_empleado(dnis[36]) is not None
+    assert crud.obtener_empleado(dnis[38]) is not None
+    [fila] = crud.listar_cuarentena()
+    assert fila.dni == dnis[37]
+    assert fila.fila['fecha_ingreso'] == 'fecha-rota'
+    assert fila.motivo
+    assert _contar(FilaCuarentena) == 1
+
+def test_filas_sin_dni_se_omiten(usuario_id):
+    estadisticas = crud.importar_empleados(_archivo(['30111222', None, '']), usuario_id)
+    assert estadisticas['nuevos'] == 1
+    assert estadisticas['omitidos'] == 2
@@ -0,0 +1,64 @@
+import pandas as pd
+import crud
+import resumen
+from db import get_session, Empleado, ResumenEmpleados, EMPLEADO_ACTIVO
+
+def _archivo(cantidad):
+    return pd.DataFrame({
+        'dni': [str(20000000 + i) for i in range(cantidad)],
+        'nombre': 'Ana',
+        'apellido': 'Paz',
+        'fecha_ingreso': ['2019-05-01' if i % 2 else '2021-07-15' for i in range(cantidad)],
+        'estado': ['inactivo' if i % 5 == 0 else 'activo' for i in range(cantidad)],
+        'skill': [f"skill{i % 4}" for i in range(cantidad)],
+        'es_lider': [i % 7 == 0 for i in range(cantidad)],
+    })
+
+def _metricas_reales():
+    session = get_session()
+    try:
+        activos = session.query(Empleado).filter(EMPLEADO_ACTIVO)
+        return {
+            'total': activos.count(),
+            'activos': activos.filter(Empleado.estado == 'activo').count(),
+            'lideres': activos.filter(Empleado.es_lider.is_(True)).count(),
+            'skills_unicos': activos.filter(Empleado.skill != '').with_entities(Empleado.skill).distinct().count(),
+        }
+    finally:
+        session.close()
+
+def test_los_contadores_no_tienen_drift_despues_de_escribir(usuario_id):
+    # Inicializa los contadores sobre la base vacía; desde acá los mantiene crud
+    assert resumen.obtener_metricas()['total'] == 0
+    crud.importar_empleados(_archivo(40), usuario_id)
+    cambiado = _archivo(40).iloc[:10].assign(skill='nueva', estado='activo')
+    crud.importar_empleados(cambiado, usuario_id)
+    crud.actualizar_empleado('20000011', {'es_lider': True, 'skill': 'otra'}, usuario_id)
+    crud.eliminar_empleado('20000012', usuario_id)
+    crud.crear_empleado('20000099', 'Luz', 'Sol', None, 'activo', '', False, usuario_id)
+    assert resumen.obtener_metricas() == _metricas_reales()
+    assert resumen.reconstruir().empty
+
+def test_la_primera_lectura_inicializa_los_contadores(usuario_id):
+    crud.importar_empleados(_archivo(12), usuario_id)
+    session = get_session()
+    try:
+        session.query(ResumenEmpleados).delete()
+        session.commit()
+    finally:
+        session.close()
+    assert resumen.obtener_metricas() == _metricas_reales()
+    assert resumen.obtener_metricas() == _metricas_reales()
+
+def test_reconstruir_informa_y_corrige_el_drift(usuario_id):
+    crud.importar_empleados(_archivo(10), usuario_id)
+    resumen.reconstruir()
+    session = get_session()
+    try:
+        session.query(ResumenEmpleados).filter_by(dimension='total').update({'cantidad': 999})
+        session.commit()
+    finally:
+        session.close()
+    drift = resumen.reconstruir()
+    assert drift[['Dimensión', 'Contador', 'Real']].values.tolist() == [['total', 999, 10]]
+    assert resumen.obtener_metricas()['total'] == 10
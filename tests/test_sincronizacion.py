@@ -0,0 +1,70 @@
+import pandas as pd
+import crud
+from db import get_session, Empleado, LogCambio
+
+def _padron(filas):
+    return pd.DataFrame(filas, columns=['dni', 'nombre', 'apellido', 'fecha_ingreso', 'estado', 'skill', 'es_lider'])
+
+def _empleado(dni):
+    session = get_session()
+    try:
+        return session.query(Empleado).filter_by(dni=dni).one()
+    finally:
+        session.close()
+
+def _alta(**datos):
+    session = get_session()
+    try:
+        session.add(Empleado(nombre='A', apellido='B', estado='activo', **datos))
+        session.commit()
+    finally:
+        session.close()
+
+def test_inactiva_a_quienes_no_figuran_y_da_de_alta_los_nuevos(usuario_id):
+    _alta(dni='11111111', activo=True)
+    _alta(dni='22222222', activo=True)
+    estadisticas = crud.sincronizar_padron(_padron([
+        ['22222222', 'A', 'B', '2020-01-01', 'activo', 'x', 'no'],
+        ['33333333', 'C', 'D', '2021-02-03', 'activo', 'y', 'si'],
+    ]), usuario_id)
+    assert estadisticas['nuevos'] == 1
+    assert estadisticas['inactivados'] == 1
+    assert _empleado('11111111').estado == 'inactivo'
+    assert _empleado('22222222').estado == 'activo'
+    nuevo = _empleado('33333333')
+    assert nuevo.es_lider is True
+    assert nuevo.fecha_ingreso == pd.Timestamp('2021-02-03')
+
+def test_reactiva_un_empleado_dado_de_baja_que_figura_en_el_padron(usuario_id):
+    _alta(dni='11111111', activo=False)
+    estadisticas = crud.sincronizar_padron(_padron([
+        ['11111111', 'A', 'B', None, 'activo', None, None],
+    ]), usuario_id)
+    assert estadisticas['reactivados'] == 1
+    assert estadisticas['actualizados'] == 1
+    assert _empleado('11111111').activo is True
+    session = get_session()
+    try:
+        detalle = session.query(LogCambio.detalle).filter_by(empleado_dni='11111111').scalar()
+    finally:
+        session.close()
+    assert 'activo: False -> True' in detalle
+
+def test_fecha_ilegible_no_frena_la_sincronizacion(usuario_id):
+    _alta(dni='11111111', activo=True)
+    estadisticas = crud.sincronizar_padron(_padron([
+        ['11111111', 'A', 'B', 'no-es-fecha', 'activo', 'x', 'no'],
+        ['22222222', 'C', 'D', '2021-02-03', 'activo', 'y', 'no'],
+    ]), usuario_id)
+    assert estadisticas['fechas_invalidas'] == ['11111111']
+    assert estadisticas['nuevos'] == 1
+    assert _empleado('11111111').fecha_ingreso is None
+
+def test_sincronizar_dos_veces_no_registra_cambios(usuario_id):
+    padron = _padron([['11111111', 'A', 'B', '2020-01-01', 'activo', 'x', 'no']])
+    crud.sincronizar_padron(padron, usuario_id)
+    estadisticas = crud.sincronizar_padron(padron, usuario_id)
+    assert estadisticas['nuevos'] == 0
+    assert estadisticas['actualizados'] == 0
+    assert estadisticas['inactivados'] == 0
+    assert estadisticas['sin_cambios'] == 1
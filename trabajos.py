@@ -0,0 +1,279 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import datetime, timedelta
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+from sqlalchemy import func
+from db import get_session, TrabajoImportacion
+from crud import importar_empleados, sincronizar_padron
+
+# Filas por transacción: entre lotes se actualiza el progreso y se revisa si se pidió cancelar
+TAMANIO_LOTE = int(os.environ.get('IMPORTACION_TAMANIO_LOTE', '500'))
+MAX_TRABAJOS = int(os.environ.get('IMPORTACION_MAX_TRABAJOS', '2'))
+# Procesos por importación en modo paralelo; cada uno usa su propia conexión
+MAX_WORKERS = int(os.environ.get('IMPORTACION_MAX_WORKERS', str(os.cpu_count() or 1)))
+
+# Cada cuántos segundos el proceso renueva el latido de sus trabajos; sin latido por
+# IMPORTACION_LATIDO_VENCIDO segundos se considera que el proceso murió (reinicio, deploy)
+LATIDO_SEGUNDOS = int(os.environ.get('IMPORTACION_LATIDO_SEGUNDOS', '15'))
+LATIDO_VENCIDO = int(os.environ.get('IMPORTACION_LATIDO_VENCIDO', str(LATIDO_SEGUNDOS * 4)))
+
+ESTADOS_FINALES = ('completado', 'fallido', 'cancelado')
+# incremental: altas y cambios por lotes; completo: además inactiva a quienes no figuran en el archivo
+MODOS_IMPORTACION = ('incremental', 'completo')
+
+# Pool de workers compartido por todas las sesiones del proceso; sobrevive a los reruns de Streamlit
+_executor = ThreadPoolExecutor(max_workers=MAX_TRABAJOS, thread_name_prefix='importacion')
+# Trabajos (en cola o en curso) de este proceso, cuyo latido mantiene el hilo _latir
+_propios = set()
+_propios_lock = threading.Lock()
+_latido = {'hilo': None}
+
+def _latir():
+    """Renueva el latido de los trabajos de este proceso mientras tenga alguno"""
+    while True:
+        with _propios_lock:
+            ids = list(_propios)
+            if not ids:
+                _latido['hilo'] = None
+                return
+        session = get_session()
+        try:
+            session.query(TrabajoImportacion).filter(TrabajoImportacion.id.in_(ids)).update(
+                {TrabajoImportacion.latido: datetime.now()}, synchronize_session=False
+            )
+            session.commit()
+        except Exception:
+            session.rollback()
+        finally:
+            session.close()
+        time.sleep(LATIDO_SEGUNDOS)
+
+def _registrar_propio(trabajo_id):
+    with _propios_lock:
+        _propios.add(trabajo_id)
+        if _latido['hilo'] is None:
+            _latido['hilo'] = threading.Thread(target=_latir, name='latido-importacion', daemon=True)
+            _latido['hilo'].start()
+
+def _liberar_propio(trabajo_id):
+    with _propios_lock:
+        _propios.discard(trabajo_id)
+
+def marcar_trabajos_vencidos():
+    """Marca como fallidos los trabajos sin terminar cuyo proceso dejó de dar latidos. Devuelve cuántos."""
+    limite = datetime.now() - timedelta(seconds=LATIDO_VENCIDO)
+    session = get_session()
+    try:
+        cantidad = session.query(TrabajoImportacion).filter(
+            TrabajoImportacion.estado.notin_(ESTADOS_FINALES),
+            func.coalesce(TrabajoImportacion.latido, TrabajoImportacion.fecha_creacion) < limite
+        ).update({
+            TrabajoImportacion.estado: 'fallido',
+            TrabajoImportacion.error: "El proceso que ejecutaba la importación se detuvo (sin latido)",
+            TrabajoImportacion.fecha_fin: datetime.now()
+        }, synchronize_session=False)
+        session.commit()
+        return cantidad
+    finally:
+        session.close()
+
+def _actualizar_trabajo(trabajo_id, **valores):
+    """Actualiza columnas del trabajo y devuelve si se pidió cancelarlo"""
+    session = get_session()
+    try:
+        trabajo = session.get(TrabajoImportacion, trabajo_id)
+        for key, value in valores.items():
+            setattr(trabajo, key, value)
+        session.commit()
+        return trabajo.cancelar
+    finally:
+        session.close()
+
+def _sumar_progreso(trabajo_id, procesados, fallidos):
+    """Incrementa los contadores de forma atómica (varios workers escriben a la vez) y devuelve si se pidió cancelar"""
+    session = get_session()
+    try:
+        session.query(TrabajoImportacion).filter_by(id=trabajo_id).update({
+            TrabajoImportacion.procesados: TrabajoImportacion.procesados + procesados,
+            TrabajoImportacion.fallidos: TrabajoImportacion.fallidos + fallidos
+        }, synchronize_session=False)
+        session.commit()
+        return session.query(TrabajoImportacion.cancelar).filter_by(id=trabajo_id).scalar()
+    finally:
+        session.close()
+
+def particionar_por_dni(df, partes):
+    """Divide las filas en particiones por hash estable del DNI, de modo que un DNI siempre cae en el mismo worker"""
+    dnis = df['dni'].astype(str).str.strip()
+    particion = dnis.map(lambda dni: zlib.crc32(dni.encode('utf-8')) % partes)
+    return [df[particion == i] for i in range(partes)]
+
+def _importar_particion(trabajo_id, df, usuario_id):
+    """Importa filas por lotes con una transacción por lote. Corre en el hilo del trabajo o en un proceso worker."""
+    inicio = time.perf_counter()
+    estadisticas = {
+        'nuevos': 0, 'actualizados': 0, 'sin_cambios': 0, 'omitidos': 0, 'cuarentena': 0,
+        'procesados': 0, 'fallidos': 0, 'errores': [], 'cancelado': False
+    }
+    for desde in range(0, len(df), TAMANIO_LOTE):
+        lote = df.iloc[desde:desde + TAMANIO_LOTE]
+        procesados = fallidos = 0
+        try:
+            resultado = importar_empleados(lote, usuario_id, trabajo_id)
+            for key, value in resultado.items():
+                estadisticas[key] += value
+            # Las filas en cuarentena cuentan como fallidas; el resto del lote quedó confirmado
+            fallidos = resultado['cuarentena']
+            procesados = len(lote) - fallidos
+        except Exception as e:
+            # Error fuera de las filas (p. ej. conexión perdida): el lote se revierte completo y se sigue con el siguiente
+            fallidos = len(lote)
+            estadisticas['errores'].append(f"DNIs {lote['dni'].iloc[0]}..{lote['dni'].iloc[-1]}: {str(e)[:200]}")
+        estadisticas['procesados'] += procesados
+        estadisticas['fallidos'] += fallidos
+        if _sumar_progreso(trabajo_id, procesados, fallidos):
+            estadisticas['cancelado'] = True
+            break
+    estadisticas['segundos'] = round(time.perf_counter() - inicio, 2)
+    return estadisticas
+
+def _combinar_estadisticas(parciales):
+    """Suma las estadísticas de cada worker y conserva el detalle por worker"""
+    total = {'nuevos': 0, 'actualizados': 0, 'sin_cambios': 0, 'omitidos': 0, 'cuarentena': 0, 'procesados': 0, 'fallidos': 0}
+    for parcial in parciales:
+        for key in total:
+            total[key] += parcial[key]
+    total['workers'] = [
+        {k: v for k, v in parcial.items() if k != 'errores'} for parcial in parciales
+    ]
+    errores = [error for parcial in parciales for error in parcial['errores']]
+    cancelado = any(parcial['cancelado'] for parcial in parciales)
+    return total, errores, cancelado
+
+def _sincronizar(trabajo_id, df, usuario_id):
+    """Sincronización completa en una sola transacción; no se puede partir en lotes ni cancelar a mitad.
+    Devuelve las estadísticas y el aviso de fechas ilegibles (o None)."""
+    inicio = time.perf_counter()
+    estadisticas = sincronizar_padron(df, usuario_id)
+    _sumar_progreso(trabajo_id, len(df), 0)
+    # En el resumen solo la cantidad; los DNIs van al detalle de errores del trabajo
+    fechas_invalidas = estadisticas.pop('fechas_invalidas')
+    aviso = None
+    if fechas_invalidas:
+        aviso = (f"Fecha de ingreso ilegible en {len(fechas_invalidas)} filas (se conservó la fecha guardada): "
+                 + ", ".join(fechas_invalidas[:50]) + ("..." if len(fechas_invalidas) > 50 else ""))
+    estadisticas.update({'procesados': len(df), 'fallidos': 0, 'fechas_invalidas': len(fechas_invalidas)})
+    estadisticas['segundos'] = round(time.perf_counter() - inicio, 2)
+    return estadisticas, aviso
+
+def _ejecutar_importacion(trabajo_id, df, usuario_id, workers=1, modo='incremental'):
+    """Cuerpo del trabajo: importa en el hilo actual o repartiendo el archivo entre procesos por DNI"""
+    try:
+        _ejecutar_trabajo(trabajo_id, df, usuario_id, workers, modo)
+    finally:
+        _liberar_propio(trabajo_id)
+
+def _ejecutar_trabajo(trabajo_id, df, usuario_id, workers, modo):
+    try:
+        if _actualizar_trabajo(trabajo_id, estado='en_curso', fecha_inicio=datetime.now()):
+            _actualizar_trabajo(trabajo_id, estado='cancelado', fecha_fin=datetime.now())
+            return
+        if modo == 'completo':
+            resumen, aviso = _sincronizar(trabajo_id, df, usuario_id)
+            _actualizar_trabajo(trabajo_id, estado='completado', resumen=resumen, error=aviso, fecha_fin=datetime.now())
+            return
+        if workers > 1:
+            particiones = [p for p in particionar_por_dni(df, workers) if not p.empty]
+            # spawn: cada proceso arranca limpio y crea su propio engine y conexiones
+            contexto = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=len(particiones), mp_context=contexto) as pool:
+                futuros = [pool.submit(_importar_particion, trabajo_id, p, usuario_id) for p in particiones]
+                parciales = [f.result() for f in futuros]
+        else:
+            parciales = [_importar_particion(trabajo_id, df, usuario_id)]
+        resumen, errores, cancelado = _combinar_estadisticas(parciales)
+        if cancelado:
+            estado = 'cancelado'
+        elif resumen['fallidos'] and not resumen['procesados']:
+            estado = 'fallido'
+        else:
+            estado = 'completado'
+        _actualizar_trabajo(
+            trabajo_id, estado=estado, resumen=resumen,
+            error="\n".join(errores) or None, fecha_fin=datetime.now()
+        )
+    except Exception as e:
+        _actualizar_trabajo(trabajo_id, estado='fallido', error=str(e), fecha_fin=datetime.now())
+
+def enviar_importacion(df, usuario_id, archivo=None, workers=1, modo='incremental', hash_archivo=None):
+    """Registra un trabajo de importación y lo envía al pool de workers. Devuelve el id del trabajo.
+
+    Con workers > 1 las filas se reparten por hash de DNI entre procesos independientes.
+    El modo 'completo' sincroniza contra el padrón entero y siempre corre en un solo worker.
+    """
+    if modo not in MODOS_IMPORTACION:
+        raise ValueError(f"Modo de importación inválido: {modo}")
+    workers = max(1, min(int(workers), MAX_WORKERS))
+    session = get_session()
+    try:
+        trabajo = TrabajoImportacion(usuario_id=usuario_id, archivo=archivo, total=len(df), hash_archivo=hash_archivo,
+                                     latido=datetime.now())
+        session.add(trabajo)
+        session.commit()
+        trabajo_id = trabajo.id
+    finally:
+        session.close()
+    _registrar_propio(trabajo_id)
+    _executor.submit(_ejecutar_importacion, trabajo_id, df.copy(), usuario_id, workers, modo)
+    return trabajo_id
+
+def hash_archivo(contenido):
+    """Hash SHA-256 del contenido del archivo subido"""
+    return hashlib.sha256(contenido).hexdigest()
+
+def buscar_importacion_previa(hash_archivo):
+    """Último trabajo completado con el mismo archivo, o None"""
+    session = get_session()
+    try:
+        return (
+            session.query(TrabajoImportacion)
+            .filter_by(hash_archivo=hash_archivo, estado='completado')
+            .order_by(TrabajoImportacion.fecha_creacion.desc())
+            .first()
+        )
+    finally:
+        session.close()
+
+def puede_cancelar(trabajo, usuario_id, es_admin=False):
+    """Solo quien envió el trabajo o un administrador puede cancelarlo"""
+    return es_admin or trabajo.usuario_id == usuario_id
+
+def cancelar_trabajo(trabajo_id, usuario_id, es_admin=False):
+    """Pide cancelar un trabajo; se detiene al terminar el lote en curso"""
+    session = get_session()
+    try:
+        trabajo = session.get(TrabajoImportacion, trabajo_id)
+        if not trabajo or trabajo.estado in ESTADOS_FINALES:
+            return False
+        if not puede_cancelar(trabajo, usuario_id, es_admin):
+            raise PermissionError("Solo quien envió la importación o un administrador puede cancelarla")
+        trabajo.cancelar = True
+        session.commit()
+        return True
+    finally:
+        session.close()
+
+def listar_trabajos(usuario_id=None, limite=20):
+    """Lista los trabajos de importación más recientes"""
+    session = get_session()
+    try:
+        query = session.query(TrabajoImportacion)
+        if usuario_id is not None:
+            query = query.filter_by(usuario_id=usuario_id)
+        return query.order_by(TrabajoImportacion.fecha_creacion.desc()).limit(limite).all()
+    finally:
+        session.close()
@@ -4,8 +4,20 @@ import datetime
 import psycopg2
 import time
 import random
-from crud import crear_empleado, actualizar_empleado, eliminar_empleado, obtener_empleado, listar_empleados
-from utils import validar_dni, normalizar_fecha, normalizar_estado, normalizar_boolean, formatear_fecha
+from crud import crear_empleado, actualizar_empleado, eliminar_empleado, obtener_empleado, listar_empleados_df, fusionar_empleados, obtener_version_datos
+from duplicados import detectar_duplicados
+from calidad_datos import escanear_calidad
+from utils import validar_dni, validar_email, validar_telefono, normalizar_fecha, normalizar_estado, normalizar_boolean, formatear_fecha
+from cache_compartido import cacheado
+
+# Filas de la lista que se arman por rerun; el resto se navega por página
+FILAS_POR_PAGINA = 50
+
+@cacheado()
+def _valores_existentes(version):
+    """Skills, áreas y proyectos cargados, para autocompletar. Se cachean por versión de datos."""
+    existentes = listar_empleados_df(['skill', 'area', 'proyecto'])
+    return {columna: sorted(set(existentes[columna].dropna()) - {''}) for columna in existentes.columns}
 
 def mostrar_formulario_empleado(empleado=None, form_key=None):
     """Muestra el formulario para crear/editar empleado con validación avanzada y mejor UX/UI"""
@@ -20,10 +32,10 @@ def mostrar_formulario_empleado(empleado=None, form_key=None):
         st.session_state[campos_key] = []
 
     # Obtener valores existentes para autocompletado
-    empleados = listar_empleados()
-    skills_unicos = sorted(list(set(e.skill for e in empleados if e.skill)))
-    areas_unicas = sorted(list(set(getattr(e, 'area', '') for e in empleados if getattr(e, 'area', ''))))
-    proyectos_unicos = sorted(list(set(getattr(e, 'proyecto', '') for e in empleados if getattr(e, 'proyecto', ''))))
+    existentes = _valores_existentes(obtener_version_datos())
+    skills_unicos = existentes['skill']
+    areas_unicas = existentes['area']
+    proyectos_unicos = existentes['proyecto']
 
     # Botón para agregar campo personalizado (fuera del formulario)
     st.markdown("<b>➕ Campos personalizados</b>", unsafe_allow_html=True)
@@ -96,11 +108,11 @@ def mostrar_formulario_empleado(empleado=None, form_key=None):
         with st.expander("👤 Datos personales", expanded=True):
             col1, col2 = st.columns(2)
             with col1:
-                dni_class = "error-field" if not dni or not dni.isdigit() or not (7 <= len(dni) <= 8) else ""
+                dni_class = "error-field" if not validar_dni(dni) else ""
                 dni = st.text_input("🆔 DNI*", value=dni, disabled=bool(empleado), help="DNI del empleado (7 u 8 dígitos)", key=f"dni_{form_key}",
                                    label_visibility="visible")
                 st.markdown(f'<style>div[data-testid="stTextInput"][data-baseweb="input"] input#{f"dni_{form_key}"} {{border: 2px solid #e53935 !important;}}</style>' if dni_class else '', unsafe_allow_html=True)
-                if not dni or not dni.isdigit() or not (7 <= len(dni) <= 8):
+                if not validar_dni(dni):
                     errores['dni'] = "DNI inválido. Debe tener 7 u 8 dígitos numéricos."
                     st.markdown('<span style="color:red;font-size:12px;">' + errores['dni'] + '</span>', unsafe_allow_html=True)
                 nombre_class = "error-field" if not nombre.strip() else ""
@@ -115,17 +127,17 @@ def mostrar_formulario_empleado(empleado=None, form_key=None):
                 if not apellido.strip():
                     errores['apellido'] = "El apellido es obligatorio."
                     st.markdown('<span style="color:red;font-size:12px;">' + errores['apellido'] + '</span>', unsafe_allow_html=True)
-                email_class = "error-field" if email and '@' not in email else ""
+                email_class = "error-field" if not validar_email(email) else ""
                 email = st.text_input("✉️ Email", value=email, help="Correo electrónico del empleado", key=f"email_{form_key}")
                 st.markdown(f'<style>div[data-testid="stTextInput"][data-baseweb="input"] input#{f"email_{form_key}"} {{border: 2px solid #e53935 !important;}}</style>' if email_class else '', unsafe_allow_html=True)
-                if email and '@' not in email:
+                if not validar_email(email):
                     errores['email'] = "El email debe ser válido (contener @)."
                     st.markdown('<span style="color:red;font-size:12px;">' + errores['email'] + '</span>', unsafe_allow_html=True)
             with col2:
-                telefono_class = "error-field" if telefono and not telefono.replace('+', '').replace('-', '').replace(' ', '').isdigit() else ""
+                telefono_class = "error-field" if not validar_telefono(telefono) else ""
                 telefono = st.text_input("📞 Teléfono", value=telefono, help="Número de teléfono", key=f"telefono_{form_key}")
                 st.markdown(f'<style>div[data-testid="stTextInput"][data-baseweb="input"] input#{f"telefono_{form_key}"} {{border: 2px solid #e53935 !important;}}</style>' if telefono_class else '', unsafe_allow_html=True)
-                if telefono and not telefono.replace('+', '').replace('-', '').replace(' ', '').isdigit():
+                if not validar_telefono(telefono):
                     errores['telefono'] = "El teléfono debe contener solo números, +, - o espacios."
                     st.markdown('<span style="color:red;font-size:12px;">' + errores['telefono'] + '</span>', unsafe_allow_html=True)
                 direccion = st.text_input("🏠 Dirección", value=direccion, help="Dirección completa", key=f"direccion_{form_key}")
@@ -234,8 +246,13 @@ def mostrar_formulario_empleado(empleado=None, form_key=None):
             }
             try:
                 if empleado:
-                    actualizado = actualizar_empleado(dni, datos, st.session_state.user.id)
-                    if actualizado:
+                    actualizado = actualizar_empleado(
+                        dni, datos, st.session_state.user.id,
+                        version=st.session_state.get('edit_version')
+                    )
+                    if actualizado == "conflicto":
+                        st.error("⚠️ Otro usuario modificó este empleado mientras lo editabas. Cierra el formulario y vuelve a abrirlo para ver los datos actuales.")
+                    elif actualizado:
                         st.success("✅ Empleado actualizado correctamente")
                         return True
                     else:
@@ -258,8 +275,10 @@ def mostrar_formulario_empleado(empleado=None, form_key=None):
                     st.error(f"Error al guardar: {str(e)}")
         return False
 
+@st.fragment
 def mostrar_lista_empleados():
-    """Muestra la lista de empleados con filtros y acciones mejoradas"""
+    """Muestra la lista de empleados con filtros y acciones mejoradas.
+    Es un fragmento: filtrar, paginar o tocar una fila no vuelve a ejecutar el resto de la página."""
     st.subheader("Filtros")
     col1, col2 = st.columns(2)
     with col1:
@@ -268,6 +287,13 @@ def mostrar_lista_empleados():
     with col2:
         filtro_estado = st.selectbox("Filtrar por Estado", ['', 'activo', 'inactivo'])
         filtro_lider = st.selectbox("Filtrar por Líder", ['', 'Sí', 'No'])
+    col3, col4, col5 = st.columns(3)
+    with col3:
+        filtro_campo = st.text_input("Campo personalizado", help="Nombre exacto del campo personalizado")
+    with col4:
+        filtro_valor = st.text_input("Valor del campo", help="Vacío: empleados que tengan el campo cargado")
+    with col5:
+        ordenar_campo = st.checkbox("Ordenar por el campo", disabled=not filtro_campo)
     filtros = {}
     if filtro_dni:
         filtros['dni'] = filtro_dni
@@ -277,15 +303,29 @@ def mostrar_lista_empleados():
         filtros['estado'] = filtro_estado
     if filtro_lider:
         filtros['es_lider'] = filtro_lider == 'Sí'
-    empleados = listar_empleados(filtros)
-    if not empleados:
+    campos = {filtro_campo.strip(): filtro_valor.strip() or None} if filtro_campo.strip() else None
+    orden = f"campo:{filtro_campo.strip()}" if campos and ordenar_campo else None
+    # Solo las columnas del listado; el empleado completo se carga al editarlo
+    empleados = listar_empleados_df(
+        ['dni', 'nombre', 'apellido', 'fecha_ingreso', 'estado', 'skill', 'version'],
+        filtros, campos_personalizados=campos, ordenar_por=orden
+    )
+    if empleados.empty:
         st.info("No se encontraron empleados")
         return
+    # Solo se arman los widgets de la página visible
+    total = len(empleados)
+    paginas = -(-total // FILAS_POR_PAGINA)
+    pagina = st.number_input("Página", min_value=1, max_value=paginas, value=1) if paginas > 1 else 1
+    desde = (pagina - 1) * FILAS_POR_PAGINA
+    empleados = empleados.iloc[desde:desde + FILAS_POR_PAGINA]
+    empleados = empleados.astype(object).where(empleados.notna(), None)
     # Controlar edición con variable de sesión
     if 'edit_dni' not in st.session_state:
         st.session_state['edit_dni'] = None
     st.subheader("Empleados")
-    for e in empleados:
+    st.caption(f"Mostrando {desde + 1}–{desde + len(empleados)} de {total} empleados")
+    for e in empleados.itertuples(index=False):
         cols = st.columns([2, 2, 2, 2, 2, 2, 1, 1])
         cols[0].write(f"**DNI:** {e.dni}")
         cols[1].write(f"**Nombre:** {e.nombre}")
@@ -295,6 +335,8 @@ def mostrar_lista_empleados():
         cols[5].write(f"**Skill:** {e.skill}")
         if cols[6].button("✏️", key=f"edit_{e.dni}", help="Editar"):
             st.session_state['edit_dni'] = e.dni
+            # Versión al empezar a editar: si otro guarda antes, el guardado se rechaza como conflicto
+            st.session_state['edit_version'] = e.version
         if cols[7].button("🗑️", key=f"delete_{e.dni}", help="Eliminar"):
             if st.session_state.rol != 'admin':
                 st.error("Solo los administradores pueden eliminar empleados")
@@ -323,10 +365,63 @@ def mostrar_lista_empleados():
                     st.session_state['delete_dni'] = None
         # Mostrar formulario de edición solo para el empleado seleccionado
         if st.session_state['edit_dni'] == e.dni:
-            if mostrar_formulario_empleado(e, form_key=f"form_empleado_edit_{e.dni}_{st.session_state['form_key']}"):
+            if mostrar_formulario_empleado(obtener_empleado(e.dni), form_key=f"form_empleado_edit_{e.dni}_{st.session_state['form_key']}"):
                 st.session_state['edit_dni'] = None
                 st.rerun()
 
+def mostrar_duplicados():
+    """Muestra el reporte de posibles duplicados y permite fusionarlos"""
+    st.subheader("Posibles duplicados")
+    umbral = st.slider("Puntaje mínimo", 0.5, 1.0, 0.75, 0.05)
+    if st.button("🔎 Buscar duplicados"):
+        inicio = time.time()
+        st.session_state['reporte_duplicados'] = detectar_duplicados(umbral)
+        st.caption(f"Análisis completado en {time.time() - inicio:.2f} s")
+    reporte = st.session_state.get('reporte_duplicados')
+    if reporte is None:
+        return
+    if reporte.empty:
+        st.info("No se encontraron posibles duplicados")
+        return
+    st.dataframe(reporte, use_container_width=True)
+    if st.session_state.rol != 'admin':
+        return
+    st.markdown("**Fusionar par**")
+    opciones = [f"{r['DNI A']} ↔ {r['DNI B']}" for _, r in reporte.iterrows()]
+    seleccion = st.selectbox("Par a fusionar", range(len(opciones)), format_func=lambda i: opciones[i])
+    par = reporte.iloc[seleccion]
+    superviviente = st.radio("DNI que se conserva", [par['DNI A'], par['DNI B']], horizontal=True)
+    duplicado = par['DNI B'] if superviviente == par['DNI A'] else par['DNI A']
+    if st.button(f"🔗 Fusionar {duplicado} en {superviviente}"):
+        try:
+            if fusionar_empleados(superviviente, duplicado, st.session_state.user.id):
+                st.success("Empleados fusionados correctamente")
+                st.session_state['reporte_duplicados'] = reporte[
+                    ~reporte['DNI A'].isin([duplicado]) & ~reporte['DNI B'].isin([duplicado])
+                ].reset_index(drop=True)
+                st.rerun()
+            else:
+                st.error("No se pudo fusionar: alguno de los empleados ya no existe.")
+        except Exception as e:
+            st.error(f"Error al fusionar: {str(e)}")
+
+def mostrar_calidad_datos():
+    """Muestra el reporte de calidad de datos sobre todo el padrón"""
+    st.subheader("Calidad de datos")
+    if st.button("🧪 Revisar padrón"):
+        inicio = time.time()
+        st.session_state['reporte_calidad'] = escanear_calidad()
+        st.caption(f"Revisión completada en {time.time() - inicio:.2f} s")
+    reporte = st.session_state.get('reporte_calidad')
+    if reporte is None:
+        return
+    con_problemas = reporte[reporte['Cantidad'] > 0]
+    st.metric("Empleados revisados", reporte.attrs.get('revisados', 0))
+    if con_problemas.empty:
+        st.success("No se encontraron problemas de calidad")
+        return
+    st.dataframe(con_problemas, use_container_width=True)
+
 def mostrar_pagina_abm():
     """Muestra la página principal de ABM"""
     # Inicializar form_key si no existe
@@ -334,9 +429,13 @@ def mostrar_pagina_abm():
         st.session_state['form_key'] = random.randint(0, 1_000_000)
         
     st.title("Gestión de Empleados")
-    tab1, tab2 = st.tabs(["Lista de Empleados", "Nuevo Empleado"])
+    tab1, tab2, tab3, tab4 = st.tabs(["Lista de Empleados", "Nuevo Empleado", "Duplicados", "Calidad de datos"])
     with tab1:
         mostrar_lista_empleados()
     with tab2:
         if mostrar_formulario_empleado(form_key=f"form_empleado_nuevo_{st.session_state['form_key']}"):
-            st.rerun() 
\ No newline at end of file
+            st.rerun()
+    with tab3:
+        mostrar_duplicados()
+    with tab4:
+        mostrar_calidad_datos()
\ No newline at end of file
@@ -2,11 +2,291 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
+import numpy as np
+import os
+import hashlib
 from datetime import datetime
-from crud import listar_empleados, obtener_empleado
+from crud import listar_empleados_df, obtener_empleado, obtener_version_datos, promover_campo_personalizado
 from utils import formatear_fecha
 from sqlalchemy import text
-from db import get_engine
+from db import get_engine, metricas_pool, ejecutar_en_paralelo
+import analitica
+import resumen
+import evolucion
+from verificar_empleado import leer_dnis, verificar_dnis
+from cache_compartido import cacheado
+
+# Por encima de esta cantidad de empleados los gráficos por empleado se agregan en el servidor
+MAX_PUNTOS_GRAFICO = int(os.environ.get('DASHBOARD_MAX_PUNTOS', '5000'))
+BINS_ANTIGUEDAD = 40
+# Columnas que usa el dashboard (las demás no se consultan) y su nombre para mostrar
+COLUMNAS_DASHBOARD = {
+    'dni': 'DNI',
+    'nombre': 'Nombre',
+    'apellido': 'Apellido',
+    'fecha_ingreso': 'Fecha Ingreso',
+    'estado': 'Estado',
+    'skill': 'Skill',
+    'es_lider': 'Es Líder'
+}
+
+@cacheado()
+def _cargar_df_empleados(version):
+    """DataFrame base del dashboard. Se comparte entre procesos y se recalcula cuando cambia la versión de datos."""
+    df = listar_empleados_df(list(COLUMNAS_DASHBOARD)).rename(columns=COLUMNAS_DASHBOARD)
+    if df.empty:
+        return df
+    df['Mes Ingreso'] = pd.to_datetime(df['Fecha Ingreso']).dt.strftime('%Y-%m')
+    df['Antigüedad'] = (datetime.now() - pd.to_datetime(df['Fecha Ingreso'])).dt.days / 365
+    return df
+
+@cacheado()
+def _figuras_dashboard(version):
+    """Construye las figuras del dashboard como JSON. Se cachean por versión de datos en la caché
+    compartida, así que solo se regeneran cuando cambia el padrón."""
+    _df = _cargar_df_empleados(version)
+    figuras = {}
+    estado_counts = _df['Estado'].value_counts()
+    figuras['estado'] = px.pie(
+        values=estado_counts.values,
+        names=estado_counts.index,
+        title="Distribución por Estado"
+    )
+    ingresos_por_mes = _df['Mes Ingreso'].value_counts().sort_index()
+    figuras['ingresos'] = px.bar(
+        x=ingresos_por_mes.index,
+        y=ingresos_por_mes.values,
+        title="Ingresos por Mes",
+        labels={'x': 'Mes', 'y': 'Cantidad'}
+    )
+    top_skills = _df['Skill'].value_counts().head(10)
+    figuras['skills'] = px.bar(
+        x=top_skills.index,
+        y=top_skills.values,
+        title="Top 10 Skills",
+        labels={'x': 'Skill', 'y': 'Cantidad'}
+    )
+    if len(_df) <= MAX_PUNTOS_GRAFICO:
+        figuras['antiguedad'] = px.scatter(
+            _df,
+            x='Antigüedad',
+            y='Es Líder',
+            title="Antigüedad vs Líderes",
+            labels={'x': 'Años', 'y': 'Es Líder'},
+            render_mode='webgl'
+        )
+    else:
+        # Histograma calculado acá: al navegador solo viajan BINS_ANTIGUEDAD barras por serie
+        antiguedad = _df['Antigüedad'].dropna()
+        bordes = np.histogram_bin_edges(antiguedad, bins=BINS_ANTIGUEDAD)
+        centros = (bordes[:-1] + bordes[1:]) / 2
+        filas = []
+        for es_lider, grupo in _df.dropna(subset=['Antigüedad']).groupby('Es Líder'):
+            cantidades, _ = np.histogram(grupo['Antigüedad'], bins=bordes)
+            filas.append(pd.DataFrame({'Años': centros, 'Cantidad': cantidades, 'Es Líder': str(es_lider)}))
+        figuras['antiguedad'] = px.bar(
+            pd.concat(filas, ignore_index=True),
+            x='Años',
+            y='Cantidad',
+            color='Es Líder',
+            barmode='overlay',
+            title=f"Antigüedad vs Líderes (agregado, {len(_df):,} empleados)"
+        )
+    return {nombre: figura.to_json() for nombre, figura in figuras.items()}
+
+@cacheado()
+def _figuras_evolucion(version, frecuencia):
+    """Figuras de dotación en el tiempo, altas vs bajas y antigüedad, cacheadas por versión y frecuencia"""
+    eventos = evolucion.cargar_eventos(version)
+    serie = evolucion.plantilla_por_periodo(eventos, frecuencia)
+    periodo = evolucion.FRECUENCIAS[frecuencia]
+    plantilla = go.Figure()
+    plantilla.add_bar(x=serie['Periodo'], y=serie['Altas'], name='Altas')
+    plantilla.add_bar(x=serie['Periodo'], y=-serie['Bajas'], name='Bajas')
+    plantilla.add_scatter(x=serie['Periodo'], y=serie['Dotación'], name='Dotación', yaxis='y2', mode='lines')
+    plantilla.update_layout(
+        title=f"Dotación y Altas vs Bajas por {periodo}",
+        barmode='relative',
+        yaxis={'title': 'Altas / Bajas'},
+        yaxis2={'title': 'Dotación', 'overlaying': 'y', 'side': 'right'}
+    )
+    rangos = evolucion.distribucion_antiguedad(eventos)
+    antiguedad = px.bar(
+        rangos.melt(id_vars='Antigüedad', var_name='Grupo', value_name='Cantidad'),
+        x='Antigüedad',
+        y='Cantidad',
+        color='Grupo',
+        barmode='group',
+        title="Distribución de Antigüedad (activos y antigüedad al egreso)"
+    )
+    return {'plantilla': plantilla.to_json(), 'antiguedad_rangos': antiguedad.to_json()}
+
+def _cargar_metricas():
+    """Métricas principales: contadores incrementales y, si no están, motor analítico. None si ninguno responde."""
+    try:
+        return resumen.obtener_metricas()
+    except Exception as e:
+        print(f"Contadores de resumen no disponibles: {e}")
+    if analitica.disponible():
+        try:
+            return analitica.metricas_empleados()
+        except Exception as e:
+            print(f"Motor analítico no disponible, se usa pandas: {e}")
+    return None
+
+def _precargar_eventos(version):
+    """Calienta la caché de eventos de la evolución; si falla, la sección muestra el error al recalcular"""
+    try:
+        evolucion.cargar_eventos(version)
+    except Exception as e:
+        print(f"No se pudieron precargar los eventos de la plantilla: {e}")
+
+def _mostrar_figura(figuras, nombre):
+    st.plotly_chart(pio.from_json(figuras[nombre]), use_container_width=True)
+
+@st.fragment
+def _seccion_verificacion():
+    """Verificación de un DNI; al escribir solo se vuelve a ejecutar esta sección"""
+    st.subheader("🔍 Verificación de Empleados")
+    dni_verificar = st.text_input("Ingrese el DNI a verificar", key='dashboard_dni_verificar')
+    if dni_verificar:
+        empleado = obtener_empleado(dni_verificar)
+        if empleado:
+            st.success("✅ Empleado encontrado")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write("**Datos del empleado:**")
+                st.write(f"- DNI: {empleado.dni}")
+                st.write(f"- Nombre: {empleado.nombre}")
+                st.write(f"- Apellido: {empleado.apellido}")
+                st.write(f"- Estado: {empleado.estado}")
+                st.write(f"- Skill: {empleado.skill}")
+                st.write(f"- Es Líder: {'Sí' if empleado.es_lider else 'No'}")
+                st.write(f"- Fecha de ingreso: {formatear_fecha(empleado.fecha_ingreso)}")
+        else:
+            st.error("❌ No se encontró ningún empleado con ese DNI")
+            st.info("Sugerencias:")
+            st.write("1. Verifique que el DNI esté correctamente escrito")
+            st.write("2. Intente importar el empleado nuevamente")
+            st.write("3. Verifique que el archivo de importación tenga el formato correcto")
+
+@st.fragment
+def _seccion_verificacion_masiva(version):
+    """Verificación masiva desde archivo; el reporte se guarda por huella del archivo y versión de datos"""
+    with st.expander("📋 Verificación masiva desde archivo"):
+        archivo_dnis = st.file_uploader(
+            "Archivo TXT (un DNI por línea), CSV o Excel con columna 'dni'",
+            type=['txt', 'csv', 'xlsx'],
+            key='dashboard_archivo_dnis'
+        )
+        if archivo_dnis:
+            try:
+                clave = (hashlib.sha256(archivo_dnis.getvalue()).hexdigest(), version)
+                if st.session_state.get('dashboard_verificacion_clave') != clave:
+                    st.session_state.dashboard_verificacion_reporte = verificar_dnis(leer_dnis(archivo_dnis))
+                    st.session_state.dashboard_verificacion_clave = clave
+                reporte = st.session_state.dashboard_verificacion_reporte
+                conteo = reporte['Resultado'].value_counts()
+                cols = st.columns(4)
+                for col, resultado in zip(cols, ['encontrado', 'inactivo', 'no encontrado', 'invalido']):
+                    col.metric(resultado.capitalize(), int(conteo.get(resultado, 0)))
+                st.dataframe(reporte, use_container_width=True)
+                st.download_button(
+                    "Descargar reporte CSV",
+                    reporte.to_csv(index=False).encode('utf-8-sig'),
+                    file_name=f"verificacion_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                    mime="text/csv"
+                )
+            except Exception as e:
+                st.error(f"Error al verificar el archivo: {str(e)}")
+
+@st.fragment
+def _seccion_evolucion(version):
+    """Evolución de la plantilla; cambiar la agrupación solo vuelve a ejecutar esta sección"""
+    st.subheader("Evolución de la Plantilla")
+    periodo = st.radio(
+        "Agrupar por",
+        options=list(evolucion.FRECUENCIAS.values()),
+        horizontal=True,
+        key='dashboard_frecuencia_evolucion'
+    )
+    frecuencia = next(f for f, nombre in evolucion.FRECUENCIAS.items() if nombre == periodo)
+    try:
+        figuras_evolucion = _figuras_evolucion(version, frecuencia)
+        col1, col2 = st.columns(2)
+        with col1:
+            _mostrar_figura(figuras_evolucion, 'plantilla')
+        with col2:
+            _mostrar_figura(figuras_evolucion, 'antiguedad_rangos')
+        descartados = evolucion.cargar_eventos(version).attrs
+        if descartados.get('sin_ingreso') or descartados.get('sin_baja'):
+            st.caption(
+                f"No incluidos: {descartados.get('sin_ingreso', 0)} empleados sin fecha de ingreso y "
+                f"{descartados.get('sin_baja', 0)} inactivos sin fecha de baja"
+            )
+    except Exception as e:
+        st.error(f"Error al calcular la evolución de la plantilla: {str(e)}")
+
+@st.fragment
+def _seccion_filtros(df):
+    """Filtros personalizados sobre el DataFrame ya cargado, con exportación a Excel"""
+    st.subheader("Filtros Personalizados")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        skill_filtro = st.multiselect(
+            "Filtrar por Skills",
+            options=sorted(df['Skill'].unique())
+        )
+        
+        estado_filtro = st.multiselect(
+            "Filtrar por Estado",
+            options=sorted(df['Estado'].unique())
+        )
+    
+    with col2:
+        fecha_desde = st.date_input(
+            "Fecha de ingreso desde",
+            value=df['Fecha Ingreso'].min()
+        )
+        
+        fecha_hasta = st.date_input(
+            "Fecha de ingreso hasta",
+            value=df['Fecha Ingreso'].max()
+        )
+    
+    # Aplicar filtros
+    df_filtrado = df.copy()
+    
+    if skill_filtro:
+        df_filtrado = df_filtrado[df_filtrado['Skill'].isin(skill_filtro)]
+    
+    if estado_filtro:
+        df_filtrado = df_filtrado[df_filtrado['Estado'].isin(estado_filtro)]
+    
+    df_filtrado = df_filtrado[
+        (df_filtrado['Fecha Ingreso'] >= pd.to_datetime(fecha_desde)) &
+        (df_filtrado['Fecha Ingreso'] <= pd.to_datetime(fecha_hasta))
+    ]
+    
+    # Mostrar datos filtrados
+    st.subheader("Datos Filtrados")
+    st.dataframe(df_filtrado, use_container_width=True)
+    
+    # Exportar a Excel
+    if st.button("Exportar a Excel"):
+        nombre_archivo = f"dashboard_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        df_filtrado.to_excel(nombre_archivo, index=False)
+        
+        with open(nombre_archivo, 'rb') as f:
+            st.download_button(
+                "Descargar Excel",
+                f,
+                file_name=nombre_archivo,
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
 
 def mostrar_pagina_dashboard():
     """Muestra la página del dashboard"""
@@ -29,7 +309,15 @@ def mostrar_pagina_dashboard():
                 ("usuario_hada", "ALTER TABLE empleados ADD COLUMN IF NOT EXISTS usuario_hada VARCHAR;"),
                 ("usuario_remedy", "ALTER TABLE empleados ADD COLUMN IF NOT EXISTS usuario_remedy VARCHAR;"),
                 ("usuario_t3", "ALTER TABLE empleados ADD COLUMN IF NOT EXISTS usuario_t3 VARCHAR;"),
-                ("campos_personalizados", "ALTER TABLE empleados ADD COLUMN IF NOT EXISTS campos_personalizados JSONB;")
+                ("campos_personalizados", "ALTER TABLE empleados ADD COLUMN IF NOT EXISTS campos_personalizados JSONB;"),
+                ("campos_personalizados (jsonb)", "ALTER TABLE empleados ALTER COLUMN campos_personalizados TYPE JSONB USING campos_personalizados::jsonb;"),
+                ("version", "ALTER TABLE empleados ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;"),
+                ("ix_empleados_campos_personalizados", "CREATE INDEX IF NOT EXISTS ix_empleados_campos_personalizados ON empleados USING GIN (campos_personalizados jsonb_path_ops);"),
+                ("trabajos_importacion.resumen", "ALTER TABLE trabajos_importacion ADD COLUMN IF NOT EXISTS resumen JSON;"),
+                ("hash_importacion", "ALTER TABLE empleados ADD COLUMN IF NOT EXISTS hash_importacion VARCHAR;"),
+                ("trabajos_importacion.hash_archivo", "ALTER TABLE trabajos_importacion ADD COLUMN IF NOT EXISTS hash_archivo VARCHAR;"),
+                ("ix_trabajos_importacion_hash_archivo", "CREATE INDEX IF NOT EXISTS ix_trabajos_importacion_hash_archivo ON trabajos_importacion (hash_archivo);"),
+                ("trabajos_importacion.latido", "ALTER TABLE trabajos_importacion ADD COLUMN IF NOT EXISTS latido TIMESTAMP;")
             ]
             try:
                 engine = get_engine()
@@ -49,12 +337,40 @@ def mostrar_pagina_dashboard():
                     for colname, stmt in alter_statements:
                         try:
                             conn.execute(text(stmt))
+                            conn.commit()
                             st.success(f"Columna '{colname}' agregada o ya existente.")
                         except Exception as e:
+                            conn.rollback()
                             st.error(f"Error al agregar columna '{colname}': {str(e)}")
                 st.info("Migración finalizada. Verifica la tabla con el botón de inspección.")
             except Exception as e:
                 st.error(f"Error al ejecutar la migración: {str(e)}")
+        col_campo, col_promover = st.columns([3, 1])
+        with col_campo:
+            campo_promover = st.text_input("Campo personalizado a indexar", help="Crea una columna generada con índice para filtrar y ordenar rápido por este campo")
+        with col_promover:
+            if st.button("Indexar campo 🗂️") and campo_promover.strip():
+                try:
+                    columna = promover_campo_personalizado(campo_promover.strip())
+                    st.success(f"Campo '{campo_promover.strip()}' indexado en la columna '{columna}'.")
+                except Exception as e:
+                    st.error(f"Error al indexar el campo: {str(e)}")
+        if st.button("Reconciliar contadores del dashboard 🔁"):
+            try:
+                drift = resumen.reconstruir()
+                if drift.empty:
+                    st.success("Los contadores coinciden con la tabla de empleados.")
+                else:
+                    st.warning(f"Se corrigieron {len(drift)} contadores con diferencias.")
+                    st.dataframe(drift, use_container_width=True)
+            except Exception as e:
+                st.error(f"Error al reconciliar contadores: {str(e)}")
+        with st.expander("🔌 Conexiones a la base de datos"):
+            try:
+                st.dataframe(pd.DataFrame(metricas_pool()), use_container_width=True)
+                st.caption("Valores de este proceso. Conexiones totales hacia el pooler ≈ (tamaño + overflow) × procesos de la app.")
+            except Exception as e:
+                st.error(f"Error al leer métricas del pool: {str(e)}")
         # Botón para inspeccionar columnas actuales
         if st.button("Mostrar columnas actuales de empleados"):
             try:
@@ -72,42 +388,45 @@ def mostrar_pagina_dashboard():
             except Exception as e:
                 st.error(f"Error al consultar columnas: {str(e)}")
     
-    # Obtener datos
-    empleados = listar_empleados()
-    if not empleados:
+    # Obtener datos: el DataFrame y las figuras se cachean por versión de datos.
+    # Las cargas independientes van en paralelo, cada una con su conexión; las figuras salen del
+    # DataFrame ya cacheado y los eventos quedan listos para la sección de evolución.
+    version = obtener_version_datos()
+    cargas = ejecutar_en_paralelo({
+        'df': lambda: _cargar_df_empleados(version),
+        'metricas': _cargar_metricas,
+        'eventos': lambda: _precargar_eventos(version),
+    })
+    df = cargas['df']
+    if df.empty:
         st.info("No hay datos para mostrar")
         return
+    figuras = _figuras_dashboard(version)
     
-    # Convertir a DataFrame
-    df = pd.DataFrame([{
-        'DNI': e.dni,
-        'Nombre': e.nombre,
-        'Apellido': e.apellido,
-        'Fecha Ingreso': e.fecha_ingreso,
-        'Estado': e.estado,
-        'Skill': e.skill,
-        'Es Líder': e.es_lider
-    } for e in empleados])
-    
-    # Métricas principales
+    # Métricas principales: contadores incrementales, luego motor analítico, luego pandas
+    metricas = cargas['metricas']
+    if metricas is None:
+        metricas = {
+            'total': len(df),
+            'activos': len(df[df['Estado'] == 'activo']),
+            'lideres': len(df[df['Es Líder'] == True]),
+            'skills_unicos': df['Skill'].nunique()
+        }
+
     st.subheader("Métricas Principales")
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        total_empleados = len(df)
-        st.metric("Total Empleados", total_empleados)
+        st.metric("Total Empleados", int(metricas['total']))
     
     with col2:
-        empleados_activos = len(df[df['Estado'] == 'activo'])
-        st.metric("Empleados Activos", empleados_activos)
+        st.metric("Empleados Activos", int(metricas['activos']))
     
     with col3:
-        total_lideres = len(df[df['Es Líder'] == True])
-        st.metric("Total Líderes", total_lideres)
+        st.metric("Total Líderes", int(metricas['lideres']))
     
     with col4:
-        skills_unicos = df['Skill'].nunique()
-        st.metric("Skills Únicos", skills_unicos)
+        st.metric("Skills Únicos", int(metricas['skills_unicos']))
     
     # Gráficos
     st.subheader("Visualizaciones")
@@ -116,139 +435,35 @@ def mostrar_pagina_dashboard():
     col1, col2 = st.columns(2)
     
     with col1:
-        estado_counts = df['Estado'].value_counts()
-        fig_estado = px.pie(
-            values=estado_counts.values,
-            names=estado_counts.index,
-            title="Distribución por Estado"
-        )
-        st.plotly_chart(fig_estado, use_container_width=True)
+        _mostrar_figura(figuras, 'estado')
     
-    # Sección de verificación
-    st.subheader("🔍 Verificación de Empleados")
-    dni_verificar = st.text_input("Ingrese el DNI a verificar")
-    if dni_verificar:
-        empleado = obtener_empleado(dni_verificar)
-        if empleado:
-            st.success("✅ Empleado encontrado")
-            col1, col2 = st.columns(2)
-            with col1:
-                st.write("**Datos del empleado:**")
-                st.write(f"- DNI: {empleado.dni}")
-                st.write(f"- Nombre: {empleado.nombre}")
-                st.write(f"- Apellido: {empleado.apellido}")
-                st.write(f"- Estado: {empleado.estado}")
-                st.write(f"- Skill: {empleado.skill}")
-                st.write(f"- Es Líder: {'Sí' if empleado.es_lider else 'No'}")
-                st.write(f"- Fecha de ingreso: {formatear_fecha(empleado.fecha_ingreso)}")
-        else:
-            st.error("❌ No se encontró ningún empleado con ese DNI")
-            st.info("Sugerencias:")
-            st.write("1. Verifique que el DNI esté correctamente escrito")
-            st.write("2. Intente importar el empleado nuevamente")
-            st.write("3. Verifique que el archivo de importación tenga el formato correcto")
+    # Sección de verificación (fragmentos: escribir un DNI no vuelve a armar la página)
+    _seccion_verificacion()
+    _seccion_verificacion_masiva(version)
     
     # Gráfico de barras - Ingresos por mes
     with col2:
-        df['Mes Ingreso'] = pd.to_datetime(df['Fecha Ingreso']).dt.strftime('%Y-%m')
-        ingresos_por_mes = df['Mes Ingreso'].value_counts().sort_index()
-        
-        fig_ingresos = px.bar(
-            x=ingresos_por_mes.index,
-            y=ingresos_por_mes.values,
-            title="Ingresos por Mes",
-            labels={'x': 'Mes', 'y': 'Cantidad'}
-        )
-        st.plotly_chart(fig_ingresos, use_container_width=True)
+        _mostrar_figura(figuras, 'ingresos')
     
     # Gráfico de barras - Top Skills
     col1, col2 = st.columns(2)
     
     with col1:
-        top_skills = df['Skill'].value_counts().head(10)
-        fig_skills = px.bar(
-            x=top_skills.index,
-            y=top_skills.values,
-            title="Top 10 Skills",
-            labels={'x': 'Skill', 'y': 'Cantidad'}
-        )
-        st.plotly_chart(fig_skills, use_container_width=True)
+        _mostrar_figura(figuras, 'skills')
     
     # Gráfico de dispersión - Antigüedad vs Líderes
     with col2:
-        df['Antigüedad'] = (datetime.now() - pd.to_datetime(df['Fecha Ingreso'])).dt.days / 365
-        fig_antiguedad = px.scatter(
-            df,
-            x='Antigüedad',
-            y='Es Líder',
-            title="Antigüedad vs Líderes",
-            labels={'x': 'Años', 'y': 'Es Líder'}
-        )
-        st.plotly_chart(fig_antiguedad, use_container_width=True)
-    
-    # Filtros personalizados
-    st.subheader("Filtros Personalizados")
+        _mostrar_figura(figuras, 'antiguedad')
     
-    col1, col2 = st.columns(2)
+    # Evolución de la plantilla
+    _seccion_evolucion(version)
     
-    with col1:
-        skill_filtro = st.multiselect(
-            "Filtrar por Skills",
-            options=sorted(df['Skill'].unique())
-        )
-        
-        estado_filtro = st.multiselect(
-            "Filtrar por Estado",
-            options=sorted(df['Estado'].unique())
-        )
-    
-    with col2:
-        fecha_desde = st.date_input(
-            "Fecha de ingreso desde",
-            value=df['Fecha Ingreso'].min()
-        )
-        
-        fecha_hasta = st.date_input(
-            "Fecha de ingreso hasta",
-            value=df['Fecha Ingreso'].max()
-        )
-    
-    # Aplicar filtros
-    df_filtrado = df.copy()
-    
-    if skill_filtro:
-        df_filtrado = df_filtrado[df_filtrado['Skill'].isin(skill_filtro)]
-    
-    if estado_filtro:
-        df_filtrado = df_filtrado[df_filtrado['Estado'].isin(estado_filtro)]
-    
-    df_filtrado = df_filtrado[
-        (df_filtrado['Fecha Ingreso'] >= pd.to_datetime(fecha_desde)) &
-        (df_filtrado['Fecha Ingreso'] <= pd.to_datetime(fecha_hasta))
-    ]
-    
-    # Mostrar datos filtrados
-    st.subheader("Datos Filtrados")
-    st.dataframe(df_filtrado, use_container_width=True)
-    
-    # Exportar a Excel
-    if st.button("Exportar a Excel"):
-        nombre_archivo = f"dashboard_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        df_filtrado.to_excel(nombre_archivo, index=False)
-        
-        with open(nombre_archivo, 'rb') as f:
-            st.download_button(
-                "Descargar Excel",
-                f,
-                file_name=nombre_archivo,
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
+    # Filtros personalizados
+    _seccion_filtros(df)
 
     # --- Sección de depuración: Listar todos los DNIs y nombres ---
     st.subheader("🛠️ Depuración: Lista completa de DNIs y nombres")
-    empleados_todos = listar_empleados()
-    if empleados_todos:
-        data = [{'DNI': e.dni, 'Nombre': e.nombre, 'Apellido': e.apellido} for e in empleados_todos]
-        st.dataframe(pd.DataFrame(data), use_container_width=True)
+    if not df.empty:
+        st.dataframe(df[['DNI', 'Nombre', 'Apellido']], use_container_width=True)
     else:
         st.info("No hay empleados en la base de datos.") 
\ No newline at end of file
@@ -1,8 +1,16 @@
 import streamlit as st
 import pandas as pd
-from crud import importar_empleados, listar_empleados
+import numpy as np
+from crud import listar_empleados_df, listar_cuarentena, dnis_existentes
 from utils import validar_archivo_importacion, generar_nombre_archivo
-import time
+from lectores import leer_archivo
+import indice_dni
+from trabajos import (
+    enviar_importacion, cancelar_trabajo, puede_cancelar, listar_trabajos, marcar_trabajos_vencidos,
+    hash_archivo, buscar_importacion_previa,
+    ESTADOS_FINALES, MAX_WORKERS, MODOS_IMPORTACION
+)
+from datetime import datetime
 import re
 
 CAMPOS_BD = [
@@ -19,6 +27,81 @@ CAMPOS_BD_LABELS = {
     'es_lider': 'Es Líder'
 }
 
+def mostrar_cuarentena(trabajo_id):
+    """Filas que no se pudieron importar, con el motivo, listas para corregir y volver a importar"""
+    filas = listar_cuarentena(trabajo_id)
+    motivos = pd.DataFrame([{'DNI': f.dni, 'Motivo': f.motivo} for f in filas])
+    st.dataframe(motivos, use_container_width=True)
+    originales = pd.DataFrame([f.fila for f in filas])
+    st.download_button(
+        "Descargar filas (CSV)",
+        originales.to_csv(index=False).encode('utf-8'),
+        file_name=generar_nombre_archivo(f'cuarentena_{trabajo_id}', 'csv'),
+        mime="text/csv",
+        key=f"descargar_cuarentena_{trabajo_id}"
+    )
+
+# Segundos entre actualizaciones automáticas de la tabla de trabajos
+INTERVALO_TRABAJOS = 2
+
+def _cancelar(trabajo_id, usuario_id, es_admin):
+    try:
+        cancelar_trabajo(trabajo_id, usuario_id, es_admin)
+    except PermissionError as e:
+        st.session_state['error_cancelar_trabajo'] = str(e)
+
+def _tabla_trabajos():
+    """Avance de cada trabajo. Se ejecuta como fragmento: actualizarla no vuelve a leer el archivo subido."""
+    if 'error_cancelar_trabajo' in st.session_state:
+        st.error(st.session_state.pop('error_cancelar_trabajo'))
+    # Trabajos de un proceso que ya no existe quedarían "en curso" para siempre
+    marcar_trabajos_vencidos()
+    trabajos = listar_trabajos()
+    usuario_id = st.session_state.user.id
+    es_admin = st.session_state.get('rol') == 'admin'
+    if not trabajos:
+        st.info("No hay importaciones registradas")
+        return
+    for t in trabajos:
+        cols = st.columns([3, 4, 2, 1])
+        cols[0].write(f"**#{t.id}** {t.archivo or ''} — {t.estado}")
+        avance = (t.procesados + t.fallidos) / t.total if t.total else 1.0
+        cols[1].progress(min(avance, 1.0), text=f"{t.procesados + t.fallidos}/{t.total} filas ({t.fallidos} con error)")
+        if t.fecha_inicio:
+            fin = t.fecha_fin or datetime.now()
+            cols[2].write(f"{(fin - t.fecha_inicio).total_seconds():.1f} s")
+        if t.estado not in ESTADOS_FINALES and not t.cancelar and puede_cancelar(t, usuario_id, es_admin):
+            # El callback cancela antes de que el fragmento se vuelva a ejecutar, así la tabla ya lo refleja
+            cols[3].button(
+                "⏹️", key=f"cancelar_trabajo_{t.id}", help="Cancelar (se detiene al terminar el lote en curso)",
+                on_click=_cancelar, args=(t.id, usuario_id, es_admin)
+            )
+        if t.resumen:
+            cols[0].caption(
+                f"{t.resumen['nuevos']} nuevos, {t.resumen['actualizados']} actualizados, "
+                f"{t.resumen['sin_cambios']} sin cambios"
+                + (f", {t.resumen['inactivados']} inactivados" if 'inactivados' in t.resumen else "")
+                + (f", {t.resumen['reactivados']} reactivados" if t.resumen.get('reactivados') else "")
+                + (f", {t.resumen['cuarentena']} en cuarentena" if t.resumen.get('cuarentena') else "")
+            )
+            if len(t.resumen.get('workers', [])) > 1:
+                with st.expander(f"Detalle por worker del trabajo #{t.id}"):
+                    st.dataframe(pd.DataFrame(t.resumen['workers']), use_container_width=True)
+            if t.resumen.get('cuarentena'):
+                with st.expander(f"Filas en cuarentena del trabajo #{t.id}"):
+                    mostrar_cuarentena(t.id)
+        if t.error:
+            with st.expander(f"Errores del trabajo #{t.id}"):
+                st.text(t.error)
+    # Un clic dentro del fragmento ya lo vuelve a ejecutar
+    st.button("🔄 Actualizar", key='actualizar_trabajos')
+
+def mostrar_trabajos_importacion():
+    """Muestra el avance de los trabajos de importación en segundo plano"""
+    st.subheader("Trabajos de importación")
+    auto = st.checkbox("Actualizar automáticamente", value=True, key='actualizar_trabajos_auto')
+    st.fragment(_tabla_trabajos, run_every=INTERVALO_TRABAJOS if auto else None)()
+
 def mostrar_pagina_importacion():
     """Muestra la página de importación de datos"""
     st.title("Importación de Empleados (Asistida)")
@@ -36,16 +119,40 @@ def mostrar_pagina_importacion():
     
     archivo = st.file_uploader(
         "Seleccione un archivo Excel o CSV",
-        type=['xlsx', 'csv']
+        type=['xlsx', 'csv', 'txt']
     )
     
     if archivo:
         try:
-            # Leer archivo según extensión
-            if archivo.name.endswith('.csv'):
-                df = pd.read_csv(archivo)
+            # Leer archivo con el motor más rápido disponible (DNI siempre como texto)
+            lectura = leer_archivo(archivo)
+            hojas = lectura['hojas']
+            if not hojas:
+                st.error("El archivo no contiene datos")
+                return
+            st.caption(
+                f"{lectura['filas']:,} filas leídas en {lectura['segundos']:.2f} s "
+                f"({lectura['filas_por_segundo']:,.0f} filas/s, motor: {lectura['motor']})"
+            )
+            # El mismo archivo ya importado no necesita procesarse de nuevo
+            huella = hash_archivo(archivo.getvalue())
+            previa = buscar_importacion_previa(huella)
+            reimportar = True
+            if previa:
+                st.warning(
+                    f"Este archivo ya se importó en el trabajo #{previa.id} "
+                    f"({previa.fecha_creacion.strftime('%d/%m/%Y %H:%M')})."
+                )
+                reimportar = st.checkbox("Importar igualmente (solo se procesan las filas que cambiaron desde entonces)")
+            if len(hojas) > 1:
+                opciones_hoja = ["Todas (concatenar)"] + list(hojas.keys())
+                hoja = st.selectbox("Hoja a importar", opciones_hoja)
+                if hoja == opciones_hoja[0]:
+                    df = pd.concat(hojas.values(), ignore_index=True)
+                else:
+                    df = hojas[hoja]
             else:
-                df = pd.read_excel(archivo)
+                df = next(iter(hojas.values()))
             
             # Mostrar vista previa
             st.subheader("Vista previa de datos")
@@ -69,18 +176,40 @@ def mostrar_pagina_importacion():
 
             # --- DEBUG VISUAL: Mostrar DNIs y existencia ---
             st.subheader("Debug: Estado de los DNIs a importar")
-            empleados_existentes = {e.dni for e in listar_empleados()}
-            resumen = []
-            for _, row in df.iterrows():
-                dni = str(row['dni']).strip() if 'dni' in row and pd.notna(row['dni']) else None
-                if not dni:
-                    continue
-                existe = dni in empleados_existentes
-                resumen.append({'DNI': dni, 'Ya existe': 'Sí' if existe else 'No'})
-            st.dataframe(pd.DataFrame(resumen), use_container_width=True)
+            if 'dni' in df.columns:
+                dnis = df['dni'].dropna().astype(str).str.strip()
+                dnis = dnis[dnis != '']
+                try:
+                    existe = indice_dni.contiene_varios(dnis)
+                    # El índice solo confirma existentes: el resto se verifica en una sola consulta a la base
+                    fuera = existe.isna()
+                    if fuera.any():
+                        existe[fuera] = dnis[fuera].isin(dnis_existentes(dnis[fuera])).to_numpy()
+                    existe = existe.to_numpy(dtype=bool)
+                except Exception:
+                    # Sin índice disponible: comparar contra el padrón completo
+                    empleados_existentes = set(listar_empleados_df(['dni'])['dni'])
+                    existe = dnis.isin(empleados_existentes).to_numpy()
+                resumen = pd.DataFrame({'DNI': dnis.to_numpy(), 'Ya existe': np.where(existe, 'Sí', 'No')})
+                st.dataframe(resumen, use_container_width=True)
+
+            modo = st.radio(
+                "Modo de importación",
+                options=list(MODOS_IMPORTACION),
+                format_func={'incremental': "Incremental (altas y cambios)",
+                             'completo': "Sincronización completa (inactiva a quienes no figuran)"}.get,
+                horizontal=True,
+                help="La sincronización completa toma el archivo como el padrón entero: los empleados activos que no aparecen quedan inactivos"
+            )
+            workers = st.number_input(
+                "Procesos en paralelo",
+                min_value=1, max_value=MAX_WORKERS, value=1,
+                disabled=modo == 'completo',
+                help="Reparte las filas por DNI entre varios procesos, cada uno con su propia conexión"
+            )
 
             # Botón de importación
-            if st.button("Importar Datos"):
+            if st.button("Importar Datos", disabled=not reimportar):
                 # Construir nuevo DataFrame normalizado
                 data = {c: [None]*len(df) for c in CAMPOS_BD}
                 for col, destino in mapeo.items():
@@ -104,9 +233,8 @@ def mostrar_pagina_importacion():
                 st.subheader("Datos normalizados a importar")
                 st.dataframe(df_normalizado, use_container_width=True)
                 try:
-                    importar_empleados(df_normalizado, st.session_state.user.id)
-                    st.success("Datos importados correctamente")
-                    st.rerun()
+                    trabajo_id = enviar_importacion(df_normalizado, st.session_state.user.id, archivo.name, workers, modo, huella)
+                    st.success(f"Importación enviada en segundo plano (trabajo #{trabajo_id}). Puede seguir su avance abajo.")
                 except Exception as e:
                     st.error(f"Error al importar: {str(e)}")
         
@@ -156,4 +284,6 @@ def mostrar_pagina_importacion():
                     f,
                     file_name=nombre_archivo,
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                ) 
\ No newline at end of file
+                )
+
+    mostrar_trabajos_importacion()
\ No newline at end of file
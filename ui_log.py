@@ -1,8 +1,30 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
-from crud import obtener_log_cambios
+from crud import obtener_log_cambios, estadisticas_log_cambios
 from utils import formatear_fecha, formatear_detalle_cambio
+import analitica
+
+# Filas del historial por página (paginación por id, sin traer el período completo)
+FILAS_POR_PAGINA = 500
+
+def _df_cambios(cambios):
+    return pd.DataFrame([{
+        'Fecha': formatear_fecha(c.timestamp),
+        'Usuario': c.usuario.usuario,
+        'DNI': c.empleado_dni,
+        'Acción': c.accion,
+        'Detalle': c.detalle
+    } for c in cambios])
+
+def _estadisticas(filtros):
+    """Estadísticas de una sola fuente: la copia analítica si está al día, si no GROUP BY en la base"""
+    if analitica.disponible():
+        try:
+            return analitica.estadisticas_log(filtros)
+        except Exception as e:
+            print(f"Motor analítico no disponible, se consulta la base: {e}")
+    return estadisticas_log_cambios(filtros)
 
 def mostrar_pagina_log():
     """Muestra la página de historial de cambios"""
@@ -40,47 +62,56 @@ def mostrar_pagina_log():
     if fecha_hasta:
         filtros['fecha_hasta'] = datetime.combine(fecha_hasta, datetime.max.time())
     
-    # Obtener y mostrar cambios
-    cambios = obtener_log_cambios(filtros)
+    # Total y agrupaciones salen de la misma fuente, así siempre coinciden
+    estadisticas = _estadisticas(filtros)
+    total_cambios = int(estadisticas['por_accion'].sum())
     
-    if not cambios:
+    if not total_cambios:
         st.info("No se encontraron cambios en el período seleccionado")
         return
     
-    # Convertir a DataFrame para mostrar
-    df = pd.DataFrame([{
-        'Fecha': formatear_fecha(c.timestamp),
-        'Usuario': c.usuario.usuario,
-        'DNI': c.empleado_dni,
-        'Acción': c.accion,
-        'Detalle': c.detalle
-    } for c in cambios])
+    # Una página por vez, del más reciente al más antiguo; los cursores se reinician al cambiar los filtros
+    clave_filtros = repr(sorted(filtros.items()))
+    if st.session_state.get('log_filtros') != clave_filtros:
+        st.session_state.log_filtros = clave_filtros
+        st.session_state.log_cursores = [None]
+    cursores = st.session_state.log_cursores
+    cambios = obtener_log_cambios(filtros, antes_id=cursores[-1], limite=FILAS_POR_PAGINA)
     
     # Mostrar tabla
-    st.dataframe(df, use_container_width=True)
+    st.dataframe(_df_cambios(cambios), use_container_width=True)
+    st.caption(f"Página {len(cursores)}: {len(cambios)} de {total_cambios} cambios")
+    # Los callbacks mueven el cursor antes de la próxima ejecución
+    col_anterior, col_siguiente = st.columns(2)
+    with col_anterior:
+        if len(cursores) > 1:
+            st.button("← Más recientes", on_click=cursores.pop)
+    with col_siguiente:
+        if len(cambios) == FILAS_POR_PAGINA:
+            st.button("Más antiguos →", on_click=cursores.append, args=(cambios[-1].id,))
     
     # Estadísticas
     st.subheader("Estadísticas")
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        total_cambios = len(cambios)
         st.metric("Total de cambios", total_cambios)
     
     with col2:
-        cambios_por_accion = df['Acción'].value_counts()
         st.write("Cambios por acción:")
-        st.write(cambios_por_accion)
+        st.write(estadisticas['por_accion'])
     
     with col3:
-        cambios_por_usuario = df['Usuario'].value_counts()
         st.write("Cambios por usuario:")
-        st.write(cambios_por_usuario)
+        st.write(estadisticas['por_usuario'])
+    
+    st.write("Cambios por día:")
+    st.bar_chart(estadisticas['por_dia'])
     
-    # Exportar a Excel
+    # Exportar a Excel (todo el período filtrado, no solo la página)
     if st.button("Exportar a Excel"):
         nombre_archivo = f"historial_cambios_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        df.to_excel(nombre_archivo, index=False)
+        _df_cambios(obtener_log_cambios(filtros)).to_excel(nombre_archivo, index=False)
         
         with open(nombre_archivo, 'rb') as f:
             st.download_button(
@@ -1,5 +1,5 @@
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, date
 import re
 
 def normalizar_texto(texto):
@@ -15,12 +15,43 @@ def normalizar_texto(texto):
     texto = re.sub(r'[ñ]', 'n', texto)
     return texto
 
+# Reglas de formato compartidas por el formulario (un valor) y calidad_datos (columnas enteras)
+PATRON_DNI = r'\d{7,8}'
+SEPARADORES_TELEFONO = r'[+\- ]'
+
 def validar_dni(dni):
     """Valida que el DNI tenga el formato correcto"""
     if not dni:
         return False
     dni = str(dni).strip()
-    return bool(re.match(r'^\d{7,8}$', dni))
+    return bool(re.fullmatch(PATRON_DNI, dni))
+
+def validar_email(email):
+    """Email opcional: vacío o con @"""
+    email = str(email or '').strip()
+    return not email or '@' in email
+
+def validar_telefono(telefono):
+    """Teléfono opcional: vacío o solo números, +, - o espacios"""
+    telefono = str(telefono or '').strip()
+    return not telefono or re.sub(SEPARADORES_TELEFONO, '', telefono).isdigit()
+
+def _texto_serie(serie):
+    return serie.fillna('').astype(str).str.strip()
+
+def dnis_validos(serie):
+    """validar_dni sobre una Serie: máscara booleana"""
+    return _texto_serie(serie).str.fullmatch(PATRON_DNI)
+
+def emails_validos(serie):
+    """validar_email sobre una Serie: máscara booleana"""
+    texto = _texto_serie(serie)
+    return (texto == '') | texto.str.contains('@', regex=False)
+
+def telefonos_validos(serie):
+    """validar_telefono sobre una Serie: máscara booleana"""
+    texto = _texto_serie(serie)
+    return (texto == '') | texto.str.replace(SEPARADORES_TELEFONO, '', regex=True).str.isdigit()
 
 def normalizar_fecha(fecha):
     """Normaliza diferentes formatos de fecha a datetime"""
@@ -31,6 +62,39 @@ def normalizar_fecha(fecha):
     except:
         return None
 
+def normalizar_valor_comparacion(valor):
+    """Normaliza un valor para detectar cambios reales: vacíos a None, fechas a datetime, escalares de numpy a Python"""
+    if valor is None:
+        return None
+    if isinstance(valor, (list, dict)):
+        return valor or None
+    if hasattr(valor, 'item') and not isinstance(valor, (str, bytes)):
+        valor = valor.item()  # escalares de numpy
+    if isinstance(valor, str):
+        valor = valor.strip()
+        return valor or None
+    try:
+        if pd.isna(valor):
+            return None
+    except (TypeError, ValueError):
+        pass
+    if isinstance(valor, pd.Timestamp):
+        valor = valor.to_pydatetime()
+    if isinstance(valor, datetime):
+        return valor.replace(tzinfo=None)
+    if isinstance(valor, date):
+        return datetime.combine(valor, datetime.min.time())
+    return valor
+
+def valores_iguales(actual, nuevo):
+    """Compara dos valores normalizados. Una fecha sin hora (medianoche) se compara solo por día."""
+    actual = normalizar_valor_comparacion(actual)
+    nuevo = normalizar_valor_comparacion(nuevo)
+    if isinstance(actual, datetime) and isinstance(nuevo, datetime):
+        if actual.time() == datetime.min.time() or nuevo.time() == datetime.min.time():
+            return actual.date() == nuevo.date()
+    return actual == nuevo
+
 def normalizar_estado(estado):
     """Normaliza el estado del empleado"""
     if not estado:
@@ -81,4 +145,4 @@ def formatear_detalle_cambio(cambio):
     """Formatea el detalle de un cambio para mostrar"""
     if not cambio:
         return ""
-    return f"{formatear_fecha(cambio.timestamp)} - {cambio.usuario.usuario}: {cambio.detalle}" 
\ No newline at end of file
+    return f"{formatear_fecha(cambio.timestamp)} - {cambio.usuario.usuario}: {cambio.detalle}"
@@ -1,4 +1,13 @@
-from db import get_session, Empleado, LogCambio
+import argparse
+import os
+import re
+import pandas as pd
+from sqlalchemy import select, func, and_
+from db import get_session, get_read_session, Empleado, LogCambio
+from utils import validar_dni
+
+# Tamaño de cada IN (...) para no armar sentencias gigantes con decenas de miles de DNIs
+TAMANIO_BLOQUE_DNIS = 10000
 
 def verificar_empleado(dni):
     session = get_session()
@@ -29,5 +38,112 @@ def verificar_empleado(dni):
     finally:
         session.close()
 
+def normalizar_dni(valor):
+    """Limpia un DNI leído de un archivo: quita puntos, espacios y el '.0' de celdas numéricas"""
+    if valor is None or (isinstance(valor, float) and pd.isna(valor)):
+        return ""
+    dni = re.sub(r'\.0$', '', str(valor).strip())
+    return re.sub(r'[.\s-]', '', dni)
+
+def leer_dnis(archivo, nombre=None):
+    """Lee DNIs desde un TXT (uno por línea) o un CSV/Excel con columna 'dni' (o su primera columna)"""
+    nombre = nombre or getattr(archivo, 'name', None) or str(archivo)
+    if nombre.lower().endswith('.txt'):
+        if hasattr(archivo, 'getvalue'):
+            contenido = archivo.getvalue()
+        else:
+            with open(archivo, 'rb') as f:
+                contenido = f.read()
+        valores = contenido.decode('utf-8-sig', errors='ignore').splitlines()
+    else:
+        from lectores import leer_archivo
+        lectura = leer_archivo(archivo, nombre=nombre)
+        df = pd.concat(lectura['hojas'].values(), ignore_index=True)
+        columnas = {str(c).strip().lower(): c for c in df.columns}
+        valores = df[columnas.get('dni', df.columns[0])].tolist()
+    dnis = [normalizar_dni(v) for v in valores]
+    # Mantener el orden del archivo sin repetidos
+    return list(dict.fromkeys(d for d in dnis if d))
+
+def verificar_dnis(dnis):
+    """Verifica una lista de DNIs contra el padrón con consultas por conjunto.
+
+    Devuelve un DataFrame con una fila por DNI: resultado ('encontrado', 'inactivo',
+    'no encontrado' o 'invalido'), datos básicos y el último cambio registrado.
+    """
+    dnis = list(dict.fromkeys(str(d).strip() for d in dnis))
+    validos = [d for d in dnis if validar_dni(d)]
+    encontrados = {}
+    session = get_read_session()
+    try:
+        for desde in range(0, len(validos), TAMANIO_BLOQUE_DNIS):
+            bloque = validos[desde:desde + TAMANIO_BLOQUE_DNIS]
+            # Último cambio por DNI en la misma consulta (row_number sobre log_cambios)
+            ultimo = select(
+                LogCambio.empleado_dni,
+                LogCambio.accion,
+                LogCambio.timestamp,
+                LogCambio.detalle,
+                func.row_number().over(
+                    partition_by=LogCambio.empleado_dni,
+                    order_by=LogCambio.timestamp.desc()
+                ).label('orden')
+            ).where(LogCambio.empleado_dni.in_(bloque)).subquery()
+            consulta = select(
+                Empleado.dni, Empleado.nombre, Empleado.apellido, Empleado.estado, Empleado.activo,
+                ultimo.c.accion, ultimo.c.timestamp, ultimo.c.detalle
+            ).outerjoin(
+                ultimo, and_(ultimo.c.empleado_dni == Empleado.dni, ultimo.c.orden == 1)
+            ).where(Empleado.dni.in_(bloque))
+            for fila in session.execute(consulta):
+                encontrados[fila.dni] = fila
+    finally:
+        session.close()
+
+    reporte = []
+    for dni in dnis:
+        fila = encontrados.get(dni)
+        if not validar_dni(dni):
+            resultado = 'invalido'
+        elif fila is None:
+            resultado = 'no encontrado'
+        elif not fila.activo or fila.estado == 'inactivo':
+            resultado = 'inactivo'
+        else:
+            resultado = 'encontrado'
+        reporte.append({
+            'DNI': dni,
+            'Resultado': resultado,
+            'Nombre': fila.nombre if fila else None,
+            'Apellido': fila.apellido if fila else None,
+            'Estado': fila.estado if fila else None,
+            'Último cambio': fila.timestamp if fila else None,
+            'Acción último cambio': fila.accion if fila else None,
+            'Detalle último cambio': fila.detalle if fila else None
+        })
+    return pd.DataFrame(reporte, columns=[
+        'DNI', 'Resultado', 'Nombre', 'Apellido', 'Estado',
+        'Último cambio', 'Acción último cambio', 'Detalle último cambio'
+    ])
+
+def guardar_reporte(reporte, destino):
+    """Guarda el reporte como Excel o CSV según la extensión"""
+    if destino.lower().endswith('.xlsx'):
+        reporte.to_excel(destino, index=False)
+    else:
+        reporte.to_csv(destino, index=False)
+
 if __name__ == '__main__':
-    verificar_empleado('21781599') 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Verifica DNIs contra el padrón de empleados")
+    parser.add_argument('entrada', nargs='?', default='21781599',
+                        help="DNI a verificar o archivo CSV/TXT/XLSX con DNIs")
+    parser.add_argument('-o', '--salida', default='reporte_verificacion.csv',
+                        help="Archivo de reporte para la verificación masiva (.csv o .xlsx)")
+    args = parser.parse_args()
+    if os.path.isfile(args.entrada):
+        reporte = verificar_dnis(leer_dnis(args.entrada))
+        guardar_reporte(reporte, args.salida)
+        print(reporte['Resultado'].value_counts().to_string())
+        print(f"Reporte guardado en {args.salida}")
+    else:
+        verificar_empleado(args.entrada)